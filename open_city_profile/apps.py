@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class OpenCityProfileConfig(AppConfig):
     name = "open_city_profile"
     verbose_name = "Open City Profile"
+
+    def ready(self):
+        import open_city_profile.signals  # noqa isort:skip
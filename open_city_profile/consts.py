@@ -5,10 +5,13 @@ CANNOT_PERFORM_THIS_ACTION_WITH_GIVEN_SERVICE_TYPE_ERROR = (
 )
 GENERAL_ERROR = "GENERAL_ERROR"
 OBJECT_DOES_NOT_EXIST_ERROR = "OBJECT_DOES_NOT_EXIST_ERROR"
+INVALID_CURSOR_ERROR = "INVALID_CURSOR_ERROR"
 INVALID_EMAIL_FORMAT_ERROR = "INVALID_EMAIL_FORMAT"
 PERMISSION_DENIED_ERROR = "PERMISSION_DENIED_ERROR"
 PROFILE_HAS_NO_PRIMARY_EMAIL_ERROR = "PROFILE_HAS_NO_PRIMARY_EMAIL_ERROR"
 PROFILE_DOES_NOT_EXIST_ERROR = "PROFILE_DOES_NOT_EXIST_ERROR"
+QUERY_COST_LIMIT_EXCEEDED_ERROR = "QUERY_COST_LIMIT_EXCEEDED_ERROR"
+QUERY_DEPTH_LIMIT_EXCEEDED_ERROR = "QUERY_DEPTH_LIMIT_EXCEEDED_ERROR"
 TOKEN_EXPIRED_ERROR = "TOKEN_EXPIRED_ERROR"
 VALIDATION_ERROR = "VALIDATION_ERROR"
 
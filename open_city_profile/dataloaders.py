@@ -0,0 +1,89 @@
+from abc import ABCMeta, abstractmethod
+
+from promise.dataloader import DataLoader
+
+
+class LoaderStats:
+    """Counters collected by a single DataLoader instance."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.batch_sizes = []
+
+    @property
+    def batches(self):
+        return len(self.batch_sizes)
+
+    @property
+    def max_batch_size(self):
+        return max(self.batch_sizes, default=0)
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+        }
+
+
+class InstrumentedDataLoader(DataLoader, metaclass=ABCMeta):
+    """DataLoader which keeps track of its cache hits, misses and batch sizes.
+
+    Subclasses implement `load_batch` instead of `batch_load_fn`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = LoaderStats()
+
+    def load(self, key=None):
+        if (
+            self.cache
+            and key is not None
+            and self.get_cache_key(key) in self._promise_cache
+        ):
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+        return super().load(key)
+
+    def batch_load_fn(self, keys):
+        self.stats.batch_sizes.append(len(keys))
+        return self.load_batch(keys)
+
+    @abstractmethod
+    def load_batch(self, keys):
+        """Return a promise of the values of the keys, in the order of the keys."""
+
+
+class DataLoaderRegistry:
+    """Holds the DataLoaders of a single request.
+
+    Loaders are instantiated lazily when they are first accessed, either with
+    `get(name)` or as an attribute of the registry.
+    """
+
+    def __init__(self, loader_classes, max_batch_size=None):
+        self._loader_classes = loader_classes
+        self._loaders = {}
+        self.max_batch_size = max_batch_size
+
+    def get(self, name):
+        loader = self._loaders.get(name)
+        if loader is None:
+            loader = self._loader_classes[name](max_batch_size=self.max_batch_size)
+            self._loaders[name] = loader
+        return loader
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self.get(name)
+        except KeyError:
+            raise AttributeError(name)
+
+    def stats(self):
+        return {name: loader.stats for name, loader in self._loaders.items()}
@@ -31,6 +31,18 @@ class CannotPerformThisActionWithGivenServiceType(ProfileGraphQLError):
     """Incorrect service type for given action"""
 
 
+class QueryDepthLimitExceededError(ProfileGraphQLError):
+    """GraphQL operation is nested too deeply"""
+
+
+class QueryCostLimitExceededError(ProfileGraphQLError):
+    """GraphQL operation is too expensive to execute"""
+
+
+class InvalidCursorError(ProfileGraphQLError):
+    """Pagination cursor is invalid"""
+
+
 class InvalidEmailFormatError(ProfileGraphQLError):
     """Email must be in valid email format"""
 
@@ -0,0 +1,172 @@
+import hashlib
+import threading
+from collections import namedtuple, OrderedDict
+from functools import partial
+
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLCoreBackend
+from graphql.backend.base import GraphQLDocument
+from graphql.execution import execute, ExecutionResult
+from graphql.language import ast
+from graphql.language.parser import parse
+from graphql.validation import validate
+
+from open_city_profile.exceptions import (
+    QueryCostLimitExceededError,
+    QueryDepthLimitExceededError,
+)
+from open_city_profile.query_cost import analyze_query_cost
+
+ValidatedDocument = namedtuple(
+    "ValidatedDocument", ["document_ast", "validation_errors"]
+)
+
+
+class DocumentCache:
+    """Thread safe LRU cache of parsed and validated GraphQL documents.
+
+    The documents are only valid for the schema they were validated against,
+    so the cache is cleared whenever it's used with a different schema.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._schema = None
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _use_schema(self, schema):
+        if schema is not self._schema:
+            self._documents.clear()
+            self._schema = schema
+
+    def get(self, schema, key):
+        with self._lock:
+            self._use_schema(schema)
+            document = self._documents.get(key)
+            if document is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._documents.move_to_end(key)
+            return document
+
+    def set(self, schema, key, document):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._use_schema(schema)
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._documents),
+            "max_size": self.max_size,
+        }
+
+
+class ProfileGraphQLBackend(GraphQLCoreBackend):
+    """GraphQL backend which limits the depth and the cost of the operations.
+
+    Parsed and validated documents are kept in an LRU cache of `cache_size`
+    documents, keyed by the hash of the document, so repeated operations are
+    neither parsed nor validated again.
+
+    The cost of the operation is computed for every execution and it's reported
+    in the `cost` extension of the execution result.
+    """
+
+    def __init__(self, executor=None, cache_size=0):
+        super().__init__(executor=executor)
+        self.document_cache = DocumentCache(cache_size)
+
+    def document_from_string(self, schema, document_string):
+        if isinstance(document_string, ast.Document):
+            document = super().document_from_string(schema, document_string)
+            document_string = document.document_string
+
+        key = hashlib.sha256(document_string.encode("utf-8")).hexdigest()
+        validated_document = self.document_cache.get(schema, key)
+        if validated_document is None:
+            document_ast = parse(document_string)
+            validated_document = ValidatedDocument(
+                document_ast=document_ast,
+                validation_errors=validate(schema, document_ast),
+            )
+            self.document_cache.set(schema, key, validated_document)
+
+        return GraphQLDocument(
+            schema=schema,
+            document_string=document_string,
+            document_ast=validated_document.document_ast,
+            execute=partial(self.execute_document, schema, validated_document),
+        )
+
+    def execute_document(self, schema, validated_document, *args, **kwargs):
+        if validated_document.validation_errors:
+            return ExecutionResult(
+                errors=validated_document.validation_errors, invalid=True
+            )
+
+        document_ast = validated_document.document_ast
+        query_cost = analyze_query_cost(
+            schema,
+            document_ast,
+            operation_name=kwargs.get("operation_name"),
+            variables=kwargs.get("variable_values"),
+            default_page_size=graphene_settings.RELAY_CONNECTION_MAX_LIMIT,
+        )
+        extensions = {
+            "cost": {
+                "depth": query_cost.depth,
+                "cost": query_cost.cost,
+                "maxDepth": settings.GRAPHQL_QUERY_MAX_DEPTH,
+                "maxCost": settings.GRAPHQL_QUERY_MAX_COST,
+            }
+        }
+
+        errors = []
+        if settings.GRAPHQL_QUERY_MAX_DEPTH and (
+            query_cost.depth > settings.GRAPHQL_QUERY_MAX_DEPTH
+        ):
+            errors.append(
+                QueryDepthLimitExceededError(
+                    f"Query depth {query_cost.depth} exceeds the maximum depth "
+                    f"of {settings.GRAPHQL_QUERY_MAX_DEPTH}"
+                )
+            )
+        if settings.GRAPHQL_QUERY_MAX_COST and (
+            query_cost.cost > settings.GRAPHQL_QUERY_MAX_COST
+        ):
+            errors.append(
+                QueryCostLimitExceededError(
+                    f"Query cost {query_cost.cost} exceeds the maximum cost "
+                    f"of {settings.GRAPHQL_QUERY_MAX_COST}"
+                )
+            )
+        if errors:
+            return ExecutionResult(errors=errors, invalid=True, extensions=extensions)
+
+        result = execute(
+            schema, document_ast, *args, **{**self.execute_params, **kwargs}
+        )
+        if isinstance(result, ExecutionResult):
+            result.extensions.update(extensions)
+        return result
+
+
+graphql_backend = ProfileGraphQLBackend(cache_size=settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
@@ -0,0 +1,217 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class ResolverTiming:
+    """Wall time spent in the resolvers of a single field path."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self):
+        return {"count": self.count, "total": self.total, "max": self.max}
+
+
+class OperationTiming:
+    """Timings collected while executing a single GraphQL operation.
+
+    Resolver paths have the list indices removed, so all the items of a list
+    are recorded under the same path, e.g. "profiles.edges.node.firstName".
+    """
+
+    def __init__(self, operation_name=None):
+        self.operation_name = operation_name
+        self.duration = None
+        self.resolvers = defaultdict(ResolverTiming)
+        self.db_query_count = 0
+        self.db_query_time = 0.0
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self._start
+
+    def add_resolver(self, path, duration):
+        self.resolvers[path].add(duration)
+
+    def db_query_wrapper(self, execute, sql, params, many, context):
+        """Database execute wrapper which counts the queries and their time."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_query_count += 1
+            self.db_query_time += time.perf_counter() - start
+
+    def as_dict(self):
+        return {
+            "operation_name": self.operation_name,
+            "duration": self.duration,
+            "db_query_count": self.db_query_count,
+            "db_query_time": self.db_query_time,
+            "resolvers": {
+                path: timing.as_dict() for path, timing in self.resolvers.items()
+            },
+        }
+
+
+def get_resolver_path(path):
+    return ".".join(str(key) for key in path if not isinstance(key, int))
+
+
+class LogSink:
+    """Writes the timings of each operation as a JSON log line."""
+
+    def __init__(self, logger_name=__name__):
+        self.logger = logging.getLogger(logger_name)
+
+    def record(self, timing):
+        self.logger.info(json.dumps({"graphql_timing": timing.as_dict()}))
+
+
+class Histogram:
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self):
+        upper_bounds = [str(bucket) for bucket in self.buckets] + ["+Inf"]
+        return {
+            "buckets": dict(zip(upper_bounds, self.counts)),
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class HistogramRegistry:
+    """In-process registry of histograms keyed by metric name and label."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, label, value):
+        with self._lock:
+            histogram = self._histograms.get((name, label))
+            if histogram is None:
+                histogram = self._histograms[(name, label)] = Histogram()
+            histogram.observe(value)
+
+    def get(self, name, label):
+        return self._histograms.get((name, label))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                f"{name}{{{label}}}": histogram.as_dict()
+                for (name, label), histogram in self._histograms.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+histogram_registry = HistogramRegistry()
+
+
+class HistogramSink:
+    """Records the timings of each operation in the histogram registry."""
+
+    def __init__(self, registry=histogram_registry):
+        self.registry = registry
+
+    def record(self, timing):
+        operation = timing.operation_name or "anonymous"
+        self.registry.observe("graphql_operation_seconds", operation, timing.duration)
+        self.registry.observe(
+            "graphql_operation_db_seconds", operation, timing.db_query_time
+        )
+        for path, resolver_timing in timing.resolvers.items():
+            self.registry.observe(
+                "graphql_resolver_seconds", path, resolver_timing.total
+            )
+
+
+class CollectorSink:
+    """Keeps the recorded timings in memory, meant for tests."""
+
+    def __init__(self):
+        self.timings = []
+
+    def record(self, timing):
+        self.timings.append(timing)
+
+    def clear(self):
+        self.timings = []
+
+
+_sinks = {}
+
+
+def get_sinks():
+    """Return the sink instances configured with GRAPHQL_TIMING_SINKS."""
+    sinks = []
+    for path in settings.GRAPHQL_TIMING_SINKS:
+        if path not in _sinks:
+            _sinks[path] = import_string(path)()
+        sinks.append(_sinks[path])
+    return sinks
+
+
+def record_timing(timing):
+    for sink in get_sinks():
+        try:
+            sink.record(timing)
+        except Exception:
+            logger.exception("Recording GraphQL timing failed")
+
+
+@contextmanager
+def time_operation(context, operation_name=None, using=DEFAULT_DB_ALIAS):
+    """Time the GraphQL operation executed within the context manager.
+
+    The timing is attached to the context as `graphql_timing` for the
+    `open_city_profile.middlewares.GQLTiming` middleware to record the
+    resolvers in, and passed to the configured sinks when the operation is
+    finished.
+    """
+    timing = OperationTiming(operation_name)
+    context.graphql_timing = timing
+    try:
+        with connections[using].execute_wrapper(timing.db_query_wrapper):
+            timing.start()
+            yield timing
+    finally:
+        timing.stop()
+        context.graphql_timing = None
+        record_timing(timing)
@@ -1,3 +1,10 @@
+import time
+
+from django.conf import settings
+from promise import is_thenable, Promise
+
+from open_city_profile.dataloaders import DataLoaderRegistry
+from open_city_profile.instrumentation import get_resolver_path
 from profiles.loaders import (
     AddressesByProfileIdLoader,
     EmailsByProfileIdLoader,
@@ -5,6 +12,10 @@ from profiles.loaders import (
     PrimaryAddressForProfileLoader,
     PrimaryEmailForProfileLoader,
     PrimaryPhoneForProfileLoader,
+    SensitiveDataForProfileLoader,
+    ServiceConnectionsByProfileIdLoader,
+    SubscriptionsByProfileIdLoader,
+    VerifiedPersonalInformationForProfileLoader,
 )
 
 LOADERS = {
@@ -14,20 +25,95 @@ LOADERS = {
     "primary_address_for_profile_loader": PrimaryAddressForProfileLoader,
     "primary_email_for_profile_loader": PrimaryEmailForProfileLoader,
     "primary_phone_for_profile_loader": PrimaryPhoneForProfileLoader,
+    "sensitive_data_for_profile_loader": SensitiveDataForProfileLoader,
+    "service_connections_by_profile_id_loader": ServiceConnectionsByProfileIdLoader,
+    "subscriptions_by_profile_id_loader": SubscriptionsByProfileIdLoader,
+    "verified_personal_information_for_profile_loader": VerifiedPersonalInformationForProfileLoader,
 }
 
 
+def is_pending(result):
+    """Whether the result of a resolver is a promise which hasn't settled yet."""
+    if isinstance(result, Promise):
+        return result.is_pending
+    return is_thenable(result)
+
+
+def clear_loaders(context):
+    """Drop the request scoped DataLoaders and everything they have cached.
+
+    The service permission checker caches request scoped data as well and
+    is dropped with the loaders.
+    """
+    context.loaders = None
+    context.service_permissions = None
+
+
 class GQLDataLoaders:
-    def __init__(self):
-        self.cached_loaders = False
+    """Attaches a request scoped DataLoader registry to the context as `loaders`."""
 
     def resolve(self, next, root, info, **kwargs):
         context = info.context
 
-        if not self.cached_loaders:
-            for loader_name, loader_class in LOADERS.items():
-                setattr(context, loader_name, loader_class())
-
-            self.cached_loaders = True
+        if getattr(context, "loaders", None) is None:
+            context.loaders = DataLoaderRegistry(
+                LOADERS, max_batch_size=settings.GRAPHQL_DATALOADER_MAX_BATCH_SIZE
+            )
 
         return next(root, info, **kwargs)
+
+
+class GQLTiming:
+    """Records the wall time of each resolver to the timing of the operation.
+
+    Only used when GRAPHQL_TIMING_ENABLED is set. graphql-core wraps the
+    results of synchronous resolvers in settled promises, so only resolvers
+    returning pending promises are timed until the promise settles.
+    """
+
+    def resolve(self, next, root, info, **kwargs):
+        timing = getattr(info.context, "graphql_timing", None)
+        if timing is None:
+            return next(root, info, **kwargs)
+
+        if timing.operation_name is None and info.operation.name:
+            timing.operation_name = info.operation.name.value
+
+        path = get_resolver_path(info.path)
+        start = time.perf_counter()
+        result = next(root, info, **kwargs)
+        if not is_pending(result):
+            timing.add_resolver(path, time.perf_counter() - start)
+            return result
+
+        def on_resolve(value):
+            timing.add_resolver(path, time.perf_counter() - start)
+            return value
+
+        def on_reject(error):
+            timing.add_resolver(path, time.perf_counter() - start)
+            raise error
+
+        return result.then(on_resolve, on_reject)
+
+
+class GQLQueryTracker:
+    """Records the resolver path of each database query tracked with `track_queries`.
+
+    Only used when GRAPHQL_QUERY_BUDGET_MODE isn't "off".
+    """
+
+    def resolve(self, next, root, info, **kwargs):
+        queries = getattr(info.context, "graphql_queries", None)
+        if queries is None:
+            return next(root, info, **kwargs)
+
+        if queries.operation_name is None and info.operation.name:
+            queries.operation_name = info.operation.name.value
+
+        previous_path = queries.current_path
+        queries.current_path = get_resolver_path(info.path)
+        try:
+            return next(root, info, **kwargs)
+        finally:
+            queries.current_path = previous_path
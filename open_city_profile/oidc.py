@@ -1,11 +1,22 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple, OrderedDict
+
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
-from helusers.oidc import ApiTokenAuthentication
+from django.db import transaction
+from django.utils.module_loading import import_string
+from helusers.authz import UserAuthorization
+from helusers.oidc import ApiTokenAuthentication, RequestJWTAuthentication
+from jose import jwt
 from oauthlib.oauth2 import OAuth2Error
 from requests_oauthlib import OAuth2Session
 
 from open_city_profile.exceptions import TokenExchangeError
+from utils.http import http_client, mount_http_adapter
 
 
 class GraphQLApiTokenAuthentication(ApiTokenAuthentication):
@@ -20,22 +31,391 @@ class GraphQLApiTokenAuthentication(ApiTokenAuthentication):
     """
 
     def authenticate(self, request, **kwargs):
+        token = get_bearer_token(request)
+        cached = verified_token_cache.get(token) if token else None
+        if cached:
+            user, claims = cached
+            request.user_auth = UserAuthorization(user, claims, self.settings)
+            return user
+
         user_auth_tuple = super().authenticate(request)
         if not user_auth_tuple:
             return None
         user, auth = user_auth_tuple
+        verified_token_cache.set(token, user, auth.data)
         request.user_auth = auth
         return user
 
 
+class CachingRequestJWTAuthentication(RequestJWTAuthentication):
+    """
+    helusers.oidc.RequestJWTAuthentication which skips the verification of
+    tokens found in the verified_token_cache. The keys of the issuers are
+    fetched through the jwks_cache, unless a key_provider is given.
+    """
+
+    def __init__(self, key_provider=None):
+        super().__init__(key_provider or self._get_keys)
+        self._kid = None
+
+    def _get_keys(self, issuer):
+        return jwks_cache.get_keys(issuer, self._kid)
+
+    def authenticate(self, request):
+        token = get_bearer_token(request)
+        if not token:
+            return None
+        cached = verified_token_cache.get(token)
+        if cached:
+            return UserAuthorization(*cached)
+
+        self._kid = get_unverified_kid(token)
+        user_auth = super().authenticate(request)
+        if user_auth is not None:
+            verified_token_cache.set(token, user_auth.user, user_auth.data)
+        return user_auth
+
+
+def get_bearer_token(request):
+    try:
+        auth_scheme, token = request.headers["Authorization"].split()
+    except (KeyError, ValueError):
+        return None
+    if auth_scheme.lower() != "bearer":
+        return None
+    return token
+
+
+def get_unverified_kid(token):
+    try:
+        return jwt.get_unverified_header(token).get("kid")
+    except Exception:
+        return None
+
+
+REVOKED_USER_CACHE_KEY_PREFIX = "oidc:revoked_user:"
+
+CachedToken = namedtuple(
+    "CachedToken",
+    [
+        "expires_at",
+        "cached_at",
+        "user_pk",
+        "model",
+        "db",
+        "field_names",
+        "values",
+        "claims",
+    ],
+)
+
+
+def get_revoked_user_cache_key(user_pk):
+    return REVOKED_USER_CACHE_KEY_PREFIX + str(user_pk)
+
+
+class VerifiedTokenCache:
+    """Users and claims of the access tokens which have been verified.
+
+    The tokens are kept in memory, keyed by their SHA-256 hash, for at most
+    JWT_VERIFICATION_CACHE_TTL seconds and never past their expiration time,
+    so that changes to the user are picked up before long. When there are
+    more than JWT_VERIFICATION_CACHE_SIZE tokens, the least recently used ones
+    are dropped.
+
+    The user is stored as its field values and a new instance is returned on
+    each hit, so that requests don't share cached permissions or relations.
+    The tokens of a user who is deleted or deactivated are revoked in every
+    process through a timestamp stored in the shared Django cache, which is
+    checked on each hit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+
+    @staticmethod
+    def _get_key(token):
+        if isinstance(token, str):
+            token = token.encode()
+        return hashlib.sha256(token).hexdigest()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_keys = self._keys_by_user.get(entry.user_pk, set())
+        user_keys.discard(key)
+        if not user_keys:
+            self._keys_by_user.pop(entry.user_pk, None)
+
+    def get(self, token):
+        key = self._get_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+
+        # The user may have been deleted or deactivated by another process
+        revoked_at = cache.get(get_revoked_user_cache_key(entry.user_pk))
+        if revoked_at is not None and revoked_at >= entry.cached_at:
+            with self._lock:
+                self._remove(key)
+            return None
+        user = entry.model.from_db(entry.db, entry.field_names, entry.values)
+        return user, entry.claims
+
+    def set(self, token, user, claims):
+        max_size = settings.JWT_VERIFICATION_CACHE_SIZE
+        if not token or max_size <= 0:
+            return
+        now = time.time()
+        try:
+            expires_at = min(
+                float(claims["exp"]), now + settings.JWT_VERIFICATION_CACHE_TTL
+            )
+        except (KeyError, TypeError, ValueError):
+            return
+
+        field_names = [field.attname for field in user._meta.concrete_fields]
+        values = [getattr(user, name) for name in field_names]
+        entry = CachedToken(
+            expires_at=expires_at,
+            cached_at=now,
+            user_pk=user.pk,
+            model=type(user),
+            db=user._state.db,
+            field_names=field_names,
+            values=values,
+            claims=claims,
+        )
+        key = self._get_key(token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > max_size:
+                self._remove(next(iter(self._entries)))
+
+    def forget_user(self, user_pk):
+        """Drop the tokens of the user cached in this process."""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_pk, ())):
+                self._remove(key)
+
+    def revoke_user(self, user_pk):
+        """Drop the tokens of the user cached in every process.
+
+        The revocation is published once the current transaction commits, so
+        that other processes can't verify the tokens again before the changes
+        to the user are visible to them.
+        """
+        self.forget_user(user_pk)
+
+        def publish():
+            cache.set(
+                get_revoked_user_cache_key(user_pk),
+                time.time(),
+                settings.JWT_VERIFICATION_CACHE_TTL,
+            )
+            self.forget_user(user_pk)
+
+        transaction.on_commit(publish)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+
+verified_token_cache = VerifiedTokenCache()
+
+
+OIDC_CONFIG_CACHE_KEY_PREFIX = "oidc:config:"
+
+
+def get_max_age(response):
+    """Return the number of seconds the response may be cached for, if it's given."""
+    directives = [
+        directive.strip().lower()
+        for directive in response.headers.get("cache-control", "").split(",")
+    ]
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    for directive in directives:
+        name, _, value = directive.partition("=")
+        if name == "max-age":
+            try:
+                return max(int(value), 0)
+            except ValueError:
+                pass
+    return None
+
+
+class OIDCConfigCache:
+    """Caches the OpenID Connect discovery documents in the process and in the
+    shared Django cache.
+
+    A document is cached for the max-age of its response, or for
+    OIDC_CONFIG_CACHE_TTL seconds if the response doesn't give one. Only one
+    thread of the process fetches an expired document while the others wait
+    for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._documents = {}
+
+    @staticmethod
+    def _get_cache_key(url):
+        return OIDC_CONFIG_CACHE_KEY_PREFIX + hashlib.sha256(url.encode()).hexdigest()
+
+    def _get_url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def _get_cached(self, url):
+        entry = self._documents.get(url)
+        if entry is None or entry[0] <= time.time():
+            # Another process may have fetched the document already
+            entry = cache.get(self._get_cache_key(url))
+            if entry is None:
+                return None
+            self._documents[url] = entry
+        expires_at, document = entry
+        return document if expires_at > time.time() else None
+
+    def get(self, url, fetch):
+        """Return the document at the url, fetching it with `fetch` if needed.
+
+        `fetch` is called with the url and returns the response.
+        """
+        document = self._get_cached(url)
+        if document is not None:
+            return document
+
+        with self._get_url_lock(url):
+            # The document may have been fetched while waiting for the lock
+            document = self._get_cached(url)
+            if document is not None:
+                return document
+
+            response = fetch(url)
+            document = response.json()
+            ttl = get_max_age(response)
+            if ttl is None:
+                ttl = settings.OIDC_CONFIG_CACHE_TTL
+            if ttl > 0:
+                entry = (time.time() + ttl, document)
+                self._documents[url] = entry
+                cache.set(self._get_cache_key(url), entry, ttl)
+            return document
+
+    def clear(self):
+        """Drop the documents cached by this process, also from the shared cache."""
+        with self._lock:
+            cache.delete_many([self._get_cache_key(url) for url in self._documents])
+            self._documents = {}
+
+
+oidc_config_cache = OIDCConfigCache()
+
+
+def fetch_json(url, timeout=None):
+    headers = {"accept": "application/json"}
+    response = http_client.get(
+        url, headers=headers, timeout=timeout or settings.HTTP_CLIENT_TIMEOUT
+    )
+    response.raise_for_status()
+    return response
+
+
+class JWKSCache:
+    """Key sets of the token issuers, for verifying the access tokens.
+
+    A key set is fetched again after JWKS_CACHE_TTL seconds, or earlier when a
+    token is signed with a key which isn't in it, as the issuer may have
+    rotated its keys. Unknown keys refetch the key set at most once per
+    JWKS_MIN_REFRESH_INTERVAL seconds, so that tokens with made up key ids
+    don't hammer the issuer.
+
+    Only one thread of the process fetches the key set of an issuer. While it
+    does, the other threads keep using the cached key set if it has their key,
+    and wait for the fetch otherwise.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._issuer_locks = {}
+        self._key_sets = {}
+
+    @staticmethod
+    def _has_key(keys, kid):
+        return any(key.get("kid") == kid for key in keys.get("keys", []))
+
+    def _get_issuer_lock(self, issuer):
+        with self._lock:
+            return self._issuer_locks.setdefault(issuer, threading.Lock())
+
+    def _get_cached(self, issuer, kid):
+        """Return the cached key set of the issuer and whether to fetch it again."""
+        entry = self._key_sets.get(issuer)
+        if entry is None:
+            return None, True
+        fetched_at, keys = entry
+        age = time.monotonic() - fetched_at
+        if age >= settings.JWKS_CACHE_TTL:
+            return keys, True
+        if kid is not None and not self._has_key(keys, kid):
+            return keys, age >= settings.JWKS_MIN_REFRESH_INTERVAL
+        return keys, False
+
+    def get_keys(self, issuer, kid=None):
+        keys, expired = self._get_cached(issuer, kid)
+        if not expired:
+            return keys
+
+        has_key = keys is not None and (kid is None or self._has_key(keys, kid))
+        issuer_lock = self._get_issuer_lock(issuer)
+        if not issuer_lock.acquire(blocking=not has_key):
+            # Another thread is fetching the key set
+            return keys
+        try:
+            # The key set may have been fetched while waiting for the lock
+            keys, expired = self._get_cached(issuer, kid)
+            if not expired:
+                return keys
+
+            config = oidc_config_cache.get(
+                issuer + "/.well-known/openid-configuration", fetch_json
+            )
+            keys = fetch_json(config["jwks_uri"]).json()
+            self._key_sets[issuer] = (time.monotonic(), keys)
+            return keys
+        finally:
+            issuer_lock.release()
+
+    def clear(self):
+        with self._lock:
+            self._key_sets = {}
+
+
+jwks_cache = JWKSCache()
+
+
 class TunnistamoTokenExchange:
     """Exchanges an authorization code with Tunnistamo into API token for open-city-profile."""
 
-    timeout = 5
-
     def __init__(self):
         self.check_settings()
 
+        self.timeout = settings.HTTP_CLIENT_TIMEOUT
         self.oidc_endpoint = settings.TUNNISTAMO_OIDC_ENDPOINT
         self.client_id = settings.TUNNISTAMO_CLIENT_ID
         self.client_secret = settings.TUNNISTAMO_CLIENT_SECRET
@@ -62,8 +442,9 @@ class TunnistamoTokenExchange:
     def fetch_api_tokens(self, authorization_code: str) -> dict:
         """Exchanges the authorization code into API tokens that can access APIs using Tunnistamo."""
         oidc_conf = self.get_oidc_config()
-        session = OAuth2Session(
-            client_id=self.client_id, redirect_uri=self.callback_url
+        session = mount_http_adapter(
+            OAuth2Session(client_id=self.client_id, redirect_uri=self.callback_url),
+            http_client.adapter,
         )
 
         try:
@@ -85,10 +466,14 @@ class TunnistamoTokenExchange:
         return api_tokens
 
     def get_oidc_config(self):
-        return self.get(self.oidc_endpoint + "/.well-known/openid-configuration").json()
+        return oidc_config_cache.get(
+            self.oidc_endpoint + "/.well-known/openid-configuration", self.get
+        )
 
     def get(self, url: str) -> requests.Response:
-        headers = {"accept": "application/json"}
-        response = requests.get(url, headers=headers, timeout=self.timeout)
-        response.raise_for_status()
-        return response
+        return fetch_json(url, timeout=self.timeout)
+
+
+def get_token_exchange():
+    """Return an instance of the token exchange configured in TOKEN_EXCHANGE_CLASS."""
+    return import_string(settings.TOKEN_EXCHANGE_CLASS)()
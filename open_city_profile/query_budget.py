@@ -0,0 +1,97 @@
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connections, DEFAULT_DB_ALIAS
+
+logger = logging.getLogger(__name__)
+
+BATCHED_PATH = "(outside resolvers)"
+
+_IN_LIST_RE = re.compile(r"\(%s(?:, %s)*\)")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """GraphQL operation used more database queries than its budget allows."""
+
+
+def get_query_shape(sql):
+    """Return the SQL with varying length IN lists collapsed into one."""
+    return _IN_LIST_RE.sub("(%s, ...)", sql)
+
+
+class OperationQueries:
+    """Database queries executed by a single GraphQL operation.
+
+    Each query is recorded with the resolver path which was being resolved
+    when it was executed. Queries made while DataLoaders dispatch their batches
+    don't happen inside any resolver and are recorded under BATCHED_PATH.
+    """
+
+    def __init__(self, operation_name=None, budget=None):
+        self.operation_name = operation_name
+        self.budget = budget
+        self.queries = []
+        self.current_path = None
+
+    def db_query_wrapper(self, execute, sql, params, many, context):
+        self.queries.append((self.current_path or BATCHED_PATH, get_query_shape(sql)))
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def repeated_queries(self):
+        """Return the query shapes executed more than once by the same resolver path."""
+        return {key: count for key, count in Counter(self.queries).items() if count > 1}
+
+    def is_over_budget(self):
+        return self.budget is not None and self.count > self.budget
+
+    def report(self):
+        lines = [
+            f"Operation {self.operation_name or 'anonymous'} executed "
+            f"{self.count} queries, budget is {self.budget}."
+        ]
+        for (path, shape), count in sorted(
+            self.repeated_queries().items(), key=lambda item: -item[1]
+        ):
+            lines.append(f"{count} x {path}: {shape}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def track_queries(
+    context,
+    operation_name=None,
+    budget=None,
+    budgets=None,
+    mode="raise",
+    using=DEFAULT_DB_ALIAS,
+):
+    """Track the database queries of the GraphQL operation executed within.
+
+    The tracked queries are attached to the context as `graphql_queries` for
+    the `open_city_profile.middlewares.GQLQueryTracker` middleware to record
+    the resolver paths to. The budget of the operation is either given as
+    `budget` or looked up from the `budgets` mapping by operation name once
+    the operation has been executed. If the operation goes over its budget, a
+    QueryBudgetExceeded is raised when `mode` is "raise", otherwise a warning
+    is logged.
+    """
+    queries = OperationQueries(operation_name, budget)
+    context.graphql_queries = queries
+    try:
+        with connections[using].execute_wrapper(queries.db_query_wrapper):
+            yield queries
+    finally:
+        context.graphql_queries = None
+
+    if queries.budget is None and budgets:
+        queries.budget = budgets.get(queries.operation_name)
+    if queries.is_over_budget():
+        if mode == "raise":
+            raise QueryBudgetExceeded(queries.report())
+        logger.warning(queries.report())
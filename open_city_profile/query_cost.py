@@ -0,0 +1,142 @@
+from collections import namedtuple
+
+from graphql.language import ast
+from graphql.type.definition import get_named_type, GraphQLObjectType, is_leaf_type
+from graphql.utils.get_operation_ast import get_operation_ast
+
+QueryCost = namedtuple("QueryCost", ["depth", "cost"])
+
+# Weights of fields which are more expensive to resolve than fetching an object,
+# keyed by "<parent type>.<field name>". Other object fields weigh 1 and scalar
+# fields nothing.
+FIELD_WEIGHTS = {
+    "Query.downloadMyProfile": 100,
+    "Mutation.deleteMyProfile": 100,
+}
+
+
+def _is_connection(graphql_type):
+    return (
+        isinstance(graphql_type, GraphQLObjectType)
+        and "edges" in graphql_type.fields
+        and "pageInfo" in graphql_type.fields
+    )
+
+
+class QueryCostAnalyzer:
+    """Computes the depth and a static cost of a GraphQL operation.
+
+    Every field costs its weight multiplied by the number of times it's resolved,
+    which is the product of the page sizes of the connections it's nested in.
+    The page size of a connection is its `first` or `last` argument, or
+    `default_page_size` if neither is given. Introspection fields are ignored.
+
+    The document must have been validated before it's analyzed.
+    """
+
+    def __init__(self, schema, document_ast, variables=None, default_page_size=100):
+        self.schema = schema
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document_ast.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        self.document_ast = document_ast
+        self.variables = variables or {}
+        self.default_page_size = default_page_size
+
+    def analyze(self, operation_name=None):
+        operation = get_operation_ast(self.document_ast, operation_name)
+        if operation is None:
+            return QueryCost(depth=0, cost=0)
+
+        root_type = {
+            "query": self.schema.get_query_type(),
+            "mutation": self.schema.get_mutation_type(),
+            "subscription": self.schema.get_subscription_type(),
+        }[operation.operation]
+        return self._analyze_selection_set(operation.selection_set, root_type, 1)
+
+    def _get_fields(self, selection_set, parent_type, visited_fragments=()):
+        """Flatten the fragments of the selection set into (field, parent type) pairs."""
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                yield selection, parent_type
+            elif isinstance(selection, ast.InlineFragment):
+                fragment_type = (
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition
+                    else parent_type
+                )
+                yield from self._get_fields(
+                    selection.selection_set, fragment_type, visited_fragments
+                )
+            elif isinstance(selection, ast.FragmentSpread):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in visited_fragments:
+                    continue
+                yield from self._get_fields(
+                    fragment.selection_set,
+                    self.schema.get_type(fragment.type_condition.name.value),
+                    visited_fragments + (name,),
+                )
+
+    def _analyze_selection_set(self, selection_set, parent_type, multiplier):
+        depth = 0
+        cost = 0
+        for field, field_parent_type in self._get_fields(selection_set, parent_type):
+            name = field.name.value
+            if name.startswith("__"):
+                continue
+            field_definition = getattr(field_parent_type, "fields", {}).get(name)
+            if field_definition is None:
+                continue
+
+            field_type = get_named_type(field_definition.type)
+            weight = FIELD_WEIGHTS.get(
+                f"{field_parent_type.name}.{name}",
+                0 if is_leaf_type(field_type) else 1,
+            )
+            cost += weight * multiplier
+
+            field_depth = 1
+            if field.selection_set:
+                child_multiplier = multiplier
+                if _is_connection(field_type):
+                    child_multiplier *= self._get_page_size(field)
+                child = self._analyze_selection_set(
+                    field.selection_set, field_type, child_multiplier
+                )
+                field_depth += child.depth
+                cost += child.cost
+            depth = max(depth, field_depth)
+
+        return QueryCost(depth=depth, cost=cost)
+
+    def _get_page_size(self, field):
+        page_size = None
+        for argument in field.arguments or []:
+            if argument.name.value not in ("first", "last"):
+                continue
+            value = argument.value
+            if isinstance(value, ast.Variable):
+                value = self.variables.get(value.name.value)
+            elif isinstance(value, ast.IntValue):
+                value = int(value.value)
+            else:
+                value = None
+            if isinstance(value, int):
+                page_size = max(page_size or 0, value)
+
+        if page_size is None:
+            return self.default_page_size
+        return max(page_size, 0)
+
+
+def analyze_query_cost(
+    schema, document_ast, operation_name=None, variables=None, default_page_size=100
+):
+    return QueryCostAnalyzer(
+        schema, document_ast, variables, default_page_size
+    ).analyze(operation_name)
@@ -40,6 +40,7 @@ env = environ.Env(
     OIDC_CLIENT_ID=(str, ""),
     OIDC_CLIENT_SECRET=(str, ""),
     TUNNISTAMO_API_TOKENS_URL=(str, ""),
+    TOKEN_EXCHANGE_CLASS=(str, "open_city_profile.oidc.TunnistamoTokenExchange"),
     MAILER_EMAIL_BACKEND=(str, "django.core.mail.backends.console.EmailBackend"),
     DEFAULT_FROM_EMAIL=(str, "no-reply@hel.fi"),
     MAIL_MAILGUN_KEY=(str, ""),
@@ -47,9 +48,17 @@ env = environ.Env(
     MAIL_MAILGUN_API=(str, ""),
     NOTIFICATIONS_ENABLED=(bool, False),
     FIELD_ENCRYPTION_KEYS=(list, []),
+    BLIND_INDEX_KEYS=(list, []),
     VERSION=(str, None),
     AUDIT_LOGGING_ENABLED=(bool, False),
     AUDIT_LOG_USERNAME=(bool, False),
+    AUDIT_LOG_SINK=(str, "profiles.audit_log.LoggerSink"),
+    AUDIT_LOG_FILENAME=(str, ""),
+    AUDIT_LOG_ASYNC=(bool, True),
+    AUDIT_LOG_QUEUE_SIZE=(int, 10000),
+    AUDIT_LOG_BATCH_SIZE=(int, 100),
+    AUDIT_LOG_FLUSH_INTERVAL=(float, 1.0),
+    AUDIT_LOG_QUEUE_FULL_POLICY=(str, "sync"),
     ENABLE_GRAPHIQL=(bool, False),
     FORCE_SCRIPT_NAME=(str, ""),
     CSRF_COOKIE_NAME=(str, ""),
@@ -62,7 +71,34 @@ env = environ.Env(
     CSRF_TRUSTED_ORIGINS=(list, []),
     TEMPORARY_PROFILE_READ_ACCESS_TOKEN_VALIDITY_MINUTES=(int, 2 * 24 * 60),
     GDPR_AUTH_CALLBACK_URL=(str, ""),
+    GDPR_API_MAX_WORKERS=(int, 8),
+    GDPR_DOWNLOAD_DEADLINE=(float, 10.0),
+    GDPR_JOB_MAX_ATTEMPTS=(int, 5),
+    GDPR_JOB_RETRY_DELAY=(int, 30),
+    GDPR_JOB_LOCK_TIMEOUT=(int, 600),
+    GDPR_JOB_RESULT_TTL=(int, 24 * 60 * 60),
+    HTTP_CLIENT_POOL_CONNECTIONS=(int, 10),
+    HTTP_CLIENT_POOL_MAXSIZE=(int, 10),
+    HTTP_CLIENT_TIMEOUT=(float, 5.0),
+    HTTP_CLIENT_RETRIES=(int, 2),
+    HTTP_CLIENT_BACKOFF_FACTOR=(float, 0.3),
+    OIDC_CONFIG_CACHE_TTL=(int, 3600),
+    JWT_VERIFICATION_CACHE_SIZE=(int, 10000),
+    JWT_VERIFICATION_CACHE_TTL=(int, 300),
+    JWKS_CACHE_TTL=(int, 3600),
+    JWKS_MIN_REFRESH_INTERVAL=(int, 60),
     USE_HELUSERS_REQUEST_JWT_AUTH=(bool, False),
+    GRAPHQL_DATALOADER_MAX_BATCH_SIZE=(int, 500),
+    PROFILES_TOTAL_COUNT_ESTIMATE=(bool, False),
+    PROFILES_TOTAL_COUNT_ESTIMATE_CACHE_TIMEOUT=(int, 60),
+    GRAPHQL_QUERY_MAX_DEPTH=(int, 15),
+    GRAPHQL_QUERY_MAX_COST=(int, 100000),
+    GRAPHQL_DOCUMENT_CACHE_SIZE=(int, 500),
+    GRAPHQL_TIMING_ENABLED=(bool, False),
+    GRAPHQL_TIMING_SINKS=(list, ["open_city_profile.instrumentation.LogSink"]),
+    GRAPHQL_QUERY_BUDGET_MODE=(str, "off"),
+    GRAPHQL_QUERY_BUDGETS=(dict, {}),
+    SERVICE_REGISTRY_CHECK_INTERVAL=(int, 5),
 )
 if os.path.exists(env_file):
     env.read_env(env_file)
@@ -129,6 +165,10 @@ STATIC_ROOT = var_root("static")
 MEDIA_URL = env.str("MEDIA_URL")
 STATIC_URL = env.str("STATIC_URL")
 FIELD_ENCRYPTION_KEYS = env.list("FIELD_ENCRYPTION_KEYS")
+# Hex encoded HMAC keys of the blind indexes used for looking up profiles by
+# encrypted identifiers. The first key is used for new indexes, the others
+# only for lookups until the indexes have been updated after a key rotation.
+BLIND_INDEX_KEYS = env.list("BLIND_INDEX_KEYS")
 
 ROOT_URLCONF = "open_city_profile.urls"
 WSGI_APPLICATION = "open_city_profile.wsgi.application"
@@ -258,6 +298,17 @@ TEMPORARY_PROFILE_READ_ACCESS_TOKEN_VALIDITY_MINUTES = env.int(
     "TEMPORARY_PROFILE_READ_ACCESS_TOKEN_VALIDITY_MINUTES"
 )
 
+# Return PostgreSQL planner estimates instead of exact counts as the totalCount
+# of profiles. Estimates are cached for the given number of seconds.
+PROFILES_TOTAL_COUNT_ESTIMATE = env.bool("PROFILES_TOTAL_COUNT_ESTIMATE")
+PROFILES_TOTAL_COUNT_ESTIMATE_CACHE_TIMEOUT = env.int(
+    "PROFILES_TOTAL_COUNT_ESTIMATE_CACHE_TIMEOUT"
+)
+
+# Services are cached in each process. Changes made in other processes are
+# noticed within the given number of seconds through the shared cache.
+SERVICE_REGISTRY_CHECK_INTERVAL = env.int("SERVICE_REGISTRY_CHECK_INTERVAL")
+
 # Django-parler
 
 PARLER_LANGUAGES = {
@@ -280,6 +331,17 @@ MAILER_EMAIL_BACKEND = env.str("MAILER_EMAIL_BACKEND")
 
 # Graphene
 
+# Record resolver and operation timings to the GRAPHQL_TIMING_SINKS
+GRAPHQL_TIMING_ENABLED = env.bool("GRAPHQL_TIMING_ENABLED")
+GRAPHQL_TIMING_SINKS = env.list("GRAPHQL_TIMING_SINKS")
+
+# Count the database queries of each GraphQL operation and "warn" or "raise" when
+# an operation uses more queries than its budget in GRAPHQL_QUERY_BUDGETS allows.
+# Meant for development and tests, "off" in production.
+GRAPHQL_QUERY_BUDGET_MODE = env.str("GRAPHQL_QUERY_BUDGET_MODE")
+# Budgets by operation name, e.g. "getMyProfile=8;getBerthProfiles=12"
+GRAPHQL_QUERY_BUDGETS = env.dict("GRAPHQL_QUERY_BUDGETS", cast={"value": int})
+
 GRAPHENE = {
     "SCHEMA": "open_city_profile.schema.schema",
     "MIDDLEWARE": [
@@ -287,9 +349,25 @@ GRAPHENE = {
         if USE_HELUSERS_REQUEST_JWT_AUTH
         else "graphql_jwt.middleware.JSONWebTokenMiddleware",
         "open_city_profile.middlewares.GQLDataLoaders",
-    ],
+    ]
+    + (["open_city_profile.middlewares.GQLTiming"] if GRAPHQL_TIMING_ENABLED else [])
+    + (
+        ["open_city_profile.middlewares.GQLQueryTracker"]
+        if GRAPHQL_QUERY_BUDGET_MODE != "off"
+        else []
+    ),
 }
 
+# Maximum number of keys a single DataLoader batch query may contain
+GRAPHQL_DATALOADER_MAX_BATCH_SIZE = env.int("GRAPHQL_DATALOADER_MAX_BATCH_SIZE")
+
+# Maximum depth and static cost of a single GraphQL operation, 0 disables the limit
+GRAPHQL_QUERY_MAX_DEPTH = env.int("GRAPHQL_QUERY_MAX_DEPTH")
+GRAPHQL_QUERY_MAX_COST = env.int("GRAPHQL_QUERY_MAX_COST")
+
+# Number of parsed and validated GraphQL documents cached per process, 0 disables the cache
+GRAPHQL_DOCUMENT_CACHE_SIZE = env.int("GRAPHQL_DOCUMENT_CACHE_SIZE")
+
 if not USE_HELUSERS_REQUEST_JWT_AUTH:
     GRAPHQL_JWT = {"JWT_AUTH_HEADER_PREFIX": "Bearer"}
 
@@ -336,6 +414,18 @@ YOUTH_MEMBERSHIP_FULL_SEASON_START_MONTH = 5
 
 AUDIT_LOGGING_ENABLED = env.bool("AUDIT_LOGGING_ENABLED")
 AUDIT_LOG_USERNAME = env.bool("AUDIT_LOG_USERNAME")
+# Audit events are written by a background thread to the sink, which is one of
+# profiles.audit_log.LoggerSink, FileSink (writing to AUDIT_LOG_FILENAME) or
+# DatabaseSink. When the queue of unwritten events is full, new events are
+# either written synchronously ("sync"), wait for room ("block") or are
+# dropped ("drop").
+AUDIT_LOG_SINK = env.str("AUDIT_LOG_SINK")
+AUDIT_LOG_FILENAME = env.str("AUDIT_LOG_FILENAME")
+AUDIT_LOG_ASYNC = env.bool("AUDIT_LOG_ASYNC")
+AUDIT_LOG_QUEUE_SIZE = env.int("AUDIT_LOG_QUEUE_SIZE")
+AUDIT_LOG_BATCH_SIZE = env.int("AUDIT_LOG_BATCH_SIZE")
+AUDIT_LOG_FLUSH_INTERVAL = env.float("AUDIT_LOG_FLUSH_INTERVAL")
+AUDIT_LOG_QUEUE_FULL_POLICY = env.str("AUDIT_LOG_QUEUE_FULL_POLICY")
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -346,7 +436,38 @@ LOGGING = {
 }
 
 GDPR_AUTH_CALLBACK_URL = env("GDPR_AUTH_CALLBACK_URL")
+# Maximum number of connected services called at the same time for a GDPR
+# request, and the number of seconds a GDPR data download waits for them
+GDPR_API_MAX_WORKERS = env.int("GDPR_API_MAX_WORKERS")
+GDPR_DOWNLOAD_DEADLINE = env.float("GDPR_DOWNLOAD_DEADLINE")
+# Times a queued GDPR job is attempted, and the seconds before the first retry,
+# doubled for each further retry. A job running longer than the lock timeout is
+# assumed to have been interrupted and is run again. Finished jobs, with their
+# results, are deleted after the result TTL.
+GDPR_JOB_MAX_ATTEMPTS = env.int("GDPR_JOB_MAX_ATTEMPTS")
+GDPR_JOB_RETRY_DELAY = env.int("GDPR_JOB_RETRY_DELAY")
+GDPR_JOB_LOCK_TIMEOUT = env.int("GDPR_JOB_LOCK_TIMEOUT")
+GDPR_JOB_RESULT_TTL = env.int("GDPR_JOB_RESULT_TTL")
+# Connection pools, timeout in seconds and retries of the outbound HTTP requests
+HTTP_CLIENT_POOL_CONNECTIONS = env.int("HTTP_CLIENT_POOL_CONNECTIONS")
+HTTP_CLIENT_POOL_MAXSIZE = env.int("HTTP_CLIENT_POOL_MAXSIZE")
+HTTP_CLIENT_TIMEOUT = env.float("HTTP_CLIENT_TIMEOUT")
+HTTP_CLIENT_RETRIES = env.int("HTTP_CLIENT_RETRIES")
+HTTP_CLIENT_BACKOFF_FACTOR = env.float("HTTP_CLIENT_BACKOFF_FACTOR")
 TUNNISTAMO_CLIENT_ID = env("OIDC_CLIENT_ID")
 TUNNISTAMO_CLIENT_SECRET = env("OIDC_CLIENT_SECRET")
 TUNNISTAMO_OIDC_ENDPOINT = env("TOKEN_AUTH_AUTHSERVER_URL")
 TUNNISTAMO_API_TOKENS_URL = env("TUNNISTAMO_API_TOKENS_URL")
+# Class exchanging the authorization codes of GDPR operations into API tokens
+TOKEN_EXCHANGE_CLASS = env.str("TOKEN_EXCHANGE_CLASS")
+# Seconds the Tunnistamo discovery document is cached for, unless its
+# response says otherwise
+OIDC_CONFIG_CACHE_TTL = env.int("OIDC_CONFIG_CACHE_TTL")
+# Number of verified access tokens kept in memory, and the seconds a token is
+# trusted without verifying it again. Zero size disables the cache.
+JWT_VERIFICATION_CACHE_SIZE = env.int("JWT_VERIFICATION_CACHE_SIZE")
+JWT_VERIFICATION_CACHE_TTL = env.int("JWT_VERIFICATION_CACHE_TTL")
+# Seconds the key sets of the token issuers are cached for, and the minimum
+# seconds between refetches caused by tokens signed with unknown keys
+JWKS_CACHE_TTL = env.int("JWKS_CACHE_TTL")
+JWKS_MIN_REFRESH_INTERVAL = env.int("JWKS_MIN_REFRESH_INTERVAL")
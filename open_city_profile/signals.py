@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from open_city_profile.oidc import verified_token_cache
+
+
+@receiver(post_save, sender=get_user_model())
+def update_verified_tokens_of_user(sender, instance, **kwargs):
+    """Verify the tokens of a changed user again, revoke those of an inactive one."""
+    if instance.is_active:
+        verified_token_cache.forget_user(instance.pk)
+    else:
+        verified_token_cache.revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def revoke_verified_tokens_of_deleted_user(sender, instance, **kwargs):
+    verified_token_cache.revoke_user(instance.pk)
@@ -8,7 +8,8 @@ from django.core.management import call_command
 from graphene.test import Client as GrapheneClient
 from graphql import build_client_schema, introspection_query
 
-from open_city_profile.middlewares import GQLDataLoaders
+from open_city_profile.middlewares import clear_loaders, GQLDataLoaders, GQLQueryTracker
+from open_city_profile.oidc import jwks_cache, oidc_config_cache, verified_token_cache
 from open_city_profile.schema import schema
 from open_city_profile.tests.factories import (
     GroupFactory,
@@ -16,6 +17,7 @@ from open_city_profile.tests.factories import (
     UserFactory,
 )
 from open_city_profile.views import GraphQLView
+from services.registry import service_registry
 
 
 class GraphQLClient(GrapheneClient):
@@ -23,9 +25,20 @@ class GraphQLClient(GrapheneClient):
         """
         Custom wrapper on the execute method, allows adding the
         GQL DataLoaders middleware, since it has to be added to make
-        the DataLoaders available through the context.
+        the DataLoaders available through the context. The query tracker
+        middleware is added so that query budgets can be checked with
+        `track_queries`.
+
+        The DataLoaders are request scoped, so they are dropped before each
+        execution like the view does after it. This leaves the loaders of the
+        latest execution available for inspection.
         """
-        return super().execute(*args, middleware=[GQLDataLoaders()], **kwargs)
+        context = kwargs.get("context")
+        if context is not None:
+            clear_loaders(context)
+        return super().execute(
+            *args, middleware=[GQLDataLoaders(), GQLQueryTracker()], **kwargs
+        )
 
 
 @pytest.fixture(autouse=True)
@@ -33,6 +46,25 @@ def autouse_db(db):
     pass
 
 
+@pytest.fixture(autouse=True)
+def clear_service_registry():
+    """Services of earlier tests are rolled back without sending signals."""
+    service_registry.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_oidc_config_cache():
+    """Each test may serve a different discovery document."""
+    oidc_config_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_token_caches():
+    """Tokens and keys of earlier tests must be verified again."""
+    verified_token_cache.clear()
+    jwks_cache.clear()
+
+
 @pytest.fixture
 def migration_test_db(request, transactional_db):
     def reset_migrations():
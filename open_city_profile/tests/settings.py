@@ -12,3 +12,8 @@ TUNNISTAMO_OIDC_ENDPOINT = "https://localhost"
 TUNNISTAMO_CLIENT_ID = "key"
 TUNNISTAMO_CLIENT_SECRET = "secret"
 TUNNISTAMO_API_TOKENS_URL = "https://localhost/api-tokens"
+
+# Audit events are written synchronously, so that tests can inspect them
+AUDIT_LOG_ASYNC = False
+
+BLIND_INDEX_KEYS = ["5c9f1a8e0b7d4c3f2a6e9d8b7c1f0e3a"]
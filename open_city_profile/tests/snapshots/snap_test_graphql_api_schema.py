@@ -98,6 +98,26 @@ input CreateEmailInput {
   emailType: EmailType!
 }
 
+input CreateMyProfileDeletionJobMutationInput {
+  authorizationCode: String!
+  clientMutationId: String
+}
+
+type CreateMyProfileDeletionJobMutationPayload {
+  job: GDPRJobNode
+  clientMutationId: String
+}
+
+input CreateMyProfileDownloadJobMutationInput {
+  authorizationCode: String!
+  clientMutationId: String
+}
+
+type CreateMyProfileDownloadJobMutationPayload {
+  job: GDPRJobNode
+  clientMutationId: String
+}
+
 input CreateMyProfileMutationInput {
   profile: ProfileInput!
   clientMutationId: String
@@ -199,6 +219,28 @@ enum EmailType {
   OTHER
 }
 
+type GDPRJobNode {
+  id: UUID!
+  jobType: GDPRJobType
+  status: GDPRJobStatus
+  attempts: Int!
+  createdAt: DateTime!
+  finishedAt: DateTime
+  result: JSONString
+}
+
+enum GDPRJobStatus {
+  PENDING
+  RUNNING
+  SUCCEEDED
+  FAILED
+}
+
+enum GDPRJobType {
+  DOWNLOAD
+  DELETE
+}
+
 scalar JSONString
 
 enum Language {
@@ -218,6 +260,8 @@ type Mutation {
   deleteMyProfile(input: DeleteMyProfileMutationInput!): DeleteMyProfileMutationPayload
   claimProfile(input: ClaimProfileMutationInput!): ClaimProfileMutationPayload
   createMyProfileTemporaryReadAccessToken(input: CreateMyProfileTemporaryReadAccessTokenMutationInput!): CreateMyProfileTemporaryReadAccessTokenMutationPayload
+  createMyProfileDownloadJob(input: CreateMyProfileDownloadJobMutationInput!): CreateMyProfileDownloadJobMutationPayload
+  createMyProfileDeletionJob(input: CreateMyProfileDeletionJobMutationInput!): CreateMyProfileDeletionJobMutationPayload
 }
 
 interface Node {
@@ -340,9 +384,10 @@ type Query {
   profile(id: ID!, serviceType: ServiceType!): ProfileNode
   myProfile: ProfileWithVerifiedPersonalInformationNode
   downloadMyProfile(authorizationCode: String!): JSONString
-  profiles(serviceType: ServiceType!, before: String, after: String, first: Int, last: Int, firstName: String, lastName: String, nickname: String, emails_Email: String, emails_EmailType: String, emails_Primary: Boolean, emails_Verified: Boolean, phones_Phone: String, phones_PhoneType: String, phones_Primary: Boolean, addresses_Address: String, addresses_PostalCode: String, addresses_City: String, addresses_CountryCode: String, addresses_AddressType: String, addresses_Primary: Boolean, language: String, enabledSubscriptions: String, orderBy: String): ProfileNodeConnection
+  profiles(serviceType: ServiceType!, before: String, after: String, first: Int, last: Int, firstName: String, lastName: String, nickname: String, emails_Email: String, emails_EmailType: String, emails_Primary: Boolean, emails_Verified: Boolean, phones_Phone: String, phones_PhoneType: String, phones_Primary: Boolean, addresses_Address: String, addresses_PostalCode: String, addresses_City: String, addresses_CountryCode: String, addresses_AddressType: String, addresses_Primary: Boolean, language: String, enabledSubscriptions: String, ssn: String, nationalIdentificationNumber: String, orderBy: String): ProfileNodeConnection
   claimableProfile(token: UUID!): ProfileNode
   profileWithAccessToken(token: UUID!): RestrictedProfileNode
+  myGdprJob(id: UUID!): GDPRJobNode
   _entities(representations: [_Any]): [_Entity]
   _service: _Service
 }
@@ -0,0 +1,77 @@
+import pytest
+from promise import Promise
+
+from open_city_profile.dataloaders import DataLoaderRegistry, InstrumentedDataLoader
+from open_city_profile.middlewares import clear_loaders, GQLDataLoaders
+
+
+class EchoLoader(InstrumentedDataLoader):
+    def load_batch(self, keys):
+        return Promise.resolve(list(keys))
+
+
+def test_loader_without_load_batch_cannot_be_created():
+    class IncompleteLoader(InstrumentedDataLoader):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteLoader()
+
+
+def test_registry_creates_loaders_lazily():
+    registry = DataLoaderRegistry({"echo": EchoLoader})
+
+    assert registry.stats() == {}
+    loader = registry.echo
+    assert isinstance(loader, EchoLoader)
+    assert registry.get("echo") is loader
+    assert list(registry.stats().keys()) == ["echo"]
+
+
+def test_registry_raises_attribute_error_for_unknown_loader():
+    registry = DataLoaderRegistry({"echo": EchoLoader})
+
+    assert getattr(registry, "unknown", None) is None
+
+
+def test_loader_stats_count_hits_misses_and_batches():
+    registry = DataLoaderRegistry({"echo": EchoLoader}, max_batch_size=2)
+
+    # Loads are only batched when they are made inside a promise chain, like
+    # they are during GraphQL execution
+    result = (
+        Promise.resolve(None)
+        .then(lambda _: Promise.all([registry.echo.load(k) for k in [1, 2, 3, 1]]))
+        .get()
+    )
+
+    assert result == [1, 2, 3, 1]
+    stats = registry.echo.stats
+    assert stats.as_dict() == {
+        "hits": 1,
+        "misses": 3,
+        "batches": 2,
+        "max_batch_size": 2,
+    }
+
+
+def test_gql_dataloaders_middleware_creates_registry_per_request(rf):
+    middleware = GQLDataLoaders()
+
+    class Info:
+        def __init__(self, context):
+            self.context = context
+
+    def next_resolver(root, info, **kwargs):
+        return info.context.loaders
+
+    request_1 = rf.post("/graphql")
+    request_2 = rf.post("/graphql")
+    loaders_1 = middleware.resolve(next_resolver, None, Info(request_1))
+    loaders_2 = middleware.resolve(next_resolver, None, Info(request_2))
+
+    assert loaders_1 is not loaders_2
+    assert middleware.resolve(next_resolver, None, Info(request_1)) is loaders_1
+
+    clear_loaders(request_1)
+    assert middleware.resolve(next_resolver, None, Info(request_1)) is not loaders_1
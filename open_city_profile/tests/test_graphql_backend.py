@@ -0,0 +1,71 @@
+import graphene
+
+from open_city_profile.graphql_backend import DocumentCache, ProfileGraphQLBackend
+from open_city_profile.schema import schema
+
+QUERY = "query { myProfile { firstName } }"
+
+
+def test_repeated_documents_are_parsed_and_validated_once(mocker):
+    backend = ProfileGraphQLBackend(cache_size=10)
+    validate = mocker.patch(
+        "open_city_profile.graphql_backend.validate", return_value=[]
+    )
+
+    first = backend.document_from_string(schema, QUERY)
+    second = backend.document_from_string(schema, QUERY)
+
+    assert second.document_ast is first.document_ast
+    assert validate.call_count == 1
+    assert backend.document_cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "size": 1,
+        "max_size": 10,
+    }
+
+
+def test_validation_errors_are_cached():
+    backend = ProfileGraphQLBackend(cache_size=10)
+
+    for i in range(2):
+        result = backend.document_from_string(schema, "query { unknown }").execute()
+        assert result.invalid
+        assert "unknown" in result.errors[0].message
+
+    assert backend.document_cache.hits == 1
+
+
+def test_least_recently_used_document_is_evicted():
+    cache = DocumentCache(max_size=2)
+    cache.set(schema, "a", "document a")
+    cache.set(schema, "b", "document b")
+    assert cache.get(schema, "a") == "document a"
+
+    cache.set(schema, "c", "document c")
+
+    assert cache.get(schema, "b") is None
+    assert cache.get(schema, "a") == "document a"
+    assert cache.get(schema, "c") == "document c"
+
+
+def test_cache_is_cleared_when_schema_changes():
+    class Query(graphene.ObjectType):
+        hello = graphene.String()
+
+    other_schema = graphene.Schema(query=Query)
+    cache = DocumentCache(max_size=2)
+    cache.set(schema, "a", "document a")
+
+    assert cache.get(other_schema, "a") is None
+    assert cache.get(schema, "a") is None
+
+
+def test_cache_can_be_disabled():
+    backend = ProfileGraphQLBackend(cache_size=0)
+
+    backend.document_from_string(schema, QUERY)
+    backend.document_from_string(schema, QUERY)
+
+    assert backend.document_cache.stats()["size"] == 0
+    assert backend.document_cache.hits == 0
@@ -0,0 +1,148 @@
+import json
+from contextlib import suppress
+from types import SimpleNamespace
+
+from promise import Promise
+
+from open_city_profile.instrumentation import (
+    CollectorSink,
+    get_sinks,
+    HistogramRegistry,
+    HistogramSink,
+    OperationTiming,
+    time_operation,
+)
+from open_city_profile.middlewares import GQLDataLoaders, GQLTiming
+from open_city_profile.schema import schema
+from profiles.tests.factories import EmailFactory, ProfileFactory
+
+COLLECTOR_SINK = "open_city_profile.instrumentation.CollectorSink"
+
+QUERY = """
+    query getMyProfile {
+        myProfile {
+            firstName
+            emails {
+                edges {
+                    node {
+                        email
+                    }
+                }
+            }
+        }
+    }
+"""
+
+
+def test_resolver_and_db_query_timings_are_recorded(rf, user, settings):
+    settings.GRAPHQL_TIMING_SINKS = [COLLECTOR_SINK]
+    collector = get_sinks()[0]
+    collector.clear()
+    profile = ProfileFactory(user=user)
+    EmailFactory.create_batch(2, profile=profile)
+    request = rf.post("/graphql")
+    request.user = user
+
+    with time_operation(request):
+        result = schema.execute(
+            QUERY, context_value=request, middleware=[GQLDataLoaders(), GQLTiming()]
+        )
+
+    assert not result.errors
+    [timing] = collector.timings
+    assert timing.operation_name == "getMyProfile"
+    assert timing.duration > 0
+    assert timing.db_query_count > 0
+    assert timing.resolvers["myProfile"].count == 1
+    assert timing.resolvers["myProfile.emails.edges.node.email"].count == 2
+    assert request.graphql_timing is None
+
+
+def timed_resolve(next):
+    timing = OperationTiming("getMyProfile")
+    info = SimpleNamespace(
+        context=SimpleNamespace(graphql_timing=timing),
+        operation=SimpleNamespace(name=None),
+        path=["myProfile", "emails"],
+    )
+    return GQLTiming().resolve(lambda root, info: next(), None, info), timing
+
+
+def test_settled_promises_are_timed_without_waiting_for_callbacks():
+    fulfilled = Promise.resolve("value")
+    rejected = Promise.reject(ValueError())
+
+    for promise in (fulfilled, rejected):
+        result, timing = timed_resolve(lambda: promise)
+
+        assert result is promise
+        assert timing.resolvers["myProfile.emails"].count == 1
+
+
+def test_pending_promises_are_timed_until_they_settle():
+    for settle in (
+        lambda promise: promise.do_resolve("value"),
+        lambda promise: promise.do_reject(ValueError()),
+    ):
+        promise = Promise()
+        result, timing = timed_resolve(lambda: promise)
+
+        assert "myProfile.emails" not in timing.resolvers
+        settle(promise)
+        with suppress(ValueError):
+            result.get()
+        assert timing.resolvers["myProfile.emails"].count == 1
+
+
+def test_operation_is_timed_by_the_view_when_enabled(client, settings):
+    settings.GRAPHQL_TIMING_ENABLED = True
+    settings.GRAPHQL_TIMING_SINKS = [COLLECTOR_SINK]
+    collector = get_sinks()[0]
+    collector.clear()
+
+    client.post(
+        "/graphql/",
+        json.dumps({"query": QUERY, "operationName": "getMyProfile"}),
+        content_type="application/json",
+    )
+
+    [timing] = collector.timings
+    assert timing.operation_name == "getMyProfile"
+    assert timing.duration > 0
+
+
+def test_operation_is_not_timed_when_disabled(client, settings):
+    settings.GRAPHQL_TIMING_ENABLED = False
+    settings.GRAPHQL_TIMING_SINKS = [COLLECTOR_SINK]
+    collector = get_sinks()[0]
+    collector.clear()
+
+    client.post(
+        "/graphql/", json.dumps({"query": QUERY}), content_type="application/json"
+    )
+
+    assert collector.timings == []
+
+
+def test_histogram_sink_records_operation_and_resolver_timings():
+    registry = HistogramRegistry()
+    timing = OperationTiming("getMyProfile")
+    timing.duration = 0.2
+    timing.add_resolver("myProfile", 0.15)
+
+    HistogramSink(registry).record(timing)
+    HistogramSink(registry).record(timing)
+
+    histogram = registry.get("graphql_operation_seconds", "getMyProfile")
+    assert histogram.count == 2
+    assert histogram.as_dict()["buckets"]["0.25"] == 2
+    assert registry.get("graphql_resolver_seconds", "myProfile").count == 2
+
+
+def test_collector_sink_keeps_timings():
+    sink = CollectorSink()
+    timing = OperationTiming()
+
+    sink.record(timing)
+
+    assert sink.timings == [timing]
@@ -1,8 +1,10 @@
+import threading
+
 import pytest
 from django.conf import settings
 
 from open_city_profile.exceptions import TokenExchangeError
-from open_city_profile.oidc import TunnistamoTokenExchange
+from open_city_profile.oidc import OIDCConfigCache, TunnistamoTokenExchange
 
 
 def test_authorization_code_exchange_successful(user, requests_mock):
@@ -36,3 +38,63 @@ def test_authorization_code_exchange_failed(requests_mock):
         tte.fetch_api_tokens("auth_code")
 
     assert str(e.value) == "Failed to obtain an access token."
+
+
+CONFIG_URL = f"{settings.TUNNISTAMO_OIDC_ENDPOINT}/.well-known/openid-configuration"
+CONFIG = {"token_endpoint": f"{settings.TUNNISTAMO_OIDC_ENDPOINT}/token"}
+
+
+def test_oidc_config_is_cached(requests_mock):
+    mocked_config = requests_mock.get(CONFIG_URL, json=CONFIG)
+
+    assert TunnistamoTokenExchange().get_oidc_config() == CONFIG
+    assert TunnistamoTokenExchange().get_oidc_config() == CONFIG
+
+    assert mocked_config.call_count == 1
+
+
+def test_oidc_config_is_shared_between_processes(requests_mock):
+    mocked_config = requests_mock.get(CONFIG_URL, json=CONFIG)
+    TunnistamoTokenExchange().get_oidc_config()
+
+    # A cache of another process finds the document from the shared cache
+    assert OIDCConfigCache().get(CONFIG_URL, TunnistamoTokenExchange().get) == CONFIG
+    assert mocked_config.call_count == 1
+
+
+@pytest.mark.parametrize("cache_control", ["max-age=0", "no-store"])
+def test_oidc_config_cache_headers_are_respected(requests_mock, cache_control):
+    mocked_config = requests_mock.get(
+        CONFIG_URL, json=CONFIG, headers={"Cache-Control": cache_control}
+    )
+
+    TunnistamoTokenExchange().get_oidc_config()
+    TunnistamoTokenExchange().get_oidc_config()
+
+    assert mocked_config.call_count == 2
+
+
+def test_oidc_config_is_fetched_once_by_concurrent_requests(requests_mock):
+    mocked_config = requests_mock.get(CONFIG_URL, json=CONFIG)
+    config_cache = OIDCConfigCache()
+    fetching = threading.Event()
+    release = threading.Event()
+
+    def slow_fetch(url):
+        fetching.set()
+        release.wait(5)
+        return TunnistamoTokenExchange().get(url)
+
+    threads = [
+        threading.Thread(target=config_cache.get, args=(CONFIG_URL, slow_fetch))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    fetching.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    config_cache.clear()
+
+    assert mocked_config.call_count == 1
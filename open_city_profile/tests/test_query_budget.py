@@ -0,0 +1,78 @@
+import logging
+
+import pytest
+
+from open_city_profile.query_budget import (
+    get_query_shape,
+    OperationQueries,
+    QueryBudgetExceeded,
+    track_queries,
+)
+from profiles.models import Profile
+from profiles.tests.factories import EmailFactory, ProfileFactory
+
+MY_PROFILE_QUERY = """
+    query getMyProfile {
+        myProfile {
+            firstName
+        }
+    }
+"""
+
+
+def test_in_lists_are_collapsed_in_query_shape():
+    assert get_query_shape("SELECT * FROM t WHERE id IN (%s, %s, %s)") == (
+        "SELECT * FROM t WHERE id IN (%s, ...)"
+    )
+
+
+def test_repeated_queries_are_grouped_by_resolver_path_and_shape():
+    queries = OperationQueries("getProfiles", budget=2)
+    for path in ["profiles", "profiles.emails", "profiles.emails"]:
+        queries.current_path = path
+        queries.db_query_wrapper(
+            lambda *args: None, "SELECT 1 WHERE id = %s", [1], False, {}
+        )
+
+    assert queries.is_over_budget()
+    assert queries.repeated_queries() == {
+        ("profiles.emails", "SELECT 1 WHERE id = %s"): 2
+    }
+    assert "2 x profiles.emails: SELECT 1 WHERE id = %s" in queries.report()
+
+
+def test_operation_over_budget_raises(rf, user_gql_client):
+    ProfileFactory(user=user_gql_client.user)
+    request = rf.post("/graphql")
+    request.user = user_gql_client.user
+
+    with pytest.raises(QueryBudgetExceeded):
+        with track_queries(request, budgets={"getMyProfile": 0}):
+            user_gql_client.execute(MY_PROFILE_QUERY, context=request)
+
+    assert request.graphql_queries is None
+
+
+def test_operation_over_budget_warns(rf, user_gql_client, caplog):
+    ProfileFactory(user=user_gql_client.user)
+    request = rf.post("/graphql")
+    request.user = user_gql_client.user
+
+    with caplog.at_level(logging.WARNING):
+        with track_queries(request, budget=0, mode="warn") as queries:
+            user_gql_client.execute(MY_PROFILE_QUERY, context=request)
+
+    assert queries.operation_name == "getMyProfile"
+    assert queries.queries[0][0] == "myProfile"
+    assert "Operation getMyProfile executed" in caplog.text
+
+
+def test_queries_outside_graphql_are_tracked(rf):
+    request = rf.post("/graphql")
+    EmailFactory(profile=ProfileFactory())
+
+    with track_queries(request, budget=10) as queries:
+        for profile in Profile.objects.all():
+            list(profile.emails.all())
+
+    assert queries.count == 2
@@ -0,0 +1,130 @@
+import json
+
+import pytest
+from graphql import parse
+
+from open_city_profile.consts import (
+    QUERY_COST_LIMIT_EXCEEDED_ERROR,
+    QUERY_DEPTH_LIMIT_EXCEEDED_ERROR,
+)
+from open_city_profile.query_cost import analyze_query_cost
+from open_city_profile.schema import schema
+
+PROFILES_QUERY = """
+    query getProfiles($first: Int) {
+        profiles(serviceType: BERTH, first: $first) {
+            edges {
+                node {
+                    firstName
+                    emails(first: 5) {
+                        edges {
+                            node {
+                                email
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+"""
+
+
+def _analyze(query, **kwargs):
+    return analyze_query_cost(schema, parse(query), **kwargs)
+
+
+def test_cost_is_multiplied_by_connection_page_sizes():
+    query_cost = _analyze(PROFILES_QUERY, variables={"first": 10})
+
+    assert query_cost.depth == 7
+    # profiles + 10 * (edges + node + emails) + 10 * 5 * (edges + node)
+    assert query_cost.cost == 1 + 10 * 3 + 50 * 2
+
+
+def test_connection_without_page_size_uses_default_page_size():
+    query_cost = _analyze(PROFILES_QUERY, default_page_size=20)
+
+    assert query_cost.cost == 1 + 20 * 3 + 100 * 2
+
+
+def test_fragments_are_included_in_cost_and_depth():
+    query = """
+        query getMyProfile {
+            myProfile {
+                ...profileFields
+            }
+        }
+
+        fragment profileFields on ProfileNode {
+            firstName
+            primaryEmail {
+                email
+            }
+        }
+    """
+
+    assert tuple(_analyze(query)) == (3, 2)
+
+
+def test_introspection_fields_are_ignored():
+    query = """
+        query {
+            __schema {
+                types {
+                    fields {
+                        type {
+                            ofType {
+                                name
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    """
+
+    assert tuple(_analyze(query)) == (0, 0)
+
+
+def _post_query(client, query, variables=None):
+    return client.post(
+        "/graphql/",
+        json.dumps({"query": query, "variables": variables}),
+        content_type="application/json",
+    )
+
+
+def test_query_cost_is_reported_in_extensions(client, settings):
+    settings.GRAPHQL_QUERY_MAX_DEPTH = 10
+    settings.GRAPHQL_QUERY_MAX_COST = 1000
+
+    response = _post_query(client, PROFILES_QUERY, {"first": 10})
+
+    assert response.json()["extensions"]["cost"] == {
+        "depth": 7,
+        "cost": 131,
+        "maxDepth": 10,
+        "maxCost": 1000,
+    }
+
+
+@pytest.mark.parametrize(
+    "max_depth,max_cost,error_code",
+    [
+        (6, 1000, QUERY_DEPTH_LIMIT_EXCEEDED_ERROR),
+        (10, 130, QUERY_COST_LIMIT_EXCEEDED_ERROR),
+    ],
+)
+def test_too_complex_query_is_rejected(
+    client, settings, max_depth, max_cost, error_code
+):
+    settings.GRAPHQL_QUERY_MAX_DEPTH = max_depth
+    settings.GRAPHQL_QUERY_MAX_COST = max_cost
+
+    response = _post_query(client, PROFILES_QUERY, {"first": 10})
+
+    assert response.status_code == 400
+    content = response.json()
+    assert "data" not in content
+    assert [error["extensions"]["code"] for error in content["errors"]] == [error_code]
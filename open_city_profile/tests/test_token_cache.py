@@ -0,0 +1,198 @@
+import threading
+import time
+import uuid
+
+import pytest
+from django.core.cache import cache
+from jose import jwt
+
+from open_city_profile.oidc import (
+    CachingRequestJWTAuthentication,
+    get_revoked_user_cache_key,
+    GraphQLApiTokenAuthentication,
+    jwks_cache,
+    verified_token_cache,
+)
+from users.models import User
+
+from .authentication_tests_base import (
+    AUDIENCE,
+    CONFIG_URL,
+    CONFIGURATION,
+    ISSUER,
+    JWKS_URL,
+    KEYS,
+)
+from .conftest import get_unix_timestamp_now
+from .keys import rsa_key
+
+
+def create_token(headers=None, **claims):
+    now = get_unix_timestamp_now()
+    data = {
+        "iss": ISSUER,
+        "iat": now - 10,
+        "aud": AUDIENCE,
+        "sub": str(uuid.uuid4()),
+        "exp": now + 120,
+    }
+    data.update(claims)
+    return jwt.encode(
+        data,
+        key=rsa_key.private_key_pem,
+        algorithm=rsa_key.jose_algorithm,
+        headers=headers,
+    )
+
+
+@pytest.fixture
+def issuer_mock(requests_mock):
+    requests_mock.get(CONFIG_URL, json=CONFIGURATION)
+    return requests_mock.get(JWKS_URL, json=KEYS)
+
+
+def test_verified_token_is_not_verified_again(
+    rf, issuer_mock, django_assert_num_queries
+):
+    token = create_token()
+    request = rf.get("/graphql", HTTP_AUTHORIZATION="Bearer " + token)
+    user_auth = CachingRequestJWTAuthentication().authenticate(request)
+
+    with django_assert_num_queries(0):
+        cached_user_auth = CachingRequestJWTAuthentication().authenticate(request)
+
+    assert issuer_mock.call_count == 1
+    assert cached_user_auth.user == user_auth.user
+    assert cached_user_auth.user is not user_auth.user
+    assert cached_user_auth.data == user_auth.data
+
+
+def test_api_token_authentication_uses_the_verified_tokens(
+    rf, issuer_mock, django_assert_num_queries
+):
+    request = rf.get("/graphql", HTTP_AUTHORIZATION="Bearer " + create_token())
+    user = GraphQLApiTokenAuthentication().authenticate(request)
+
+    with django_assert_num_queries(0):
+        cached_user = GraphQLApiTokenAuthentication().authenticate(request)
+
+    assert cached_user == user
+    assert request.user_auth.user == user
+
+
+def test_tokens_are_not_cached_past_their_expiration(user):
+    token = create_token(exp=get_unix_timestamp_now() - 1)
+    verified_token_cache.set(token, user, jwt.get_unverified_claims(token))
+
+    assert verified_token_cache.get(token) is None
+
+
+def test_least_recently_used_tokens_are_dropped(user, settings):
+    settings.JWT_VERIFICATION_CACHE_SIZE = 2
+    tokens = [create_token() for _ in range(3)]
+    for token in tokens[:2]:
+        verified_token_cache.set(token, user, jwt.get_unverified_claims(token))
+    verified_token_cache.get(tokens[0])
+
+    verified_token_cache.set(tokens[2], user, jwt.get_unverified_claims(tokens[2]))
+
+    assert verified_token_cache.get(tokens[0]) is not None
+    assert verified_token_cache.get(tokens[1]) is None
+    assert verified_token_cache.get(tokens[2]) is not None
+
+
+def test_deleted_user_is_not_authenticated_with_a_cached_token(rf, issuer_mock):
+    request = rf.get("/graphql", HTTP_AUTHORIZATION="Bearer " + create_token())
+    user = CachingRequestJWTAuthentication().authenticate(request).user
+
+    user.delete()
+    user_auth = CachingRequestJWTAuthentication().authenticate(request)
+
+    assert user_auth.user.pk != user.pk
+    assert User.objects.filter(pk=user_auth.user.pk).exists()
+
+
+def test_tokens_of_a_deactivated_user_are_dropped(user):
+    token = create_token()
+    verified_token_cache.set(token, user, jwt.get_unverified_claims(token))
+
+    user.is_active = False
+    user.save()
+
+    assert verified_token_cache.get(token) is None
+
+
+def test_tokens_revoked_by_another_process_are_dropped(user):
+    token = create_token()
+    verified_token_cache.set(token, user, jwt.get_unverified_claims(token))
+
+    cache.set(get_revoked_user_cache_key(user.pk), time.time())
+
+    assert verified_token_cache.get(token) is None
+
+
+def test_changed_user_is_verified_again(user):
+    token = create_token()
+    verified_token_cache.set(token, user, jwt.get_unverified_claims(token))
+
+    user.first_name = "Changed"
+    user.save()
+
+    assert verified_token_cache.get(token) is None
+
+
+@pytest.mark.parametrize("min_refresh_interval,call_count", [(0, 2), (60, 1)])
+def test_keys_are_refetched_for_an_unknown_key_id(
+    issuer_mock, settings, min_refresh_interval, call_count
+):
+    settings.JWKS_MIN_REFRESH_INTERVAL = min_refresh_interval
+    jwks_cache.get_keys(ISSUER)
+
+    jwks_cache.get_keys(ISSUER, "rotated")
+
+    assert issuer_mock.call_count == call_count
+
+
+def test_token_signed_with_a_rotated_key_is_verified(rf, requests_mock, settings):
+    settings.JWKS_MIN_REFRESH_INTERVAL = 0
+    requests_mock.get(CONFIG_URL, json=CONFIGURATION)
+    rotated_key = dict(rsa_key.public_key_jwk, kid="rotated")
+    requests_mock.get(
+        JWKS_URL, [{"json": {"keys": []}}, {"json": {"keys": [rotated_key]}}]
+    )
+    jwks_cache.get_keys(ISSUER)
+    token = create_token(headers={"kid": "rotated"})
+    request = rf.get("/graphql", HTTP_AUTHORIZATION="Bearer " + token)
+
+    user_auth = CachingRequestJWTAuthentication().authenticate(request)
+
+    assert user_auth.data["sub"] == jwt.get_unverified_claims(token)["sub"]
+
+
+def test_cached_keys_are_used_while_another_thread_fetches_them(issuer_mock, settings):
+    keys = jwks_cache.get_keys(ISSUER)
+    settings.JWKS_CACHE_TTL = 0
+
+    with jwks_cache._get_issuer_lock(ISSUER):
+        assert jwks_cache.get_keys(ISSUER) == keys
+
+    assert issuer_mock.call_count == 1
+
+
+def test_fetching_keys_does_not_block_other_issuers(requests_mock):
+    other_issuer = "https://other.example.com/openid"
+    requests_mock.get(
+        other_issuer + "/.well-known/openid-configuration",
+        json={"issuer": other_issuer, "jwks_uri": other_issuer + "/jwks"},
+    )
+    requests_mock.get(other_issuer + "/jwks", json=KEYS)
+    fetched = []
+
+    with jwks_cache._get_issuer_lock(ISSUER):
+        thread = threading.Thread(
+            target=lambda: fetched.append(jwks_cache.get_keys(other_issuer))
+        )
+        thread.start()
+        thread.join(timeout=5)
+
+    assert fetched == [KEYS]
@@ -1,9 +1,10 @@
+from contextlib import ExitStack
+
 import sentry_sdk
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied, ValidationError
 from graphene_django.views import GraphQLView as BaseGraphQLView
 from graphql_jwt.exceptions import PermissionDenied as JwtPermissionDenied
-from helusers.oidc import RequestJWTAuthentication
 
 from open_city_profile.consts import (
     API_NOT_IMPLEMENTED_ERROR,
@@ -11,6 +12,7 @@ from open_city_profile.consts import (
     CONNECTED_SERVICE_DELETION_FAILED_ERROR,
     CONNECTED_SERVICE_DELETION_NOT_ALLOWED_ERROR,
     GENERAL_ERROR,
+    INVALID_CURSOR_ERROR,
     INVALID_EMAIL_FORMAT_ERROR,
     MISSING_GDPR_API_TOKEN_ERROR,
     OBJECT_DOES_NOT_EXIST_ERROR,
@@ -18,6 +20,8 @@ from open_city_profile.consts import (
     PROFILE_DOES_NOT_EXIST_ERROR,
     PROFILE_HAS_NO_PRIMARY_EMAIL_ERROR,
     PROFILE_MUST_HAVE_ONE_PRIMARY_EMAIL,
+    QUERY_COST_LIMIT_EXCEEDED_ERROR,
+    QUERY_DEPTH_LIMIT_EXCEEDED_ERROR,
     SERVICE_CONNECTION_ALREADY_EXISTS_ERROR,
     TOKEN_EXPIRED_ERROR,
     VALIDATION_ERROR,
@@ -27,15 +31,23 @@ from open_city_profile.exceptions import (
     CannotPerformThisActionWithGivenServiceType,
     ConnectedServiceDeletionFailedError,
     ConnectedServiceDeletionNotAllowedError,
+    InvalidCursorError,
     InvalidEmailFormatError,
     MissingGDPRApiTokenError,
     ProfileDoesNotExistError,
     ProfileGraphQLError,
     ProfileHasNoPrimaryEmailError,
     ProfileMustHaveOnePrimaryEmail,
+    QueryCostLimitExceededError,
+    QueryDepthLimitExceededError,
     ServiceAlreadyExistsError,
     TokenExpiredError,
 )
+from open_city_profile.graphql_backend import graphql_backend
+from open_city_profile.instrumentation import time_operation
+from open_city_profile.middlewares import clear_loaders
+from open_city_profile.oidc import CachingRequestJWTAuthentication
+from open_city_profile.query_budget import track_queries
 from profiles.models import Profile
 
 error_codes_shared = {
@@ -48,6 +60,9 @@ error_codes_shared = {
     ValidationError: VALIDATION_ERROR,
     CannotPerformThisActionWithGivenServiceType: CANNOT_PERFORM_THIS_ACTION_WITH_GIVEN_SERVICE_TYPE_ERROR,
     InvalidEmailFormatError: INVALID_EMAIL_FORMAT_ERROR,
+    InvalidCursorError: INVALID_CURSOR_ERROR,
+    QueryDepthLimitExceededError: QUERY_DEPTH_LIMIT_EXCEEDED_ERROR,
+    QueryCostLimitExceededError: QUERY_COST_LIMIT_EXCEEDED_ERROR,
 }
 
 error_codes_profile = {
@@ -72,11 +87,15 @@ error_codes = {**error_codes_shared, **error_codes_profile}
 
 
 class GraphQLView(BaseGraphQLView):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("backend", graphql_backend)
+        super().__init__(*args, **kwargs)
+
     @staticmethod
     def _authenticate(request):
         if settings.USE_HELUSERS_REQUEST_JWT_AUTH:
             try:
-                authenticator = RequestJWTAuthentication()
+                authenticator = CachingRequestJWTAuthentication()
                 user_auth = authenticator.authenticate(request)
                 if user_auth is not None:
                     request.user_auth = user_auth
@@ -88,7 +107,26 @@ class GraphQLView(BaseGraphQLView):
         """Extract any exceptions and send some of them to Sentry"""
         self._authenticate(request)
 
-        result = super().execute_graphql_request(request, data, query, *args, **kwargs)
+        operation_name = data.get("operationName")
+        try:
+            with ExitStack() as stack:
+                if settings.GRAPHQL_TIMING_ENABLED:
+                    stack.enter_context(time_operation(request, operation_name))
+                if settings.GRAPHQL_QUERY_BUDGET_MODE != "off":
+                    stack.enter_context(
+                        track_queries(
+                            request,
+                            operation_name,
+                            budgets=settings.GRAPHQL_QUERY_BUDGETS,
+                            mode=settings.GRAPHQL_QUERY_BUDGET_MODE,
+                        )
+                    )
+                result = super().execute_graphql_request(
+                    request, data, query, *args, **kwargs
+                )
+        finally:
+            clear_loaders(request)
+
         # If 'invalid' is set, it's a bad request
         if result and result.errors and not result.invalid:
             errors = [
@@ -105,6 +143,41 @@ class GraphQLView(BaseGraphQLView):
                 self._capture_sentry_exceptions(result.errors, query)
         return result
 
+    def get_response(self, request, data, show_graphiql=False):
+        """Same as the base implementation, but includes the result extensions"""
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                response["errors"] = [
+                    self.format_error(e) for e in execution_result.errors
+                ]
+
+            if execution_result.invalid:
+                status_code = 400
+            else:
+                response["data"] = execution_result.data
+
+            if execution_result.extensions:
+                response["extensions"] = execution_result.extensions
+
+            if self.batch:
+                response["id"] = id
+                response["status"] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
     def _capture_sentry_exceptions(self, errors, query):
         with sentry_sdk.configure_scope() as scope:
             scope.set_extra("graphql_query", query)
@@ -126,7 +199,10 @@ class GraphQLView(BaseGraphQLView):
         try:
             error_code = get_error_code(error.original_error.__class__)
         except AttributeError:
-            error_code = GENERAL_ERROR
+            if isinstance(error, ProfileGraphQLError):
+                error_code = get_error_code(error.__class__)
+            else:
+                error_code = GENERAL_ERROR
         formatted_error = super(GraphQLView, GraphQLView).format_error(error)
         if error_code and (
             isinstance(formatted_error, dict)
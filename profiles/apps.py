@@ -10,7 +10,9 @@ class ProfilesConfig(AppConfig):
         import profiles.notifications  # noqa isort:skip
 
     def ready(self):
+        import profiles.contact_signals  # noqa isort:skip
         import profiles.log_signals  # noqa isort:skip
+        import profiles.lookups  # noqa isort:skip
 
         if settings.NOTIFICATIONS_ENABLED:
             import profiles.signals  # noqa isort:skip
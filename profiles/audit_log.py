@@ -0,0 +1,214 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from profiles.models import AuditLogEntry
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FULL_POLICIES = ("block", "drop", "sync")
+
+# Put on the queue to wake up the writer thread when shutting down
+_STOP = object()
+
+
+class LoggerSink:
+    """Writes each audit event as a JSON line to the "audit" logger."""
+
+    def __init__(self, logger_name="audit"):
+        self.logger = logging.getLogger(logger_name)
+
+    def write(self, events):
+        for event in events:
+            self.logger.info(json.dumps(event))
+
+
+class FileSink:
+    """Appends each audit event as a JSON line to AUDIT_LOG_FILENAME."""
+
+    def __init__(self, filename=None):
+        self.filename = filename or settings.AUDIT_LOG_FILENAME
+        self._lock = threading.Lock()
+
+    def write(self, events):
+        lines = "".join(json.dumps(event) + "\n" for event in events)
+        with self._lock, open(self.filename, "a") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class DatabaseSink:
+    """Inserts the audit events to the AuditLogEntry table."""
+
+    def write(self, events):
+        AuditLogEntry.objects.bulk_create(
+            [AuditLogEntry(message=event) for event in events]
+        )
+
+
+class AuditLogWriter:
+    """Writes audit events to a sink from a background thread.
+
+    Events are put on a bounded queue and written in batches of at most
+    `batch_size` events, at the latest `flush_interval` seconds after they
+    were emitted. When the queue is full, `queue_full_policy` decides what
+    happens to a new event:
+
+    - "block": wait for the writer to make room in the queue
+    - "drop": discard the event and count it in `dropped`
+    - "sync": write the event to the sink in the emitting thread
+
+    The queue is drained when the process exits. If `asynchronous` is
+    false, events are written right away in the emitting thread.
+    """
+
+    def __init__(
+        self,
+        sink,
+        asynchronous=True,
+        max_queue_size=10000,
+        batch_size=100,
+        flush_interval=1.0,
+        queue_full_policy="sync",
+    ):
+        if queue_full_policy not in QUEUE_FULL_POLICIES:
+            raise ValueError(
+                "Invalid audit log queue full policy: '{}'".format(queue_full_policy)
+            )
+        self.sink = sink
+        self.asynchronous = asynchronous
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_full_policy = queue_full_policy
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+
+    def _ensure_started(self):
+        # A forked worker process inherits the queue but not the thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(self.max_queue_size)
+            self._thread = threading.Thread(
+                target=self._run, name="audit-log-writer", daemon=True
+            )
+            self._stopping = False
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def emit(self, event):
+        if not self.asynchronous or self._stopping:
+            self._write([event])
+            return
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            if self.queue_full_policy == "block":
+                self._queue.put(event)
+            elif self.queue_full_policy == "drop":
+                self.dropped += 1
+                logger.warning("Audit log queue is full, dropped an audit event")
+            else:
+                self._write([event])
+
+    def _write(self, events):
+        try:
+            self.sink.write(events)
+        except Exception:
+            logger.exception("Writing %s audit events failed", len(events))
+
+    def _take_batch(self, block):
+        batch = []
+        try:
+            event = self._queue.get(block, self.flush_interval)
+            while event is not _STOP:
+                batch.append(event)
+                if len(batch) == self.batch_size:
+                    break
+                event = self._queue.get_nowait()
+            else:
+                self._queue.task_done()
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write_batch(self, batch):
+        if batch:
+            self._write(batch)
+            for event in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        while not self._stopping:
+            self._write_batch(self._take_batch(block=True))
+            close_old_connections()
+
+    def flush(self):
+        """Wait until the events emitted so far have been written."""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def shutdown(self, timeout=5):
+        """Stop the writer thread and write the remaining events synchronously."""
+        if self._pid != os.getpid():
+            return
+        self._stopping = True
+        try:
+            # Wakes up the writer thread waiting for events
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch and self._queue.empty():
+                break
+            self._write_batch(batch)
+
+
+_writer = None
+_writer_config = None
+
+
+def get_audit_log_writer():
+    """Return the audit log writer configured in the settings."""
+    global _writer, _writer_config
+
+    config = (
+        settings.AUDIT_LOG_SINK,
+        settings.AUDIT_LOG_ASYNC,
+        settings.AUDIT_LOG_QUEUE_SIZE,
+        settings.AUDIT_LOG_BATCH_SIZE,
+        settings.AUDIT_LOG_FLUSH_INTERVAL,
+        settings.AUDIT_LOG_QUEUE_FULL_POLICY,
+    )
+    if config != _writer_config:
+        if _writer is not None:
+            _writer.shutdown()
+        sink_path, asynchronous, *options = config
+        _writer = AuditLogWriter(import_string(sink_path)(), asynchronous, *options)
+        _writer_config = config
+    return _writer
+
+
+@atexit.register
+def shutdown_audit_log_writer():
+    if _writer is not None:
+        _writer.shutdown()
@@ -0,0 +1,149 @@
+import hashlib
+import hmac
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from django.db.models import Case, Q, Value, When
+
+# Separates the key id from the digest in the stored blind index
+SEPARATOR = "$"
+
+
+def normalize(value):
+    return value.strip().upper()
+
+
+def get_key_id(key):
+    """Return a short identifier of a blind index key for finding rows to rehash."""
+    return hashlib.sha256(key.encode()).hexdigest()[:8]
+
+
+def get_current_key_id():
+    keys = get_keys()
+    return get_key_id(keys[0]) if keys else None
+
+
+def get_keys():
+    """Return the blind index keys, the current key first."""
+    return settings.BLIND_INDEX_KEYS
+
+
+def compute_blind_index(value, key):
+    digest = hmac.new(
+        bytes.fromhex(key), normalize(value).encode(), hashlib.sha256
+    ).hexdigest()
+    return get_key_id(key) + SEPARATOR + digest
+
+
+def get_blind_index(value):
+    """Return the blind index of the value with the current key."""
+    keys = get_keys()
+    if not value or not keys:
+        return ""
+    return compute_blind_index(value, keys[0])
+
+
+def get_lookup_blind_indexes(value):
+    """Return the blind indexes of the value with each of the configured keys.
+
+    Rows which haven't been rehashed with the current key yet are found with
+    the index computed with the key they were hashed with.
+    """
+    keys = get_keys()
+    if not keys:
+        raise ImproperlyConfigured(
+            "BLIND_INDEX_KEYS must be set for blind index lookups"
+        )
+    return [compute_blind_index(value, key) for key in keys]
+
+
+class BlindIndexField(models.CharField):
+    """Keyed HMAC of another field of the model, for exact match lookups.
+
+    The index is computed from the `source` field whenever the instance is
+    saved, also when it's created with `bulk_create`. It's prefixed with the
+    id of the key used, so that the rows hashed with an old key can be found
+    and rehashed with the `update_blind_indexes` management command after the
+    key is rotated.
+    """
+
+    def __init__(self, *args, source, **kwargs):
+        self.source = source
+        kwargs.setdefault("max_length", 73)
+        kwargs.setdefault("blank", True)
+        kwargs.setdefault("editable", False)
+        kwargs.setdefault("db_index", True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["source"] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = get_blind_index(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+def get_blind_index_fields(model):
+    return [
+        field
+        for field in model._meta.get_fields()
+        if isinstance(field, BlindIndexField)
+    ]
+
+
+def update_blind_indexes(model, field, batch_size=1000):
+    """Recompute the blind indexes which weren't computed with the current key.
+
+    The rows are processed in batches in primary key order, each batch in its
+    own transaction. An index changed by a concurrent save is left as it is.
+    Returns the number of updated rows.
+    """
+    key_id = get_current_key_id()
+    if key_id is None:
+        raise ImproperlyConfigured("BLIND_INDEX_KEYS must be set for updating indexes")
+
+    queryset = (
+        model.objects.exclude(**{field.attname + "__startswith": key_id + SEPARATOR})
+        .order_by("pk")
+        .values_list("pk", field.source, field.attname)
+    )
+    updated = 0
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(batch[:batch_size])
+        if not rows:
+            return updated
+        last_pk = rows[-1][0]
+
+        changes = [
+            (pk, old_index, get_blind_index(value)) for pk, value, old_index in rows
+        ]
+        changes = [change for change in changes if change[1] != change[2]]
+        if changes:
+            # Only the rows whose index is still the one read are updated
+            condition = reduce(
+                or_,
+                (
+                    Q(pk=pk, **{field.attname: old_index})
+                    for pk, old_index, _ in changes
+                ),
+            )
+            with transaction.atomic():
+                updated += model.objects.filter(condition).update(
+                    **{
+                        field.attname: Case(
+                            *(
+                                When(pk=pk, then=Value(index))
+                                for pk, _, index in changes
+                            ),
+                            output_field=models.CharField(),
+                        )
+                    }
+                )
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Address, Email, ProfilePrimaryContactInfo
+
+
+@receiver(post_save, sender=Address)
+@receiver(post_save, sender=Email)
+def update_primary_contact_info_on_save(sender, instance, **kwargs):
+    ProfilePrimaryContactInfo.update_for_profile(instance.profile_id)
+
+
+@receiver(post_delete, sender=Address)
+@receiver(post_delete, sender=Email)
+def update_primary_contact_info_on_delete(sender, instance, **kwargs):
+    # The contacts are also deleted along with their profile, in which case
+    # the row may have been deleted already and must not be created again.
+    ProfilePrimaryContactInfo.update_for_profile(instance.profile_id, create=False)
@@ -5,7 +5,7 @@ from django.utils.translation import ugettext_lazy as _
 from graphql.execution.base import ResolveInfo
 
 from profiles.utils import set_current_service
-from services.models import Service
+from services.permissions import get_service_permission_checker
 
 
 def context(f):
@@ -37,9 +37,10 @@ def staff_required(required_permission="view"):
                         required_permission
                     )
                 )
-            service = Service.objects.get(service_type=kwargs["service_type"])
+            permissions = get_service_permission_checker(context)
+            service = permissions.get_service(kwargs["service_type"])
             set_current_service(service.service_type)
-            if context.user.has_perm(
+            if permissions.has_perm(
                 "can_{}_profiles".format(required_permission), service
             ):
                 return function(*args, **kwargs)
@@ -0,0 +1,210 @@
+import json
+import multiprocessing
+import os
+import time
+
+from django.apps import apps
+from django.db import connection, connections, models, transaction
+from django.db.models import Case, ExpressionWrapper, F, Value, When
+from encrypted_fields import fields
+
+ENCRYPTED_FIELD_TYPES = (fields.EncryptedCharField, fields.EncryptedTextField)
+
+
+def get_encrypted_fields(model):
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if isinstance(field, ENCRYPTED_FIELD_TYPES)
+    ]
+
+
+def get_encrypted_models():
+    return [model for model in apps.get_models() if get_encrypted_fields(model)]
+
+
+def get_chunks(model, chunk_size, start_after=None):
+    """Return the (first pk, last pk) ranges of the rows in chunks of `chunk_size`.
+
+    The primary keys are streamed from the database with a server-side cursor.
+    """
+    pks = model.objects.order_by("pk").values_list("pk", flat=True)
+    if start_after is not None:
+        pks = pks.filter(pk__gt=start_after)
+
+    chunks = []
+    first = last = None
+    count = 0
+    for pk in pks.iterator(chunk_size=chunk_size):
+        if first is None:
+            first = pk
+        last = pk
+        count += 1
+        if count == chunk_size:
+            chunks.append((first, last))
+            first = None
+            count = 0
+    if first is not None:
+        chunks.append((first, last))
+    return chunks
+
+
+def _decrypt(field, raw_value):
+    if raw_value is None:
+        return None
+    return field.from_db_value(raw_value, None, connection)
+
+
+def reencrypt_chunk(task):
+    """Re-encrypt the encrypted fields of the rows in a pk range with the current key.
+
+    The rows are locked for the duration of the update and read with a
+    server-side cursor. They are decrypted from the raw column values, so
+    no model instances are created and no model signals are sent. Rows which
+    can't be decrypted with any of the FIELD_ENCRYPTION_KEYS are left as they
+    are. With `dry_run`, the rows are only decrypted.
+
+    Returns the last pk of the range, the number of rows processed and the pks
+    of the rows which couldn't be decrypted.
+    """
+    model_label, first_pk, last_pk, dry_run = task
+    model = apps.get_model(model_label)
+    encrypted_fields = get_encrypted_fields(model)
+    # Selected as binary, so that the fields don't decrypt the values
+    raw_values = {
+        "raw_{}".format(field.name): ExpressionWrapper(
+            F(field.name), output_field=models.BinaryField()
+        )
+        for field in encrypted_fields
+    }
+
+    with transaction.atomic():
+        rows = model.objects.filter(pk__gte=first_pk, pk__lte=last_pk)
+        if not dry_run:
+            rows = rows.select_for_update()
+        rows = (
+            rows.annotate(**raw_values)
+            .order_by("pk")
+            .values_list("pk", *raw_values.keys())
+        )
+
+        values = {}
+        failed = []
+        for pk, *row in rows.iterator():
+            try:
+                values[pk] = [
+                    _decrypt(field, raw_value)
+                    for field, raw_value in zip(encrypted_fields, row)
+                ]
+            except Exception:
+                failed.append(pk)
+
+        if values and not dry_run:
+            # Values written through the fields are encrypted with the current key
+            model.objects.filter(pk__in=values.keys()).update(
+                **{
+                    field.attname: Case(
+                        *(
+                            When(pk=pk, then=Value(row[index], output_field=field))
+                            for pk, row in values.items()
+                        ),
+                        output_field=field,
+                    )
+                    for index, field in enumerate(encrypted_fields)
+                }
+            )
+
+    return last_pk, len(values), failed
+
+
+class Checkpoint:
+    """Last re-encrypted pk of each model, stored as JSON in a file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.positions = {}
+        if filename and os.path.exists(filename):
+            with open(filename) as f:
+                self.positions = json.load(f)
+
+    def get(self, model_label):
+        return self.positions.get(model_label)
+
+    def delete(self):
+        self.positions = {}
+        if self.filename and os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def set(self, model_label, pk):
+        self.positions[model_label] = pk
+        if self.filename:
+            # Replaced atomically, so that an interrupted write can't corrupt it
+            tmp_filename = self.filename + ".tmp"
+            with open(tmp_filename, "w") as f:
+                # UUID primary keys are stored as strings
+                json.dump(self.positions, f, default=str)
+            os.replace(tmp_filename, self.filename)
+
+
+def reencrypt_model(
+    model,
+    chunk_size=1000,
+    processes=1,
+    dry_run=False,
+    checkpoint=None,
+    report=None,
+    report_interval=10,
+):
+    """Re-encrypt the encrypted fields of all the rows of the model in parallel.
+
+    The rows are processed in pk order in chunks of `chunk_size` rows, each
+    chunk in its own transaction. The last pk of the processed rows is saved to
+    the `checkpoint` after each chunk, so an interrupted run continues where it
+    stopped. `report` is called with the number of processed rows, the number
+    of rows to process and the rate per second at most every `report_interval`
+    seconds and once at the end.
+
+    Returns the number of processed rows and the pks of the rows which couldn't
+    be decrypted.
+    """
+    model_label = model._meta.label
+    start_after = None
+    if checkpoint is not None and not dry_run:
+        start_after = checkpoint.get(model_label)
+    chunks = get_chunks(model, chunk_size, start_after)
+    rows = model.objects.all()
+    if start_after is not None:
+        rows = rows.filter(pk__gt=start_after)
+    total = rows.count()
+    tasks = [(model_label, first, last, dry_run) for first, last in chunks]
+
+    processed = 0
+    failed = []
+    started_at = reported_at = time.monotonic()
+
+    def record(results):
+        nonlocal processed, reported_at
+        # Results come in the order of the chunks, so the checkpoint never
+        # skips over a chunk which hasn't been processed yet
+        for last_pk, count, chunk_failed in results:
+            processed += count
+            failed.extend(chunk_failed)
+            if checkpoint is not None and not dry_run:
+                checkpoint.set(model_label, last_pk)
+            now = time.monotonic()
+            if report and now - reported_at >= report_interval:
+                report(processed, total, processed / (now - started_at))
+                reported_at = now
+
+    if processes <= 1:
+        record(map(reencrypt_chunk, tasks))
+    else:
+        # Forked processes must not share the database connections of the parent
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            record(pool.imap(reencrypt_chunk, tasks))
+
+    if report:
+        elapsed = time.monotonic() - started_at
+        report(processed, total, processed / elapsed if elapsed else 0.0)
+    return processed, failed
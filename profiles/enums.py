@@ -72,3 +72,25 @@ class AddressType(Enum):
         WORK = _("Work address")
         HOME = _("Home address")
         OTHER = _("Other address")
+
+
+class GDPRJobType(Enum):
+    DOWNLOAD = "download"
+    DELETE = "delete"
+
+    class Labels:
+        DOWNLOAD = _("Download the profile data")
+        DELETE = _("Delete the profile")
+
+
+class GDPRJobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    class Labels:
+        PENDING = _("Waiting to be run")
+        RUNNING = _("Running")
+        SUCCEEDED = _("Succeeded")
+        FAILED = _("Failed")
@@ -0,0 +1,342 @@
+import json
+import logging
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from open_city_profile.exceptions import (
+    ConnectedServiceDeletionFailedError,
+    ConnectedServiceDeletionNotAllowedError,
+    MissingGDPRApiTokenError,
+    ProfileDoesNotExistError,
+)
+from services.exceptions import MissingGDPRUrlException
+from services.gdpr import call_services_concurrently, GDPRRequestStatus
+from users.models import User
+
+from .enums import GDPRJobStatus, GDPRJobType
+from .models import GDPRJob, Profile
+
+logger = logging.getLogger(__name__)
+
+
+def _get_api_token(service, scope, api_tokens):
+    api_identifier = scope.rsplit(".", 1)[0]
+    api_token = api_tokens.get(api_identifier, "")
+
+    if not api_token:
+        raise MissingGDPRApiTokenError(
+            f"Couldn't fetch an API token for service {service.service_type.name}."
+        )
+    return api_token
+
+
+def get_download_api_tokens(profile, api_tokens):
+    """Return the connections of the profile to the services with a GDPR query API
+    and the API tokens of the services by connection pk."""
+    service_connections = [
+        service_connection
+        for service_connection in profile.service_connections.select_related("service")
+        if service_connection.service.gdpr_query_scope
+    ]
+    service_api_tokens = {
+        service_connection.pk: _get_api_token(
+            service_connection.service,
+            service_connection.service.gdpr_query_scope,
+            api_tokens,
+        )
+        for service_connection in service_connections
+    }
+    return service_connections, service_api_tokens
+
+
+def get_delete_api_tokens(profile, api_tokens):
+    """Return the connections of the profile to the services and the API tokens of
+    the services by connection pk. All the services must have a GDPR delete API."""
+    service_connections = list(profile.service_connections.select_related("service"))
+    service_api_tokens = {}
+
+    for service_connection in service_connections:
+        service = service_connection.service
+
+        if not service.gdpr_delete_scope:
+            raise ConnectedServiceDeletionNotAllowedError(
+                f"Connected services: {service.service_type.name}"
+                f"does not have an API for removing data."
+            )
+
+        service_api_tokens[service_connection.pk] = _get_api_token(
+            service, service.gdpr_delete_scope, api_tokens
+        )
+    return service_connections, service_api_tokens
+
+
+def download_service_data(profile, api_tokens, deadline=None, raise_errors=False):
+    """Download the data of the profile from the connected services concurrently.
+
+    Returns a GDPRRequestResult for each service with a GDPR query API. A
+    failed request returns no data, unless `raise_errors` is given, in which
+    case its result gets the ERROR status.
+    """
+    service_connections, service_api_tokens = get_download_api_tokens(
+        profile, api_tokens
+    )
+    return call_services_concurrently(
+        service_connections,
+        lambda service_connection: service_connection.download_gdpr_data(
+            api_token=service_api_tokens[service_connection.pk],
+            raise_errors=raise_errors,
+        ),
+        deadline=deadline,
+    )
+
+
+def get_download_data(profile, results):
+    """Combine the data of the profile with the data downloaded from the services."""
+    Profile.prefetch_for_serialize([profile])
+
+    external_data = []
+    for result in results:
+        if result.status != GDPRRequestStatus.OK:
+            # Tell that the data of the service is missing
+            external_data.append(
+                {
+                    "key": result.service_connection.service.service_type.name,
+                    "status": result.status.upper(),
+                }
+            )
+        elif result.value:
+            external_data.append(result.value)
+
+    return {"key": "DATA", "children": [profile.serialize(), *external_data]}
+
+
+def delete_service_connections_for_profile(profile, api_tokens, dry_run=False):
+    """Delete the data of the profile from the connected services.
+
+    The services are called concurrently and the connections of the
+    services which deleted the data are deleted once all the calls have
+    finished.
+    """
+    service_connections, service_api_tokens = get_delete_api_tokens(profile, api_tokens)
+
+    # Each call is limited by the timeout and the connection and status retries
+    # of its request, so there's no deadline
+    results = call_services_concurrently(
+        service_connections,
+        lambda service_connection: service_connection.delete_gdpr_data(
+            api_token=service_api_tokens[service_connection.pk], dry_run=dry_run
+        ),
+    )
+
+    failed_services = []
+    for result in results:
+        if result.status == GDPRRequestStatus.OK:
+            if not dry_run:
+                result.service_connection.delete()
+        elif isinstance(
+            result.value, (requests.RequestException, MissingGDPRUrlException)
+        ):
+            failed_services.append(result.service_connection.service.service_type.name)
+        else:
+            raise result.value
+
+    if failed_services:
+        failed_services_string = ", ".join(failed_services)
+        if dry_run:
+            raise ConnectedServiceDeletionNotAllowedError(
+                f"Connected services: {failed_services_string} did not allow deleting the profile."
+            )
+
+        raise ConnectedServiceDeletionFailedError(
+            f"Deletion failed for the following connected services: {failed_services_string}."
+        )
+
+
+def delete_service_data(profile, api_tokens):
+    """Delete the data of the profile from all the connected services.
+
+    All the services must allow the deletion before any data is deleted.
+    """
+    delete_service_connections_for_profile(profile, api_tokens, dry_run=True)
+    delete_service_connections_for_profile(profile, api_tokens, dry_run=False)
+
+
+class GDPRJobIncomplete(Exception):
+    """Some of the services didn't respond, so the job is attempted again."""
+
+
+def enqueue_gdpr_job(user, profile, job_type, api_tokens):
+    """Queue a job of the type for the user.
+
+    If the user already has an unfinished job of the type, that job is
+    returned instead, so a repeated request doesn't queue the job twice. A job
+    which hasn't started yet gets the new API tokens.
+    """
+    unfinished_jobs = GDPRJob.objects.filter(
+        user_uuid=user.uuid, job_type=job_type, status__in=GDPRJob.UNFINISHED_STATUSES
+    )
+    job = unfinished_jobs.first()
+    if job is None:
+        try:
+            with transaction.atomic():
+                return GDPRJob.objects.create(
+                    user_uuid=user.uuid,
+                    profile=profile,
+                    job_type=job_type,
+                    api_tokens=json.dumps(api_tokens),
+                )
+        except IntegrityError:
+            # Queued by a concurrent request
+            job = unfinished_jobs.get()
+
+    GDPRJob.objects.filter(pk=job.pk, status=GDPRJobStatus.PENDING).update(
+        api_tokens=json.dumps(api_tokens)
+    )
+    return job
+
+
+def claim_gdpr_job():
+    """Lock the next job which is due for this worker and return it.
+
+    Jobs locked by other workers are skipped. A job which has been running
+    for longer than GDPR_JOB_LOCK_TIMEOUT seconds is assumed to have been
+    interrupted and is claimed again. Returns None if there are no jobs to run.
+    """
+    now = timezone.now()
+    expired_lock = now - timedelta(seconds=settings.GDPR_JOB_LOCK_TIMEOUT)
+
+    with transaction.atomic():
+        job = (
+            GDPRJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=GDPRJobStatus.PENDING, run_after__lte=now)
+                | Q(status=GDPRJobStatus.RUNNING, locked_at__lt=expired_lock)
+            )
+            .order_by("run_after")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = GDPRJobStatus.RUNNING
+        job.attempts += 1
+        job.locked_at = now
+        job.save(update_fields=["status", "attempts", "locked_at"])
+    return job
+
+
+def _update_claimed_job(job, **values):
+    """Update the job unless another worker has claimed it in the meantime."""
+    values["locked_at"] = None
+    updated = GDPRJob.objects.filter(pk=job.pk, locked_at=job.locked_at).update(
+        **values
+    )
+    for name, value in values.items():
+        setattr(job, name, value)
+    return updated
+
+
+def run_download_job(job, last_attempt):
+    if job.profile is None:
+        raise ProfileDoesNotExistError("Profile does not exist")
+
+    # The failed services are attempted again, so their errors are raised
+    results = download_service_data(
+        job.profile, json.loads(job.api_tokens or "{}"), raise_errors=True
+    )
+    failed_services = [
+        result.service_connection.service.service_type.name
+        for result in results
+        if result.status != GDPRRequestStatus.OK
+    ]
+    # The data is returned without the failed services on the last attempt
+    if failed_services and not last_attempt:
+        raise GDPRJobIncomplete(
+            "No data from the services: {}".format(", ".join(failed_services))
+        )
+    return get_download_data(job.profile, results)
+
+
+def run_delete_job(job, last_attempt):
+    # The profile is already gone if an earlier attempt was interrupted after
+    # deleting it, and the services which deleted the data are no longer
+    # connected, so an attempt continues where the previous one failed
+    profile = job.profile
+    if profile is not None:
+        if profile.service_connections.exists():
+            delete_service_data(profile, json.loads(job.api_tokens or "{}"))
+        profile.delete()
+    User.objects.filter(uuid=job.user_uuid).delete()
+
+
+JOB_RUNNERS = {
+    GDPRJobType.DOWNLOAD: run_download_job,
+    GDPRJobType.DELETE: run_delete_job,
+}
+
+
+def run_gdpr_job(job):
+    """Run a claimed job and mark it finished, or pending if it's attempted again.
+
+    A failed attempt is retried after GDPR_JOB_RETRY_DELAY seconds, doubled
+    for each further retry, until the job has been attempted
+    GDPR_JOB_MAX_ATTEMPTS times. The API tokens are removed from a finished
+    job.
+    """
+    last_attempt = job.attempts >= settings.GDPR_JOB_MAX_ATTEMPTS
+    try:
+        result = JOB_RUNNERS[job.job_type](job, last_attempt)
+    except Exception as e:
+        logger.warning(
+            "GDPR job %s failed on attempt %s", job.pk, job.attempts, exc_info=True
+        )
+        if last_attempt:
+            _update_claimed_job(
+                job,
+                status=GDPRJobStatus.FAILED,
+                error=str(e),
+                api_tokens="",
+                finished_at=timezone.now(),
+            )
+        else:
+            delay = settings.GDPR_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            _update_claimed_job(
+                job,
+                status=GDPRJobStatus.PENDING,
+                error=str(e),
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+    else:
+        _update_claimed_job(
+            job,
+            status=GDPRJobStatus.SUCCEEDED,
+            error="",
+            result=json.dumps(result) if result is not None else "",
+            api_tokens="",
+            finished_at=timezone.now(),
+        )
+    return job
+
+
+def run_gdpr_jobs(limit=None):
+    """Run the jobs which are due, at most `limit` jobs. Returns the number of jobs run."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_gdpr_job()
+        if job is None:
+            break
+        run_gdpr_job(job)
+        count += 1
+    return count
+
+
+def delete_expired_gdpr_jobs():
+    """Delete the jobs which finished more than GDPR_JOB_RESULT_TTL seconds ago."""
+    expired = timezone.now() - timedelta(seconds=settings.GDPR_JOB_RESULT_TTL)
+    deleted, _ = GDPRJob.objects.filter(finished_at__lt=expired).delete()
+    return deleted
@@ -1,16 +1,29 @@
 from collections import defaultdict
 
 from promise import Promise
-from promise.dataloader import DataLoader
 
-from profiles.models import Address, Email, Phone
+from open_city_profile.dataloaders import InstrumentedDataLoader
+from profiles.models import (
+    Address,
+    Email,
+    Phone,
+    Profile,
+    SensitiveData,
+    VerifiedPersonalInformation,
+)
+from services.models import ServiceConnection
+from subscriptions.models import Subscription
 
 
-def loader_for_profile(model):
-    class BaseByProfileIdLoader(DataLoader):
-        def batch_load_fn(self, profile_ids):
+def loader_for_profile(model, select_related=()):
+    class BaseByProfileIdLoader(InstrumentedDataLoader):
+        def load_batch(self, profile_ids):
             items_by_profile_ids = defaultdict(list)
-            for item in model.objects.filter(profile_id__in=profile_ids).iterator():
+            for item in (
+                model.objects.filter(profile_id__in=profile_ids)
+                .select_related(*select_related)
+                .iterator()
+            ):
                 items_by_profile_ids[item.profile_id].append(item)
             return Promise.resolve(
                 [items_by_profile_ids.get(profile_id, []) for profile_id in profile_ids]
@@ -20,8 +33,8 @@ def loader_for_profile(model):
 
 
 def loader_for_profile_primary(model):
-    class BaseByProfileIdPrimaryLoader(DataLoader):
-        def batch_load_fn(self, profile_ids):
+    class BaseByProfileIdPrimaryLoader(InstrumentedDataLoader):
+        def load_batch(self, profile_ids):
             items_by_profile_ids = defaultdict()
             for item in model.objects.filter(
                 profile_id__in=profile_ids, primary=True
@@ -35,14 +48,62 @@ def loader_for_profile_primary(model):
     return BaseByProfileIdPrimaryLoader
 
 
+def loader_for_profile_one_to_one(model, related_name, select_related=()):
+    """Loader for a one-to-one relation of profile.
+
+    A missing related object resolves to the same RelatedObjectDoesNotExist
+    error that accessing the relation on the profile would raise.
+    """
+    does_not_exist = getattr(Profile, related_name).RelatedObjectDoesNotExist
+
+    class BaseOneToOneByProfileIdLoader(InstrumentedDataLoader):
+        def load_batch(self, profile_ids):
+            items_by_profile_ids = {
+                item.profile_id: item
+                for item in model.objects.filter(profile_id__in=profile_ids)
+                .select_related(*select_related)
+                .iterator()
+            }
+
+            results = []
+            for profile_id in profile_ids:
+                item = items_by_profile_ids.get(profile_id)
+                if item is None:
+                    item = does_not_exist(f"Profile has no {related_name}.")
+                results.append(item)
+
+            return Promise.resolve(results)
+
+    return BaseOneToOneByProfileIdLoader
+
+
 EmailsByProfileIdLoader = loader_for_profile(Email)
 PhonesByProfileIdLoader = loader_for_profile(Phone)
 AddressesByProfileIdLoader = loader_for_profile(Address)
+ServiceConnectionsByProfileIdLoader = loader_for_profile(
+    ServiceConnection, select_related=("service",)
+)
+SubscriptionsByProfileIdLoader = loader_for_profile(
+    Subscription, select_related=("subscription_type",)
+)
 
 PrimaryEmailForProfileLoader = loader_for_profile_primary(Email)
 PrimaryPhoneForProfileLoader = loader_for_profile_primary(Phone)
 PrimaryAddressForProfileLoader = loader_for_profile_primary(Address)
 
+SensitiveDataForProfileLoader = loader_for_profile_one_to_one(
+    SensitiveData, "sensitivedata"
+)
+VerifiedPersonalInformationForProfileLoader = loader_for_profile_one_to_one(
+    VerifiedPersonalInformation,
+    "verified_personal_information",
+    select_related=(
+        "permanent_address",
+        "temporary_address",
+        "permanent_foreign_address",
+    ),
+)
+
 
 __all__ = [
     "AddressesByProfileIdLoader",
@@ -51,4 +112,8 @@ __all__ = [
     "PrimaryAddressForProfileLoader",
     "PrimaryEmailForProfileLoader",
     "PrimaryPhoneForProfileLoader",
+    "SensitiveDataForProfileLoader",
+    "ServiceConnectionsByProfileIdLoader",
+    "SubscriptionsByProfileIdLoader",
+    "VerifiedPersonalInformationForProfileLoader",
 ]
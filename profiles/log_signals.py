@@ -1,12 +1,18 @@
-import json
-import logging
 from datetime import datetime
 
+from django.apps import apps
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q
 from django.db.models.signals import post_delete, post_init, post_save
-from django.dispatch import receiver
 
-from .utils import get_current_service, get_current_user
+from .audit_log import get_audit_log_writer
+from .utils import get_audit_log_collector, get_current_service, get_current_user
+
+PROFILE_PARTS = {
+    "Profile": "base profile",
+    "SensitiveData": "sensitive data",
+}
 
 
 def should_audit(model):
@@ -15,88 +21,188 @@ def should_audit(model):
     return False
 
 
-def log(action, instance):
-    def _resolve_role(current_user, profile):
-        if profile.user == current_user:
-            return "OWNER"
-        elif current_user is not None:
-            return "ADMIN"
-        else:
-            return "SYSTEM"
-
-    profile_parts = {
-        "Profile": "base profile",
-        "SensitiveData": "sensitive data",
+def _resolve_role(current_user, target_user):
+    if target_user is not None and target_user == current_user:
+        return "OWNER"
+    elif current_user is not None:
+        return "ADMIN"
+    else:
+        return "SYSTEM"
+
+
+def create_message(
+    action, current_time, current_user, service, profile_id, profile_part, target_user
+):
+    message = {
+        "audit_event": {
+            "origin": "PROFILE-BE",
+            "status": "SUCCESS",
+            "date_time_epoch": int(current_time.timestamp()),
+            "date_time": f"{current_time.isoformat(sep='T', timespec='milliseconds')}Z",
+            "actor": {"role": _resolve_role(current_user, target_user)},
+            "operation": action,
+            "target": {
+                "profile_id": str(profile_id) if profile_id else None,
+                "profile_part": profile_part,
+            },
+        }
     }
 
+    if current_user:
+        message["audit_event"]["actor"]["user_id"] = (
+            str(current_user.uuid) if hasattr(current_user, "uuid") else None
+        )
+        if settings.AUDIT_LOG_USERNAME:
+            message["audit_event"]["actor"]["user_name"] = (
+                current_user.username if hasattr(current_user, "username") else None
+            )
+
+    if target_user:
+        message["audit_event"]["target"]["user_id"] = (
+            str(target_user.uuid) if hasattr(target_user, "uuid") else None
+        )
+        if settings.AUDIT_LOG_USERNAME:
+            message["audit_event"]["target"]["user_name"] = (
+                target_user.username if hasattr(target_user, "username") else None
+            )
+
+    if service:
+        message["audit_event"]["actor_service"] = {
+            "id": str(service.name),
+            "name": str(service.label),
+        }
+    return message
+
+
+class AuditLogCollector:
+    """Collects the READ audit events of a request.
+
+    Each part of a profile read by the same actor is recorded once, however
+    many times it's instantiated during the request. The users of the read
+    profiles are taken from the instances when they are read, so that the
+    events of a profile deleted later in the request still have their
+    target. The target users are fetched in a single query when the events
+    are emitted at the end of the request.
+    """
+
+    def __init__(self):
+        self.reads = {}
+        self.target_user_ids = {}
+
+    def add_read(
+        self, current_user, service, profile_id, profile_part, target_user_id=None
+    ):
+        actor_id = current_user.pk if current_user is not None else None
+        key = (actor_id, service, profile_id, profile_part)
+        if key not in self.reads:
+            self.reads[key] = (datetime.utcnow(), current_user)
+        if target_user_id is not None:
+            self.target_user_ids[profile_id] = target_user_id
+
+    def _get_target_users(self):
+        """Return the target users by pk and resolve the missing target user ids."""
+        unresolved_profile_ids = {
+            profile_id
+            for _, _, profile_id, _ in self.reads
+            if profile_id not in self.target_user_ids
+        }
+        users = (
+            get_user_model()
+            .objects.filter(
+                Q(pk__in=set(self.target_user_ids.values()))
+                | Q(profile__in=unresolved_profile_ids)
+            )
+            .annotate(profile_pk=F("profile__pk"))
+        )
+        target_users = {}
+        for user in users:
+            target_users[user.pk] = user
+            if user.profile_pk in unresolved_profile_ids:
+                self.target_user_ids[user.profile_pk] = user.pk
+        return target_users
+
+    def flush(self):
+        if not self.reads:
+            return
+
+        target_users = self._get_target_users()
+        writer = get_audit_log_writer()
+        for key, (current_time, current_user) in self.reads.items():
+            actor_id, service, profile_id, profile_part = key
+            target_user_id = self.target_user_ids.get(profile_id)
+            if target_user_id is not None and target_user_id == actor_id:
+                # The owner may have been deleted during the request
+                target_user = current_user
+            else:
+                target_user = target_users.get(target_user_id)
+            writer.emit(
+                create_message(
+                    "READ",
+                    current_time,
+                    current_user,
+                    service,
+                    profile_id,
+                    profile_part,
+                    target_user,
+                )
+            )
+        self.reads = {}
+        self.target_user_ids = {}
+
+
+def log(action, instance):
     if (
         settings.AUDIT_LOGGING_ENABLED
         and should_audit(instance.__class__)
         and instance.pk
     ):
-        logger = logging.getLogger("audit")
-
-        current_time = datetime.utcnow()
         current_user = get_current_user()
-        profile = instance.resolve_profile()
-        profile_id = str(profile.pk) if profile else None
-        target_user = profile.user if profile and profile.user else None
-
-        message = {
-            "audit_event": {
-                "origin": "PROFILE-BE",
-                "status": "SUCCESS",
-                "date_time_epoch": int(current_time.timestamp()),
-                "date_time": f"{current_time.isoformat(sep='T', timespec='milliseconds')}Z",
-                "actor": {"role": _resolve_role(current_user, profile)},
-                "operation": action,
-                "target": {
-                    "profile_id": profile_id,
-                    "profile_part": profile_parts[instance.__class__.__name__],
-                },
-            }
-        }
-
-        if current_user:
-            message["audit_event"]["actor"]["user_id"] = (
-                str(current_user.uuid) if hasattr(current_user, "uuid") else None
+        service = get_current_service()
+        profile_part = PROFILE_PARTS[instance.__class__.__name__]
+
+        collector = get_audit_log_collector()
+        if action == "READ" and collector is not None:
+            collector.add_read(
+                current_user,
+                service,
+                instance.resolve_profile_id(),
+                profile_part,
+                instance.resolve_user_id(),
             )
-            if settings.AUDIT_LOG_USERNAME:
-                message["audit_event"]["actor"]["user_name"] = (
-                    current_user.username if hasattr(current_user, "username") else None
-                )
+            return
 
-        if target_user:
-            message["audit_event"]["target"]["user_id"] = (
-                str(target_user.uuid) if hasattr(target_user, "uuid") else None
+        profile = instance.resolve_profile()
+        get_audit_log_writer().emit(
+            create_message(
+                action,
+                datetime.utcnow(),
+                current_user,
+                service,
+                profile.pk if profile else None,
+                profile_part,
+                profile.user if profile and profile.user else None,
             )
-            if settings.AUDIT_LOG_USERNAME:
-                message["audit_event"]["target"]["user_name"] = (
-                    target_user.username if hasattr(target_user, "username") else None
-                )
-
-        service = get_current_service()
-        if service:
-            message["audit_event"]["actor_service"] = {
-                "id": str(service.name),
-                "name": str(service.label),
-            }
-        logger.info(json.dumps(message))
+        )
 
 
-@receiver(post_delete)
 def post_delete_audit_log(sender, instance, **kwargs):
     log("DELETE", instance)
 
 
-@receiver(post_init)
 def post_init_audit_log(sender, instance, **kwargs):
     log("READ", instance)
 
 
-@receiver(post_save)
 def post_save_audit_log(sender, instance, created, **kwargs):
     if created:
         log("CREATE", instance)
     else:
         log("UPDATE", instance)
+
+
+# The receivers are only connected for the audited models, so that
+# instantiating other models doesn't pay for them.
+for model in filter(should_audit, apps.get_models()):
+    post_delete.connect(post_delete_audit_log, sender=model)
+    post_init.connect(post_init_audit_log, sender=model)
+    post_save.connect(post_save_audit_log, sender=model)
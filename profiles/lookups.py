@@ -0,0 +1,19 @@
+from django.db.models import CharField
+from django.db.models.lookups import IContains
+
+
+@CharField.register_lookup
+class TrigramIContains(IContains):
+    """Case-insensitive containment which can use pg_trgm GIN indexes.
+
+    The built-in `icontains` lookup compares `UPPER(column::text)`, which doesn't
+    match an index on the plain column. This lookup compares the column itself
+    with `ILIKE`, so a `gin_trgm_ops` index on the column is used.
+    """
+
+    lookup_name = "trigram_icontains"
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs_sql} ILIKE {rhs_sql}", lhs_params + rhs_params
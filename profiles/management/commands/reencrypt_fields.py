@@ -0,0 +1,78 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles.encryption import Checkpoint, get_encrypted_models, reencrypt_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encrypt the encrypted fields with the first of the FIELD_ENCRYPTION_KEYS "
+        "after rotating the keys. The old keys must still be listed after the new one "
+        "while the command runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batchsize",
+            type=int,
+            default=1000,
+            help="Number of rows re-encrypted in one transaction",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of processes re-encrypting the rows",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default="reencrypt_fields.checkpoint",
+            help="File for saving the progress, a stopped run continues from it. "
+            "Removed once all the rows have been re-encrypted",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only check that every row can be decrypted",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        checkpoint = Checkpoint(options["checkpoint"])
+        failed = {}
+
+        for model in get_encrypted_models():
+            label = model._meta.label
+
+            def report(processed, total, rate):
+                self.stdout.write(
+                    "{}: {}/{} rows ({:.0f} rows/s)".format(
+                        label, processed, total, rate
+                    )
+                )
+
+            processed, model_failed = reencrypt_model(
+                model,
+                chunk_size=options["batchsize"],
+                processes=options["processes"],
+                dry_run=dry_run,
+                checkpoint=checkpoint,
+                report=report,
+            )
+            if model_failed:
+                failed[label] = model_failed
+
+        if failed:
+            raise CommandError(
+                "Rows which could not be decrypted with any of the keys: {}".format(
+                    ", ".join(
+                        "{} {}".format(label, pks) for label, pks in failed.items()
+                    )
+                )
+            )
+        if not dry_run:
+            checkpoint.delete()
+        self.stdout.write(
+            "All rows can be decrypted" if dry_run else "All rows re-encrypted"
+        )
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from profiles.gdpr import delete_expired_gdpr_jobs, run_gdpr_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the queued GDPR profile downloads and deletions. Several workers may "
+        "run at the same time, each job is run by one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs which are due and exit, instead of waiting for more",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait before checking for new jobs when there are none",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            delete_expired_gdpr_jobs()
+            count = run_gdpr_jobs()
+            if options["verbosity"] > 1 or options["once"]:
+                self.stdout.write("Ran {} GDPR jobs".format(count))
+            if options["once"]:
+                return
+            if not count:
+                time.sleep(options["interval"])
@@ -0,0 +1,29 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from profiles.blind_index import get_blind_index_fields, update_blind_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the blind indexes of the rows which haven't been indexed with the "
+        "current BLIND_INDEX_KEYS key, e.g. after adding the indexes or rotating the key"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batchsize",
+            type=int,
+            default=1000,
+            help="Number of rows updated in one transaction",
+        )
+
+    def handle(self, *args, **options):
+        for model in apps.get_models():
+            for field in get_blind_index_fields(model):
+                updated = update_blind_indexes(model, field, options["batchsize"])
+                self.stdout.write(
+                    "Updated {} blind indexes of {}.{}".format(
+                        updated, model.__name__, field.name
+                    )
+                )
@@ -1,12 +1,22 @@
 from django.utils.deprecation import MiddlewareMixin
 
-from .utils import clear_thread_locals, set_current_user
+from .log_signals import AuditLogCollector
+from .utils import (
+    clear_thread_locals,
+    get_audit_log_collector,
+    set_audit_log_collector,
+    set_current_user,
+)
 
 
 class SetUser(MiddlewareMixin):
     def process_request(self, request):
         set_current_user(getattr(request, "user", None))
+        set_audit_log_collector(AuditLogCollector())
 
     def process_response(self, request, response):
+        collector = get_audit_log_collector()
+        if collector is not None:
+            collector.flush()
         clear_thread_locals()
         return response
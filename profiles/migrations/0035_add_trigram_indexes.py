@@ -0,0 +1,72 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0034_add_help_texts_to_fields__noop"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="profile",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["first_name"],
+                name="profile_first_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="profile",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["last_name"],
+                name="profile_last_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="profile",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["nickname"],
+                name="profile_nickname_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="phone",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["phone"], name="phone_phone_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="email",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["email"], name="email_email_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["address"],
+                name="address_address_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["postal_code"],
+                name="address_postal_code_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["city"], name="address_city_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+POPULATE_PRIMARY_CONTACT_INFO = """
+INSERT INTO profiles_profileprimarycontactinfo (
+    profile_id, email, address, postal_code, city, country_code
+)
+SELECT
+    profile.id,
+    (
+        SELECT email.email FROM profiles_email email
+        WHERE email.profile_id = profile.id AND email.primary
+        ORDER BY email.id LIMIT 1
+    ),
+    address.address,
+    address.postal_code,
+    address.city,
+    address.country_code
+FROM profiles_profile profile
+LEFT JOIN LATERAL (
+    SELECT * FROM profiles_address address
+    WHERE address.profile_id = profile.id AND address.primary
+    ORDER BY address.id LIMIT 1
+) address ON TRUE
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0035_add_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfilePrimaryContactInfo",
+            fields=[
+                (
+                    "profile",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="primary_contact_info",
+                        serialize=False,
+                        to="profiles.Profile",
+                    ),
+                ),
+                ("email", models.CharField(db_index=True, max_length=254, null=True)),
+                (
+                    "address",
+                    models.CharField(db_index=True, max_length=128, null=True),
+                ),
+                (
+                    "postal_code",
+                    models.CharField(db_index=True, max_length=32, null=True),
+                ),
+                ("city", models.CharField(db_index=True, max_length=64, null=True)),
+                (
+                    "country_code",
+                    models.CharField(db_index=True, max_length=2, null=True),
+                ),
+            ],
+        ),
+        migrations.RunSQL(POPULATE_PRIMARY_CONTACT_INFO, migrations.RunSQL.noop),
+    ]
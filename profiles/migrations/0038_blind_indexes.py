@@ -0,0 +1,31 @@
+from django.db import migrations
+
+import profiles.blind_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0037_auditlogentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sensitivedata",
+            name="ssn_index",
+            field=profiles.blind_index.BlindIndexField(
+                blank=True, db_index=True, editable=False, max_length=73, source="ssn"
+            ),
+        ),
+        migrations.AddField(
+            model_name="verifiedpersonalinformation",
+            name="national_identification_number_index",
+            field=profiles.blind_index.BlindIndexField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                max_length=73,
+                source="national_identification_number",
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+import encrypted_fields.fields
+import enumfields.fields
+from django.db import migrations, models
+
+import profiles.enums
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0038_blind_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GDPRJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("user_uuid", models.UUIDField(db_index=True)),
+                (
+                    "job_type",
+                    enumfields.fields.EnumField(
+                        enum=profiles.enums.GDPRJobType, max_length=32
+                    ),
+                ),
+                (
+                    "status",
+                    enumfields.fields.EnumField(
+                        default="pending",
+                        enum=profiles.enums.GDPRJobStatus,
+                        max_length=32,
+                    ),
+                ),
+                ("api_tokens", encrypted_fields.fields.EncryptedTextField(blank=True)),
+                ("result", encrypted_fields.fields.EncryptedTextField(blank=True)),
+                ("error", models.TextField(blank=True)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now)),
+                ("locked_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="gdpr_jobs",
+                        to="profiles.Profile",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="gdprjob",
+            index=models.Index(
+                fields=["status", "run_after"], name="gdprjob_status_run_after_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="gdprjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(status__in=["pending", "running"]),
+                fields=("user_uuid", "job_type"),
+                name="unique_unfinished_gdpr_job",
+            ),
+        ),
+    ]
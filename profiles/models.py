@@ -5,8 +5,11 @@ from datetime import timedelta
 
 import reversion
 from django.conf import settings
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.files.storage import FileSystemStorage
 from django.db import models, transaction
+from django.db.models import Q
 from django.utils import timezone
 from encrypted_fields import fields
 from enumfields import EnumField
@@ -15,7 +18,8 @@ from thesaurus.models import Concept
 
 from open_city_profile.exceptions import ProfileMustHaveOnePrimaryEmail
 from services.enums import ServiceType
-from services.models import Service, ServiceConnection
+from services.models import ServiceConnection
+from services.registry import service_registry
 from users.models import User
 from utils.models import (
     NullsToEmptyStringsModel,
@@ -25,9 +29,12 @@ from utils.models import (
     ValidateOnSaveModel,
 )
 
+from .blind_index import BlindIndexField
 from .enums import (
     AddressType,
     EmailType,
+    GDPRJobStatus,
+    GDPRJobType,
     PhoneType,
     RepresentationType,
     RepresentativeConfirmationDegree,
@@ -120,9 +127,34 @@ class Profile(UUIDModel, SerializableMixin):
     )
     audit_log = True
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["first_name"],
+                name="profile_first_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["last_name"],
+                name="profile_last_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["nickname"],
+                name="profile_nickname_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
+
     def resolve_profile(self):
         return self
 
+    def resolve_profile_id(self):
+        return self.pk
+
+    def resolve_user_id(self):
+        return self.user_id
+
     def get_primary_email(self):
         return Email.objects.get(profile=self, primary=True)
 
@@ -215,7 +247,7 @@ class Profile(UUIDModel, SerializableMixin):
                     )
                 ServiceConnection.objects.create(
                     profile=profile,
-                    service=Service.objects.get(service_type=ServiceType.BERTH),
+                    service_id=service_registry.get(ServiceType.BERTH).pk,
                     enabled=False,
                 )
                 result[item["customer_id"]] = profile.pk
@@ -253,6 +285,9 @@ class VerifiedPersonalInformation(ValidateOnSaveModel, NullsToEmptyStringsModel)
         blank=True,
         help_text="Finnish national identification number.",
     )
+    national_identification_number_index = BlindIndexField(
+        source="national_identification_number"
+    )
     email = fields.EncryptedCharField(max_length=1024, blank=True, help_text="Email.")
     municipality_of_residence = fields.EncryptedCharField(
         max_length=1024,
@@ -346,12 +381,22 @@ class DivisionOfInterest(models.Model):
 class SensitiveData(SerializableMixin):
     profile = models.OneToOneField(Profile, on_delete=models.CASCADE)
     ssn = fields.EncryptedCharField(max_length=11)
+    ssn_index = BlindIndexField(source="ssn")
     serialize_fields = ({"name": "ssn"},)
     audit_log = True
 
     def resolve_profile(self):
         return self.profile if self.pk else None
 
+    def resolve_profile_id(self):
+        return self.profile_id if self.pk else None
+
+    def resolve_user_id(self):
+        # Known without a query only if the profile has been fetched already
+        if self.pk and SensitiveData.profile.is_cached(self):
+            return self.profile.user_id
+        return None
+
 
 class Contact(SerializableMixin):
     primary = models.BooleanField(default=False)
@@ -374,6 +419,13 @@ class Phone(Contact):
         {"name": "phone"},
     )
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["phone"], name="phone_phone_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ]
+
 
 class Email(Contact):
     profile = models.ForeignKey(
@@ -387,6 +439,11 @@ class Email(Contact):
 
     class Meta:
         ordering = ["-primary"]
+        indexes = [
+            GinIndex(
+                fields=["email"], name="email_email_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ]
 
     serialize_fields = (
         {"name": "primary"},
@@ -419,6 +476,76 @@ class Address(Contact):
         {"name": "country_code"},
     )
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["address"],
+                name="address_address_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["postal_code"],
+                name="address_postal_code_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["city"], name="address_city_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ]
+
+
+class ProfilePrimaryContactInfo(models.Model):
+    """Primary contact info of a profile, denormalized for ordering profiles.
+
+    Kept up to date by the post_save and post_delete signals of Email and
+    Address. Updates done with querysets don't send the signals, so they must
+    call `update_for_profile` themselves.
+    """
+
+    profile = models.OneToOneField(
+        Profile,
+        primary_key=True,
+        related_name="primary_contact_info",
+        on_delete=models.CASCADE,
+    )
+    email = models.CharField(max_length=254, null=True, db_index=True)
+    address = models.CharField(max_length=128, null=True, db_index=True)
+    postal_code = models.CharField(max_length=32, null=True, db_index=True)
+    city = models.CharField(max_length=64, null=True, db_index=True)
+    country_code = models.CharField(max_length=2, null=True, db_index=True)
+
+    @classmethod
+    def update_for_profile(cls, profile_id, create=True):
+        """Copy the primary email and address of the profile, creating the row
+        if `create` is given."""
+        address = (
+            Address.objects.filter(profile_id=profile_id, primary=True)
+            .order_by("pk")
+            .values("address", "postal_code", "city", "country_code")
+            .first()
+        )
+        email = (
+            Email.objects.filter(profile_id=profile_id, primary=True)
+            .order_by("pk")
+            .values_list("email", flat=True)
+            .first()
+        )
+        values = address or dict.fromkeys(
+            ("address", "postal_code", "city", "country_code")
+        )
+        values["email"] = email
+        if create:
+            cls.objects.update_or_create(profile_id=profile_id, defaults=values)
+        else:
+            cls.objects.filter(profile_id=profile_id).update(**values)
+
+
+class AuditLogEntry(models.Model):
+    """Audit event written by `profiles.audit_log.DatabaseSink`."""
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    message = JSONField()
+
 
 class ClaimToken(models.Model):
     profile = models.ForeignKey(
@@ -451,3 +578,53 @@ class TemporaryReadAccessToken(models.Model):
 
     def __str__(self):
         return f"{self.token} ({self.expires_at()})"
+
+
+class GDPRJob(UUIDModel):
+    """Download or deletion of the data of a profile, run by the GDPR job worker.
+
+    The job is owned by the user with `user_uuid`, which stays after the user
+    and the profile have been deleted. The GDPR API tokens of the services are
+    stored until the job is finished, and the downloaded data until the job is
+    deleted. A user has at most one unfinished job of each type.
+    """
+
+    UNFINISHED_STATUSES = (GDPRJobStatus.PENDING, GDPRJobStatus.RUNNING)
+
+    user_uuid = models.UUIDField(db_index=True)
+    profile = models.ForeignKey(
+        Profile,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="gdpr_jobs",
+    )
+    job_type = EnumField(GDPRJobType, max_length=32)
+    status = EnumField(GDPRJobStatus, max_length=32, default=GDPRJobStatus.PENDING)
+    api_tokens = fields.EncryptedTextField(blank=True)
+    result = fields.EncryptedTextField(blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "run_after"], name="gdprjob_status_run_after_idx"
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user_uuid", "job_type"],
+                condition=Q(
+                    status__in=[
+                        GDPRJobStatus.PENDING.value,
+                        GDPRJobStatus.RUNNING.value,
+                    ]
+                ),
+                name="unique_unfinished_gdpr_job",
+            )
+        ]
@@ -1,12 +1,11 @@
-from itertools import chain
+import json
 
 import graphene
-import requests
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
-from django.db.models import F, OuterRef, Subquery
+from django.db.models import F, QuerySet
 from django.utils import timezone
 from django.utils.translation import override
 from django.utils.translation import ugettext_lazy as _
@@ -18,41 +17,66 @@ from django_filters import (
     OrderingFilter,
 )
 from graphene import relay
-from graphene.utils.str_converters import to_snake_case
+from graphene.relay import PageInfo
 from graphene_django import DjangoConnectionField
 from graphene_django.filter import DjangoFilterConnectionField
 from graphene_django.types import DjangoObjectType
+from graphene_django.utils import maybe_queryset
 from graphene_federation import key
 from graphql_jwt.decorators import login_required, permission_required
+from graphql_relay.connection.arrayconnection import (
+    connection_from_list_slice,
+    cursor_to_offset,
+    get_offset_with_default,
+)
 from munigeo.models import AdministrativeDivision
 from thesaurus.models import Concept
 
 from open_city_profile.exceptions import (
     APINotImplementedError,
-    ConnectedServiceDeletionFailedError,
-    ConnectedServiceDeletionNotAllowedError,
-    MissingGDPRApiTokenError,
+    InvalidCursorError,
     ProfileDoesNotExistError,
     ProfileMustHaveOnePrimaryEmail,
     TokenExpiredError,
 )
-from open_city_profile.oidc import TunnistamoTokenExchange
+from open_city_profile.oidc import get_token_exchange
 from profiles.decorators import staff_required
-from services.exceptions import MissingGDPRUrlException
-from services.models import Service, ServiceConnection
+from services.models import Service
+from services.permissions import get_service_permission_checker
+from services.registry import service_registry
 from services.schema import AllowedServiceType, ServiceConnectionType
 from subscriptions.schema import (
     SubscriptionInputType,
     SubscriptionNode,
     UpdateMySubscriptionMutation,
 )
+from utils.db import estimate_count
+from utils.pagination import (
+    decode_keyset_cursor,
+    encode_keyset_cursor,
+    get_keyset_ordering,
+    get_keyset_values,
+    keyset_filter,
+    order_by_keyset,
+    reverse_keyset_ordering,
+)
 
-from .enums import AddressType, EmailType, PhoneType
+from .blind_index import get_lookup_blind_indexes
+from .enums import AddressType, EmailType, GDPRJobStatus, GDPRJobType, PhoneType
+from .gdpr import (
+    delete_service_data,
+    download_service_data,
+    enqueue_gdpr_job,
+    get_delete_api_tokens,
+    get_download_api_tokens,
+    get_download_data,
+)
 from .models import (
     Address,
     ClaimToken,
     Contact,
     Email,
+    GDPRJob,
     Phone,
     Profile,
     SensitiveData,
@@ -80,6 +104,12 @@ AllowedPhoneType = graphene.Enum.from_enum(
 AllowedAddressType = graphene.Enum.from_enum(
     AddressType, description=lambda e: e.label if e else ""
 )
+AllowedGDPRJobType = graphene.Enum.from_enum(
+    GDPRJobType, description=lambda e: e.label if e else ""
+)
+AllowedGDPRJobStatus = graphene.Enum.from_enum(
+    GDPRJobStatus, description=lambda e: e.label if e else ""
+)
 
 
 def validate_primary_email(profile):
@@ -183,30 +213,171 @@ class ProfilesConnection(graphene.Connection):
     total_count = graphene.Int(required=True)
 
     def resolve_count(self, info):
+        if self.length is None:
+            self.length = self.iterable.count()
         return self.length
 
     def resolve_total_count(self, info, **kwargs):
-        return self.iterable.model.objects.count()
+        if settings.PROFILES_TOTAL_COUNT_ESTIMATE and self.length is None:
+            return estimate_count(
+                self.iterable,
+                cache_timeout=settings.PROFILES_TOTAL_COUNT_ESTIMATE_CACHE_TIMEOUT,
+            )
+        return self.resolve_count(info)
+
+
+class ProfilesConnectionField(DjangoFilterConnectionField):
+    """Connection field which counts the results only when the count is needed.
+
+    Results are paginated with keyset cursors which contain the values of the
+    ordering fields and the id of the row, so fetching any page costs the same
+    as fetching the first one. Offset cursors are still accepted as `after` and
+    `before`.
+
+    Pagination fetches one extra row to find out if there's a next page, so the
+    length of the result set is only counted when it is asked for with `count`
+    or `totalCount`.
+    """
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable):
+        iterable = maybe_queryset(iterable)
+        if isinstance(iterable, QuerySet):
+            ordering = get_keyset_ordering(iterable)
+            if ordering and not any(
+                cursor_to_offset(args[cursor]) is not None
+                for cursor in ("after", "before")
+                if args.get(cursor)
+            ):
+                return cls.resolve_keyset_connection(
+                    connection, args, iterable, ordering
+                )
+
+        if (
+            not isinstance(iterable, QuerySet)
+            or args.get("last") is not None
+            or args.get("before")
+        ):
+            return super().resolve_connection(connection, args, iterable)
+
+        first = args.get("first")
+        slice_start = get_offset_with_default(args.get("after"), -1) + 1
+        if first is None:
+            list_slice = list(iterable[slice_start:])
+        else:
+            # Fetch one extra row to find out if there's a next page
+            slice_end = slice_start + first + 1
+            list_slice = list(iterable[slice_start:slice_end])
+        list_length = slice_start + len(list_slice)
+
+        connection = connection_from_list_slice(
+            list_slice,
+            args,
+            slice_start=slice_start,
+            list_length=list_length,
+            list_slice_length=len(list_slice),
+            connection_type=connection,
+            edge_type=connection.Edge,
+            pageinfo_type=PageInfo,
+        )
+        connection.iterable = iterable
+        # The length is known unless there are rows left after the slice or
+        # the slice started past the end of the results
+        if (first is None or len(list_slice) <= first) and (
+            list_slice or not slice_start
+        ):
+            connection.length = list_length
+        else:
+            connection.length = None
+        return connection
+
+    @classmethod
+    def resolve_keyset_connection(cls, connection, args, iterable, ordering):
+        first = args.get("first")
+        last = args.get("last")
+        queryset = order_by_keyset(iterable, ordering)
+        try:
+            if args.get("after"):
+                after = decode_keyset_cursor(args["after"], ordering)
+                queryset = queryset.filter(
+                    keyset_filter(iterable.model, ordering, after)
+                )
+            if args.get("before"):
+                before = decode_keyset_cursor(args["before"], ordering)
+                queryset = queryset.filter(
+                    keyset_filter(
+                        iterable.model, reverse_keyset_ordering(ordering), before
+                    )
+                )
+        except ValueError as e:
+            raise InvalidCursorError(str(e)) from e
+
+        has_previous_page = has_next_page = False
+        if first is None and last is not None:
+            # Fetch the last rows by reversing the ordering
+            queryset = order_by_keyset(queryset, reverse_keyset_ordering(ordering))
+            rows = list(queryset[: last + 1])
+            has_previous_page = len(rows) > last
+            rows = rows[:last][::-1]
+        else:
+            if first is None:
+                rows = list(queryset)
+            else:
+                # Fetch one extra row to find out if there's a next page
+                rows = list(queryset[: first + 1])
+                has_next_page = len(rows) > first
+                rows = rows[:first]
+            if last is not None and len(rows) > last:
+                has_previous_page = True
+                rows = rows[-last:]
+
+        edges = [
+            connection.Edge(
+                node=row, cursor=encode_keyset_cursor(get_keyset_values(row, ordering))
+            )
+            for row in rows
+        ]
+        connection = connection(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_previous_page,
+                has_next_page=has_next_page,
+            ),
+        )
+        connection.iterable = iterable
+        if (
+            args.get("after")
+            or args.get("before")
+            or has_previous_page
+            or has_next_page
+        ):
+            connection.length = None
+        else:
+            connection.length = len(rows)
+        return connection
 
 
 class PrimaryContactInfoOrderingFilter(OrderingFilter):
     """Custom ordering filter
 
     This filter enables ordering profiles by primary contact info fields, for example by city of primary address.
+    The values are read from the denormalized `ProfilePrimaryContactInfo` so that the ordering can use its indexes.
+    Several orderings can be combined, e.g. "primaryCity,-firstName".
     """
 
     # custom field definitions:
     # 0. custom field name (camel case format)
     # 1. field display text
-    # 2. model with foreign key profile_id
-    # 3. field name of the related model
+    # 2. field name of ProfilePrimaryContactInfo
 
     FIELDS = (
-        ("primaryCity", "Primary City", Address, "city"),
-        ("primaryPostalCode", "Primary Postal Code", Address, "postal_code"),
-        ("primaryAddress", "Primary Address", Address, "address"),
-        ("primaryCountryCode", "Primary Country Code", Address, "country_code"),
-        ("primaryEmail", "Primary Email", Email, "email"),
+        ("primaryCity", "Primary City", "city"),
+        ("primaryPostalCode", "Primary Postal Code", "postal_code"),
+        ("primaryAddress", "Primary Address", "address"),
+        ("primaryCountryCode", "Primary Country Code", "country_code"),
+        ("primaryEmail", "Primary Email", "email"),
     )
 
     def __init__(self, *args, **kwargs):
@@ -216,36 +387,25 @@ class PrimaryContactInfoOrderingFilter(OrderingFilter):
         self.extra["choices"] += [
             (f"-{item[0]}", f"{item[1]} (Descending)") for item in self.FIELDS
         ]
+        self.param_map.update(
+            {item[0]: f"primary_contact_info__{item[2]}" for item in self.FIELDS}
+        )
 
     def filter(self, qs, values):
-        def _get_field_data_by_field(fields, field):
-            for f in fields:
-                if f[0] == field:
-                    return f
-            return None
-
-        # collect all the ascending/descending options and flatten the list
-        options = chain(*[[item[0], f"-{item[0]}"] for item in self.FIELDS])
-
-        for value in values or []:
-            # match with all of our custom ascending and descending orderings
-            if value in options:
-                # get rid of leading "-" if ordering is descending
-                field_name = value.replace("-", "")
-                field_data = _get_field_data_by_field(self.FIELDS, field_name)
-                # annotate the query with extra field and return the queryset
-                annotation = {
-                    to_snake_case(field_name): Subquery(
-                        field_data[2]
-                        .objects.filter(profile_id=OuterRef("id"), primary=True)
-                        .values(field_data[3])
-                    )
-                }
-                return qs.annotate(**annotation).order_by(to_snake_case(value))
+        custom_params = {item[0] for item in self.FIELDS}
+        if any(value.lstrip("-") in custom_params for value in values or []):
+            qs = qs.select_related("primary_contact_info")
         return super().filter(qs, values)
 
 
 class ProfileFilter(FilterSet):
+    """Filters for the profiles query.
+
+    Substring filters on text fields use the `trigram_icontains` lookup so that
+    the pg_trgm GIN indexes of the fields are used. The encrypted identifiers
+    can only be matched exactly, through their blind indexes.
+    """
+
     class Meta:
         model = Profile
         fields = (
@@ -269,24 +429,29 @@ class ProfileFilter(FilterSet):
             "enabled_subscriptions",
         )
 
-    first_name = CharFilter(lookup_expr="icontains")
-    last_name = CharFilter(lookup_expr="icontains")
-    nickname = CharFilter(lookup_expr="icontains")
-    emails__email = CharFilter(lookup_expr="icontains")
+    first_name = CharFilter(lookup_expr="trigram_icontains")
+    last_name = CharFilter(lookup_expr="trigram_icontains")
+    nickname = CharFilter(lookup_expr="trigram_icontains")
+    emails__email = CharFilter(lookup_expr="trigram_icontains")
     emails__email_type = ChoiceFilter(choices=EmailType.choices())
     emails__primary = BooleanFilter()
     emails__verified = BooleanFilter()
-    phones__phone = CharFilter(lookup_expr="icontains")
+    phones__phone = CharFilter(lookup_expr="trigram_icontains")
     phones__phone_type = ChoiceFilter(choices=PhoneType.choices())
     phones__primary = BooleanFilter()
-    addresses__address = CharFilter(lookup_expr="icontains")
-    addresses__postal_code = CharFilter(lookup_expr="icontains")
-    addresses__city = CharFilter(lookup_expr="icontains")
+    addresses__address = CharFilter(lookup_expr="trigram_icontains")
+    addresses__postal_code = CharFilter(lookup_expr="trigram_icontains")
+    addresses__city = CharFilter(lookup_expr="trigram_icontains")
     addresses__country_code = CharFilter(lookup_expr="icontains")
     addresses__address_type = ChoiceFilter(choices=AddressType.choices())
     addresses__primary = BooleanFilter()
     language = CharFilter()
     enabled_subscriptions = CharFilter(method="get_enabled_subscriptions")
+    ssn = CharFilter(field_name="sensitivedata__ssn_index", method="get_blind_index")
+    national_identification_number = CharFilter(
+        field_name="verified_personal_information__national_identification_number_index",
+        method="get_blind_index",
+    )
     order_by = PrimaryContactInfoOrderingFilter(
         fields=(
             ("first_name", "firstName"),
@@ -304,6 +469,26 @@ class ProfileFilter(FilterSet):
             subscriptions__enabled=True, subscriptions__subscription_type__code=value
         )
 
+    def get_blind_index(self, queryset, name, value):
+        """
+        Custom filter for finding profiles by an encrypted identifier, requires the
+        permission to view sensitive data in the service of the query
+        """
+        permissions = get_service_permission_checker(self.request)
+        try:
+            service = permissions.get_service(
+                getattr(self.request, "service_type", None)
+            )
+        except Service.DoesNotExist:
+            service = None
+        if service is None or not permissions.has_perm(
+            "can_view_sensitivedata", service
+        ):
+            raise PermissionDenied(
+                _("You do not have permission to perform this action.")
+            )
+        return queryset.filter(**{name + "__in": get_lookup_blind_indexes(value)})
+
 
 class ContactNode(DjangoObjectType):
     class Meta:
@@ -441,22 +626,22 @@ class RestrictedProfileNode(DjangoObjectType):
     contact_method = ContactMethod()
 
     def resolve_primary_email(self, info, **kwargs):
-        return info.context.primary_email_for_profile_loader.load(self.id)
+        return info.context.loaders.primary_email_for_profile_loader.load(self.id)
 
     def resolve_primary_phone(self, info, **kwargs):
-        return info.context.primary_phone_for_profile_loader.load(self.id)
+        return info.context.loaders.primary_phone_for_profile_loader.load(self.id)
 
     def resolve_primary_address(self, info, **kwargs):
-        return info.context.primary_address_for_profile_loader.load(self.id)
+        return info.context.loaders.primary_address_for_profile_loader.load(self.id)
 
     def resolve_emails(self, info, **kwargs):
-        return info.context.emails_by_profile_id_loader.load(self.id)
+        return info.context.loaders.emails_by_profile_id_loader.load(self.id)
 
     def resolve_phones(self, info, **kwargs):
-        return info.context.phones_by_profile_id_loader.load(self.id)
+        return info.context.loaders.phones_by_profile_id_loader.load(self.id)
 
     def resolve_addresses(self, info, **kwargs):
-        return info.context.addresses_by_profile_id_loader.load(self.id)
+        return info.context.loaders.addresses_by_profile_id_loader.load(self.id)
 
 
 @key(fields="id")
@@ -472,24 +657,31 @@ class ProfileNode(RestrictedProfileNode):
         SensitiveDataNode,
         description="Data that is consider to be sensitive e.g. social security number",
     )
-    service_connections = DjangoFilterConnectionField(
+    service_connections = DjangoConnectionField(
         ServiceConnectionType, description="List of the profile's connected services."
     )
-    subscriptions = DjangoFilterConnectionField(SubscriptionNode)
+    subscriptions = DjangoConnectionField(SubscriptionNode)
 
     def resolve_service_connections(self, info, **kwargs):
-        return ServiceConnection.objects.filter(profile=self)
+        return info.context.loaders.service_connections_by_profile_id_loader.load(
+            self.id
+        )
+
+    def resolve_subscriptions(self, info, **kwargs):
+        return info.context.loaders.subscriptions_by_profile_id_loader.load(self.id)
 
     def resolve_sensitivedata(self, info, **kwargs):
-        service = (
-            Service.objects.filter(service_type=info.context.service_type).first()
-            if hasattr(info.context, "service_type")
-            else None
-        )
-        if (
-            not service and info.context.user == self.user
-        ) or info.context.user.has_perm("can_view_sensitivedata", service):
-            return self.sensitivedata
+        permissions = get_service_permission_checker(info.context)
+        service = None
+        if hasattr(info.context, "service_type"):
+            try:
+                service = permissions.get_service(info.context.service_type)
+            except Service.DoesNotExist:
+                pass
+        if (not service and info.context.user == self.user) or permissions.has_perm(
+            "can_view_sensitivedata", service
+        ):
+            return info.context.loaders.sensitive_data_for_profile_loader.load(self.id)
         else:
             # TODO: We should return PermissionDenied as a partial error here.
             return None
@@ -503,7 +695,9 @@ class ProfileNode(RestrictedProfileNode):
             return None
 
         user = info.context.user
-        if user == profile.user or user_has_staff_perms_to_view_profile(user, profile):
+        if user == profile.user or user_has_staff_perms_to_view_profile(
+            user, profile, get_service_permission_checker(info.context)
+        ):
             return profile
         else:
             raise PermissionDenied(
@@ -527,7 +721,9 @@ class ProfileWithVerifiedPersonalInformationNode(ProfileNode):
     def resolve_verified_personal_information(self, info, **kwargs):
         loa = info.context.user_auth.data.get("loa")
         if loa in ["substantial", "high"]:
-            return self.verified_personal_information
+            return info.context.loaders.verified_personal_information_for_profile_loader.load(
+                self.id
+            )
         else:
             raise PermissionDenied(
                 "No permission to read verified personal information."
@@ -545,6 +741,23 @@ class TemporaryReadAccessTokenNode(DjangoObjectType):
         return self.expires_at()
 
 
+class GDPRJobNode(DjangoObjectType):
+    job_type = AllowedGDPRJobType()
+    status = AllowedGDPRJobStatus()
+    result = graphene.JSONString(
+        description="The downloaded data, when a download job has succeeded."
+    )
+
+    class Meta:
+        model = GDPRJob
+        fields = ("id", "job_type", "status", "attempts", "created_at", "finished_at")
+
+    def resolve_result(self, info, **kwargs):
+        if self.job_type != GDPRJobType.DOWNLOAD or not self.result:
+            return None
+        return json.loads(self.result)
+
+
 class EmailInput(graphene.InputObjectType):
     primary = graphene.Boolean(description="Is this primary mail address.")
 
@@ -707,7 +920,7 @@ class CreateProfileMutation(relay.ClientIDMutation):
     @staff_required(required_permission="manage")
     @transaction.atomic
     def mutate_and_get_payload(cls, root, info, **input):
-        service = Service.objects.get(service_type=input["service_type"])
+        service = service_registry.get(input["service_type"])
         # serviceType passed on to the sub resolvers
         info.context.service_type = input["service_type"]
         profile_data = input.pop("profile")
@@ -725,7 +938,9 @@ class CreateProfileMutation(relay.ClientIDMutation):
             create_nested(model, profile, data)
 
         if sensitivedata:
-            if info.context.user.has_perm("can_manage_sensitivedata", service):
+            if get_service_permission_checker(info.context).has_perm(
+                "can_manage_sensitivedata", service
+            ):
                 SensitiveData.objects.create(profile=profile, **sensitivedata)
                 profile.refresh_from_db()
             else:
@@ -734,7 +949,7 @@ class CreateProfileMutation(relay.ClientIDMutation):
                 )
 
         # create the service connection for the profile
-        profile.service_connections.create(service=service)
+        profile.service_connections.create(service_id=service.pk)
 
         validate_primary_email(profile)
 
@@ -944,7 +1159,7 @@ class UpdateProfileMutation(relay.ClientIDMutation):
     @staff_required(required_permission="manage")
     @transaction.atomic
     def mutate_and_get_payload(cls, root, info, **input):
-        service = Service.objects.get(service_type=input["service_type"])
+        service = service_registry.get(input["service_type"])
         # serviceType passed on to the sub resolvers
         info.context.service_type = input["service_type"]
         profile_data = input.get("profile")
@@ -955,7 +1170,9 @@ class UpdateProfileMutation(relay.ClientIDMutation):
         update_profile(profile, profile_data)
 
         if sensitive_data:
-            if info.context.user.has_perm("can_manage_sensitivedata", service):
+            if get_service_permission_checker(info.context).has_perm(
+                "can_manage_sensitivedata", service
+            ):
                 update_sensitivedata(profile, sensitive_data)
             else:
                 raise PermissionDenied(
@@ -1014,60 +1231,79 @@ class DeleteMyProfileMutation(relay.ClientIDMutation):
             raise ProfileDoesNotExistError("Profile does not exist")
 
         if profile.service_connections.exists():
-            tte = TunnistamoTokenExchange()
+            tte = get_token_exchange()
             api_tokens = tte.fetch_api_tokens(authorization_code)
-            cls.delete_service_connections_for_profile(
-                profile, api_tokens, dry_run=True
-            )
-            cls.delete_service_connections_for_profile(
-                profile, api_tokens, dry_run=False
-            )
+            delete_service_data(profile, api_tokens)
 
         profile.delete()
         info.context.user.delete()
         return DeleteMyProfileMutation()
 
-    @staticmethod
-    def delete_service_connections_for_profile(profile, api_tokens, dry_run=False):
-        failed_services = []
 
-        for service_connection in profile.service_connections.all():
-            service = service_connection.service
+class CreateMyProfileDownloadJobMutation(relay.ClientIDMutation):
+    class Input:
+        authorization_code = graphene.String(
+            required=True,
+            description=(
+                "OAuth/OIDC authoziation code. When obtaining the code, it is required to use "
+                "service and operation specific GDPR API scopes."
+            ),
+        )
 
-            if not service.gdpr_delete_scope:
-                raise ConnectedServiceDeletionNotAllowedError(
-                    f"Connected services: {service.service_type.name}"
-                    f"does not have an API for removing data."
-                )
+    job = graphene.Field(GDPRJobNode)
 
-            api_identifier = service.gdpr_delete_scope.rsplit(".", 1)[0]
-            api_token = api_tokens.get(api_identifier, "")
+    @classmethod
+    @login_required
+    def mutate_and_get_payload(cls, root, info, **input):
+        try:
+            profile = Profile.objects.get(user=info.context.user)
+        except Profile.DoesNotExist:
+            raise ProfileDoesNotExistError("Profile does not exist")
 
-            if not api_token:
-                raise MissingGDPRApiTokenError(
-                    f"Couldn't fetch an API token for service {service.service_type.name}."
-                )
+        api_tokens = {}
+        if profile.service_connections.exists():
+            tte = get_token_exchange()
+            api_tokens = tte.fetch_api_tokens(input["authorization_code"])
+            # Missing tokens can't be fixed by retrying, they are reported right away
+            get_download_api_tokens(profile, api_tokens)
 
-            try:
-                service_connection.delete_gdpr_data(
-                    api_token=api_token, dry_run=dry_run
-                )
-                if not dry_run:
-                    service_connection.delete()
-            except (requests.RequestException, MissingGDPRUrlException):
-                service_name = service.service_type.name
-                failed_services.append(service_name)
-
-        if failed_services:
-            failed_services_string = ", ".join(failed_services)
-            if dry_run:
-                raise ConnectedServiceDeletionNotAllowedError(
-                    f"Connected services: {failed_services_string} did not allow deleting the profile."
-                )
+        job = enqueue_gdpr_job(
+            info.context.user, profile, GDPRJobType.DOWNLOAD, api_tokens
+        )
+        return CreateMyProfileDownloadJobMutation(job=job)
 
-            raise ConnectedServiceDeletionFailedError(
-                f"Deletion failed for the following connected services: {failed_services_string}."
-            )
+
+class CreateMyProfileDeletionJobMutation(relay.ClientIDMutation):
+    class Input:
+        authorization_code = graphene.String(
+            required=True,
+            description=(
+                "OAuth/OIDC authoziation code. When obtaining the code, it is required to use "
+                "service and operation specific GDPR API scopes."
+            ),
+        )
+
+    job = graphene.Field(GDPRJobNode)
+
+    @classmethod
+    @login_required
+    def mutate_and_get_payload(cls, root, info, **input):
+        try:
+            profile = Profile.objects.get(user=info.context.user)
+        except Profile.DoesNotExist:
+            raise ProfileDoesNotExistError("Profile does not exist")
+
+        api_tokens = {}
+        if profile.service_connections.exists():
+            tte = get_token_exchange()
+            api_tokens = tte.fetch_api_tokens(input["authorization_code"])
+            # Services without a deletion API or a token are reported right away
+            get_delete_api_tokens(profile, api_tokens)
+
+        job = enqueue_gdpr_job(
+            info.context.user, profile, GDPRJobType.DELETE, api_tokens
+        )
+        return CreateMyProfileDeletionJobMutation(job=job)
 
 
 class CreateMyProfileTemporaryReadAccessTokenMutation(relay.ClientIDMutation):
@@ -1119,7 +1355,7 @@ class Query(graphene.ObjectType):
         "authentication.\n\nPossible error codes:\n\n* `TODO`",
     )
     # TODO: Add the complete list of error codes
-    profiles = DjangoFilterConnectionField(
+    profiles = ProfilesConnectionField(
         ProfileNode,
         service_type=graphene.Argument(AllowedServiceType, required=True),
         description="Search for profiles. The results are filtered based on the given parameters. The results are "
@@ -1150,10 +1386,18 @@ class Query(graphene.ObjectType):
         "* `PROFILE_DOES_NOT_EXIST_ERROR`\n"
         "* `TOKEN_EXPIRED_ERROR`",
     )
+    my_gdpr_job = graphene.Field(
+        GDPRJobNode,
+        id=graphene.Argument(graphene.UUID, required=True),
+        description="Get a GDPR job of the currently authenticated user, for polling its status and "
+        "fetching the downloaded data.\n\nRequires authentication.\n\n"
+        "Possible error codes:\n\n"
+        "* `OBJECT_DOES_NOT_EXIST_ERROR`: Returned if the user has no job with the given `id`.",
+    )
 
     @staff_required(required_permission="view")
     def resolve_profile(self, info, **kwargs):
-        service = Service.objects.get(service_type=kwargs["service_type"])
+        service = service_registry.get(kwargs["service_type"])
         # serviceType passed on to the sub resolvers
         info.context.service_type = kwargs["service_type"]
         return Profile.objects.filter(service_connections__service=service).get(
@@ -1182,34 +1426,16 @@ class Query(graphene.ObjectType):
         authorization_code = kwargs["authorization_code"]
         profile = Profile.objects.filter(user=info.context.user).first()
 
-        external_data = []
+        results = []
 
         if profile.service_connections.exists():
-            tte = TunnistamoTokenExchange()
+            tte = get_token_exchange()
             api_tokens = tte.fetch_api_tokens(authorization_code)
+            results = download_service_data(
+                profile, api_tokens, deadline=settings.GDPR_DOWNLOAD_DEADLINE
+            )
 
-            for service_connection in profile.service_connections.all():
-                service = service_connection.service
-
-                if not service.gdpr_query_scope:
-                    continue
-
-                api_identifier = service.gdpr_query_scope.rsplit(".", 1)[0]
-                api_token = api_tokens.get(api_identifier, "")
-
-                if not api_token:
-                    raise MissingGDPRApiTokenError(
-                        f"Couldn't fetch an API token for service {service.service_type.name}."
-                    )
-
-                service_connection_data = service_connection.download_gdpr_data(
-                    api_token=api_token
-                )
-
-                if service_connection_data:
-                    external_data.append(service_connection_data)
-
-        return {"key": "DATA", "children": [profile.serialize(), *external_data]}
+        return get_download_data(profile, results)
 
     def resolve_profile_with_access_token(self, info, **kwargs):
         try:
@@ -1222,6 +1448,10 @@ class Query(graphene.ObjectType):
 
         return token.profile
 
+    @login_required
+    def resolve_my_gdpr_job(self, info, **kwargs):
+        return GDPRJob.objects.get(pk=kwargs["id"], user_uuid=info.context.user.uuid)
+
 
 class Mutation(graphene.ObjectType):
     # TODO: Add the complete list of error codes
@@ -1284,3 +1514,17 @@ class Mutation(graphene.ObjectType):
         "Requires authentication.\n\n"
         "Possible error codes:\n\n* `PERMISSION_DENIED_ERROR`"
     )
+    create_my_profile_download_job = CreateMyProfileDownloadJobMutation.Field(
+        description="Queues a job which downloads the data of the profile which is linked to the currently "
+        "authenticated user, including the data in the connected services. The status and the result of the "
+        "job are polled with `myGdprJob`. An unfinished download job is returned instead of queuing another.\n\n"
+        "Requires authentication.\n\nPossible error codes:\n\n"
+        "* `PROFILE_DOES_NOT_EXIST_ERROR`\n* `MISSING_GDPR_API_TOKEN_ERROR`"
+    )
+    create_my_profile_deletion_job = CreateMyProfileDeletionJobMutation.Field(
+        description="Queues a job which deletes the profile which is linked to the currently authenticated user, "
+        "and its data in the connected services. The status of the job is polled with `myGdprJob`. An unfinished "
+        "deletion job is returned instead of queuing another.\n\nRequires authentication.\n\n"
+        "Possible error codes:\n\n* `PROFILE_DOES_NOT_EXIST_ERROR`\n* `MISSING_GDPR_API_TOKEN_ERROR`\n"
+        "* `CONNECTED_SERVICE_DELETION_NOT_ALLOWED_ERROR`"
+    )
@@ -0,0 +1,150 @@
+import json
+import threading
+
+import pytest
+
+from profiles.audit_log import (
+    AuditLogWriter,
+    DatabaseSink,
+    FileSink,
+    get_audit_log_writer,
+)
+from profiles.models import AuditLogEntry
+
+from .factories import ProfileFactory
+
+
+class CollectingSink:
+    def __init__(self):
+        self.batches = []
+        self.threads = []
+
+    def write(self, events):
+        self.batches.append(events)
+        self.threads.append(threading.current_thread())
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+
+class BlockingSink(CollectingSink):
+    """Blocks the writer thread in its first write until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, events):
+        if threading.current_thread().name == "audit-log-writer":
+            self.writing.set()
+            self.release.wait(5)
+        super().write(events)
+
+
+@pytest.fixture
+def blocked_writer():
+    def create(queue_full_policy):
+        sink = BlockingSink()
+        writer = AuditLogWriter(
+            sink, max_queue_size=1, queue_full_policy=queue_full_policy
+        )
+        writer.emit({"n": 1})
+        sink.writing.wait(5)
+        writer.emit({"n": 2})
+        return writer, sink
+
+    return create
+
+
+def test_events_are_written_in_batches_by_the_writer_thread():
+    sink = CollectingSink()
+    writer = AuditLogWriter(sink, batch_size=2)
+
+    for n in range(5):
+        writer.emit({"n": n})
+    writer.flush()
+
+    assert sink.events == [{"n": n} for n in range(5)]
+    assert all(len(batch) <= 2 for batch in sink.batches)
+    assert threading.current_thread() not in sink.threads
+    writer.shutdown()
+
+
+def test_event_is_dropped_when_queue_is_full(blocked_writer):
+    writer, sink = blocked_writer("drop")
+
+    writer.emit({"n": 3})
+    sink.release.set()
+    writer.flush()
+
+    assert writer.dropped == 1
+    assert sink.events == [{"n": 1}, {"n": 2}]
+    writer.shutdown()
+
+
+def test_event_is_written_synchronously_when_queue_is_full(blocked_writer):
+    writer, sink = blocked_writer("sync")
+
+    writer.emit({"n": 3})
+    assert sink.events == [{"n": 3}]
+    sink.release.set()
+    writer.flush()
+
+    assert writer.dropped == 0
+    assert len(sink.events) == 3
+    writer.shutdown()
+
+
+def test_remaining_events_are_written_at_shutdown():
+    sink = CollectingSink()
+    writer = AuditLogWriter(sink, flush_interval=60)
+    writer.emit({"n": 1})
+
+    writer.shutdown()
+    writer.emit({"n": 2})
+
+    assert sink.events == [{"n": 1}, {"n": 2}]
+
+
+def test_invalid_queue_full_policy_raises():
+    with pytest.raises(ValueError):
+        AuditLogWriter(CollectingSink(), queue_full_policy="wait")
+
+
+def test_file_sink_appends_json_lines(tmp_path):
+    filename = tmp_path / "audit.log"
+    sink = FileSink(str(filename))
+
+    sink.write([{"n": 1}, {"n": 2}])
+    sink.write([{"n": 3}])
+
+    lines = filename.read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [{"n": 1}, {"n": 2}, {"n": 3}]
+
+
+def test_database_sink_inserts_entries():
+    DatabaseSink().write([{"n": 1}, {"n": 2}])
+
+    assert sorted(entry.message["n"] for entry in AuditLogEntry.objects.all()) == [
+        1,
+        2,
+    ]
+
+
+def test_audit_events_are_emitted_to_the_configured_writer(settings):
+    settings.AUDIT_LOGGING_ENABLED = True
+    settings.AUDIT_LOG_ASYNC = True
+    settings.AUDIT_LOG_SINK = "profiles.tests.test_audit_log.CollectingSink"
+
+    profile = ProfileFactory()
+    writer = get_audit_log_writer()
+    writer.flush()
+
+    operations = [event["audit_event"]["operation"] for event in writer.sink.events]
+    assert "CREATE" in operations
+    assert writer.sink.events[-1]["audit_event"]["target"]["profile_id"] == str(
+        profile.pk
+    )
+    writer.shutdown()
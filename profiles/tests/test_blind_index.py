@@ -0,0 +1,115 @@
+import pytest
+from django.utils.translation import ugettext_lazy as _
+from graphql_relay.node.node import to_global_id
+from guardian.shortcuts import assign_perm
+
+from profiles.blind_index import (
+    compute_blind_index,
+    get_blind_index_fields,
+    update_blind_indexes,
+)
+from profiles.models import SensitiveData, VerifiedPersonalInformation
+from services.tests.factories import ServiceConnectionFactory
+
+from .factories import SensitiveDataFactory, VerifiedPersonalInformationFactory
+
+OLD_KEY = "00112233445566778899aabbccddeeff"
+NEW_KEY = "ffeeddccbbaa99887766554433221100"
+
+PROFILES_BY_SSN_QUERY = """
+    query getProfiles($ssn: String) {
+        profiles(serviceType: BERTH, ssn: $ssn) {
+            edges {
+                node {
+                    id
+                }
+            }
+        }
+    }
+"""
+
+
+def test_blind_indexes_are_computed_on_save(settings):
+    settings.BLIND_INDEX_KEYS = [NEW_KEY]
+    sensitive_data = SensitiveDataFactory(ssn="010199-123a")
+    vpi = VerifiedPersonalInformationFactory()
+
+    sensitive_data.refresh_from_db()
+    vpi.refresh_from_db()
+    assert sensitive_data.ssn_index == compute_blind_index("010199-123A", NEW_KEY)
+    assert vpi.national_identification_number_index == compute_blind_index(
+        vpi.national_identification_number, NEW_KEY
+    )
+
+
+def test_blind_index_of_a_value_differs_between_keys():
+    assert compute_blind_index("010199-123A", OLD_KEY) != compute_blind_index(
+        "010199-123A", NEW_KEY
+    )
+
+
+def test_update_blind_indexes_rehashes_rows_with_an_old_key(settings):
+    settings.BLIND_INDEX_KEYS = [OLD_KEY]
+    rows = SensitiveDataFactory.create_batch(3)
+    settings.BLIND_INDEX_KEYS = [NEW_KEY, OLD_KEY]
+    (field,) = get_blind_index_fields(SensitiveData)
+
+    assert update_blind_indexes(SensitiveData, field, batch_size=2) == 3
+    assert update_blind_indexes(SensitiveData, field, batch_size=2) == 0
+    for row in rows:
+        row.refresh_from_db()
+        assert row.ssn_index == compute_blind_index(row.ssn, NEW_KEY)
+
+
+def test_blind_index_fields_are_found():
+    assert [
+        field.name for field in get_blind_index_fields(VerifiedPersonalInformation)
+    ] == ["national_identification_number_index"]
+
+
+@pytest.mark.parametrize("rotated", [False, True])
+def test_staff_user_with_sensitive_data_access_can_find_profiles_by_ssn(
+    rf, user_gql_client, group, service, settings, rotated
+):
+    settings.BLIND_INDEX_KEYS = [OLD_KEY]
+    rows = SensitiveDataFactory.create_batch(2)
+    for row in rows:
+        ServiceConnectionFactory(profile=row.profile, service=service)
+    if rotated:
+        # Rows indexed with the old key are found before they are rehashed
+        settings.BLIND_INDEX_KEYS = [NEW_KEY, OLD_KEY]
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    assign_perm("can_view_sensitivedata", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    executed = user_gql_client.execute(
+        PROFILES_BY_SSN_QUERY, variables={"ssn": rows[0].ssn.lower()}, context=request
+    )
+
+    assert "errors" not in executed
+    assert executed["data"]["profiles"]["edges"] == [
+        {"node": {"id": to_global_id("ProfileNode", rows[0].profile.pk)}}
+    ]
+
+
+def test_staff_user_without_sensitive_data_access_cannot_find_profiles_by_ssn(
+    rf, user_gql_client, group, service
+):
+    sensitive_data = SensitiveDataFactory()
+    ServiceConnectionFactory(profile=sensitive_data.profile, service=service)
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    executed = user_gql_client.execute(
+        PROFILES_BY_SSN_QUERY, variables={"ssn": sensitive_data.ssn}, context=request
+    )
+
+    assert executed["errors"][0]["message"] == _(
+        "You do not have permission to perform this action."
+    )
@@ -0,0 +1,143 @@
+import uuid
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+
+from profiles.encryption import (
+    Checkpoint,
+    get_chunks,
+    get_encrypted_models,
+    reencrypt_model,
+)
+from profiles.enums import GDPRJobType
+from profiles.models import (
+    GDPRJob,
+    SensitiveData,
+    VerifiedPersonalInformation,
+    VerifiedPersonalInformationPermanentAddress,
+)
+
+from .factories import SensitiveDataFactory, VerifiedPersonalInformationFactory
+
+
+def test_encrypted_models_are_found():
+    models = get_encrypted_models()
+
+    assert SensitiveData in models
+    assert VerifiedPersonalInformation in models
+    assert VerifiedPersonalInformationPermanentAddress in models
+    assert GDPRJob in models
+
+
+def test_rows_are_split_to_chunks():
+    rows = SensitiveDataFactory.create_batch(5)
+    pks = sorted(row.pk for row in rows)
+
+    assert get_chunks(SensitiveData, 2) == [
+        (pks[0], pks[1]),
+        (pks[2], pks[3]),
+        (pks[4], pks[4]),
+    ]
+    assert get_chunks(SensitiveData, 2, start_after=pks[2]) == [(pks[3], pks[4])]
+
+
+def test_reencrypted_values_stay_the_same():
+    vpis = VerifiedPersonalInformationFactory.create_batch(3)
+    reports = []
+
+    processed, failed = reencrypt_model(
+        VerifiedPersonalInformation,
+        chunk_size=2,
+        report=lambda *args: reports.append(args),
+    )
+
+    assert (processed, failed) == (3, [])
+    assert reports[-1][:2] == (3, 3)
+    for vpi in vpis:
+        reencrypted = VerifiedPersonalInformation.objects.get(pk=vpi.pk)
+        assert reencrypted.first_name == vpi.first_name
+        assert (
+            reencrypted.national_identification_number
+            == vpi.national_identification_number
+        )
+
+
+def test_reencryption_continues_from_the_checkpoint(tmp_path):
+    rows = sorted(SensitiveDataFactory.create_batch(3), key=lambda row: row.pk)
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"))
+    checkpoint.set(SensitiveData._meta.label, rows[0].pk)
+
+    processed, failed = reencrypt_model(
+        SensitiveData, chunk_size=1, checkpoint=Checkpoint(checkpoint.filename)
+    )
+
+    assert processed == 2
+    assert Checkpoint(checkpoint.filename).get(SensitiveData._meta.label) == rows[2].pk
+
+
+def create_gdpr_jobs(count):
+    jobs = [
+        GDPRJob.objects.create(
+            user_uuid=uuid.uuid4(),
+            job_type=GDPRJobType.DOWNLOAD,
+            api_tokens='{"https://api.hel.fi/auth/api": "api_token"}',
+            result='{"key": "DATA"}',
+        )
+        for _ in range(count)
+    ]
+    return sorted(jobs, key=lambda job: job.pk)
+
+
+def test_reencrypted_text_fields_stay_the_same():
+    jobs = create_gdpr_jobs(3)
+
+    processed, failed = reencrypt_model(GDPRJob, chunk_size=2)
+
+    assert (processed, failed) == (3, [])
+    for job in jobs:
+        reencrypted = GDPRJob.objects.get(pk=job.pk)
+        assert reencrypted.api_tokens == job.api_tokens
+        assert reencrypted.result == job.result
+
+
+def test_reencryption_continues_from_a_uuid_checkpoint(tmp_path):
+    jobs = create_gdpr_jobs(3)
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"))
+    checkpoint.set(GDPRJob._meta.label, jobs[0].pk)
+
+    processed, failed = reencrypt_model(
+        GDPRJob, chunk_size=1, checkpoint=Checkpoint(checkpoint.filename)
+    )
+
+    assert (processed, failed) == (2, [])
+    assert Checkpoint(checkpoint.filename).get(GDPRJob._meta.label) == str(jobs[2].pk)
+
+
+def test_rows_which_cannot_be_decrypted_are_reported():
+    broken, ok = SensitiveDataFactory.create_batch(2)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE profiles_sensitivedata SET ssn = %s WHERE id = %s",
+            [b"not encrypted", broken.pk],
+        )
+
+    processed, failed = reencrypt_model(SensitiveData, dry_run=True)
+
+    assert (processed, failed) == (1, [broken.pk])
+
+
+def test_reencrypt_fields_command_removes_the_checkpoint(tmp_path):
+    SensitiveDataFactory()
+    checkpoint = tmp_path / "checkpoint"
+    out = StringIO()
+
+    call_command(
+        "reencrypt_fields",
+        "--processes=1",
+        "--checkpoint={}".format(checkpoint),
+        stdout=out,
+    )
+
+    assert "All rows re-encrypted" in out.getvalue()
+    assert not checkpoint.exists()
@@ -0,0 +1,280 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+import requests
+from django.core.management import call_command
+from django.utils import timezone
+
+from open_city_profile.consts import (
+    MISSING_GDPR_API_TOKEN_ERROR,
+    OBJECT_DOES_NOT_EXIST_ERROR,
+)
+from open_city_profile.oidc import TunnistamoTokenExchange
+from open_city_profile.tests.asserts import assert_match_error_code
+from open_city_profile.tests.factories import UserFactory
+from services.enums import ServiceType
+from services.models import ServiceConnection
+from services.tests.factories import ServiceConnectionFactory
+from users.models import User
+
+from ..enums import GDPRJobStatus, GDPRJobType
+from ..gdpr import claim_gdpr_job, enqueue_gdpr_job, run_gdpr_job, run_gdpr_jobs
+from ..models import GDPRJob, Profile
+from .factories import ProfileFactory, ProfileWithPrimaryEmailFactory
+
+GDPR_URL = "https://example.com/"
+QUERY_SCOPE = "https://api.hel.fi/auth/api.gdprquery"
+DELETE_SCOPE = "https://api.hel.fi/auth/api.gdprdelete"
+GDPR_API_TOKENS = {
+    "https://api.hel.fi/auth/api": "api_token",
+}
+
+CREATE_DOWNLOAD_JOB_MUTATION = """
+    mutation {
+        createMyProfileDownloadJob(input: {authorizationCode: "code123"}) {
+            job {
+                id
+                jobType
+                status
+            }
+        }
+    }
+"""
+CREATE_DELETION_JOB_MUTATION = """
+    mutation {
+        createMyProfileDeletionJob(input: {authorizationCode: "code123"}) {
+            job {
+                id
+                jobType
+                status
+            }
+        }
+    }
+"""
+MY_GDPR_JOB_QUERY = """
+    query getJob($id: UUID!) {
+        myGdprJob(id: $id) {
+            status
+            attempts
+            result
+        }
+    }
+"""
+
+
+@pytest.fixture
+def berth_service(service_factory):
+    return service_factory(
+        service_type=ServiceType.BERTH,
+        gdpr_url=GDPR_URL,
+        gdpr_query_scope=QUERY_SCOPE,
+        gdpr_delete_scope=DELETE_SCOPE,
+    )
+
+
+@pytest.fixture
+def youth_service(service_factory):
+    return service_factory(
+        service_type=ServiceType.YOUTH_MEMBERSHIP,
+        gdpr_url=GDPR_URL,
+        gdpr_query_scope=QUERY_SCOPE,
+        gdpr_delete_scope=DELETE_SCOPE,
+    )
+
+
+@pytest.fixture
+def api_tokens(mocker):
+    return mocker.patch.object(
+        TunnistamoTokenExchange, "fetch_api_tokens", return_value=GDPR_API_TOKENS
+    )
+
+
+def execute(user_gql_client, rf, query, **kwargs):
+    request = rf.post("/graphql")
+    request.user = user_gql_client.user
+    return user_gql_client.execute(query, context=request, **kwargs)
+
+
+def test_download_job_is_queued_once(rf, user_gql_client, berth_service, api_tokens):
+    profile = ProfileFactory(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=berth_service)
+
+    executed = execute(user_gql_client, rf, CREATE_DOWNLOAD_JOB_MUTATION)
+    repeated = execute(user_gql_client, rf, CREATE_DOWNLOAD_JOB_MUTATION)
+
+    job = executed["data"]["createMyProfileDownloadJob"]["job"]
+    assert job["jobType"] == "DOWNLOAD"
+    assert job["status"] == "PENDING"
+    assert repeated["data"]["createMyProfileDownloadJob"]["job"]["id"] == job["id"]
+    assert GDPRJob.objects.count() == 1
+    assert json.loads(GDPRJob.objects.get().api_tokens) == GDPR_API_TOKENS
+
+
+def test_job_is_not_queued_without_the_api_tokens(
+    rf, user_gql_client, berth_service, mocker
+):
+    mocker.patch.object(TunnistamoTokenExchange, "fetch_api_tokens", return_value={})
+    profile = ProfileFactory(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=berth_service)
+
+    executed = execute(user_gql_client, rf, CREATE_DELETION_JOB_MUTATION)
+
+    assert_match_error_code(executed, MISSING_GDPR_API_TOKEN_ERROR)
+    assert not GDPRJob.objects.exists()
+
+
+def test_downloaded_data_is_polled_with_the_job(
+    rf, user_gql_client, berth_service, api_tokens, mocker
+):
+    expected = {"key": "BERTH", "children": [{"key": "CUSTOMERID", "value": "123"}]}
+    mocker.patch.object(ServiceConnection, "download_gdpr_data", return_value=expected)
+    profile = ProfileWithPrimaryEmailFactory(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=berth_service)
+    executed = execute(user_gql_client, rf, CREATE_DOWNLOAD_JOB_MUTATION)
+    job_id = executed["data"]["createMyProfileDownloadJob"]["job"]["id"]
+
+    assert run_gdpr_jobs() == 1
+
+    executed = execute(user_gql_client, rf, MY_GDPR_JOB_QUERY, variables={"id": job_id})
+    job = executed["data"]["myGdprJob"]
+    assert job["status"] == "SUCCEEDED"
+    assert job["attempts"] == 1
+    assert expected in json.loads(job["result"])["children"]
+    assert GDPRJob.objects.get().api_tokens == ""
+
+
+def test_jobs_of_other_users_are_not_found(rf, user_gql_client):
+    profile = ProfileFactory()
+    job = enqueue_gdpr_job(profile.user, profile, GDPRJobType.DOWNLOAD, {})
+
+    executed = execute(
+        user_gql_client, rf, MY_GDPR_JOB_QUERY, variables={"id": str(job.pk)}
+    )
+
+    assert_match_error_code(executed, OBJECT_DOES_NOT_EXIST_ERROR)
+
+
+def test_download_is_retried_while_a_service_is_down(berth_service, settings, mocker):
+    settings.GDPR_JOB_MAX_ATTEMPTS = 2
+    mocker.patch.object(
+        ServiceConnection,
+        "download_gdpr_data",
+        side_effect=requests.ConnectionError("Service is down"),
+    )
+    profile = ProfileFactory()
+    ServiceConnectionFactory(profile=profile, service=berth_service)
+    job = enqueue_gdpr_job(profile.user, profile, GDPRJobType.DOWNLOAD, GDPR_API_TOKENS)
+
+    run_gdpr_jobs()
+
+    job.refresh_from_db()
+    assert job.status == GDPRJobStatus.PENDING
+    assert job.run_after > timezone.now()
+    assert run_gdpr_jobs() == 0
+
+    # The data of the other services is returned on the last attempt
+    GDPRJob.objects.update(run_after=timezone.now())
+    run_gdpr_jobs()
+
+    job.refresh_from_db()
+    assert job.status == GDPRJobStatus.SUCCEEDED
+    assert job.attempts == 2
+    assert json.loads(job.result)["children"][1] == {"key": "BERTH", "status": "ERROR"}
+
+
+def test_download_is_retried_when_a_service_responds_with_an_error(
+    berth_service, requests_mock
+):
+    profile = ProfileFactory()
+    ServiceConnectionFactory(profile=profile, service=berth_service)
+    requests_mock.get(f"{GDPR_URL}{profile.pk}", status_code=503)
+    job = enqueue_gdpr_job(profile.user, profile, GDPRJobType.DOWNLOAD, GDPR_API_TOKENS)
+
+    run_gdpr_jobs()
+
+    job.refresh_from_db()
+    assert job.status == GDPRJobStatus.PENDING
+    assert job.attempts == 1
+    assert "BERTH" in job.error
+
+
+def test_deletion_job_continues_where_the_failed_attempt_stopped(
+    berth_service, youth_service, mocker
+):
+    calls = []
+    berth_is_down = True
+
+    def mock_delete_gdpr_data(self, api_token, dry_run=False):
+        calls.append((self.service.service_type, dry_run))
+        if self.service.service_type == ServiceType.BERTH and berth_is_down:
+            if not dry_run:
+                raise requests.HTTPError("Service is down")
+
+    mocker.patch.object(
+        ServiceConnection,
+        "delete_gdpr_data",
+        autospec=True,
+        side_effect=mock_delete_gdpr_data,
+    )
+    profile = ProfileFactory()
+    user = profile.user
+    ServiceConnectionFactory(profile=profile, service=berth_service)
+    ServiceConnectionFactory(profile=profile, service=youth_service)
+    job = enqueue_gdpr_job(user, profile, GDPRJobType.DELETE, GDPR_API_TOKENS)
+
+    run_gdpr_jobs()
+
+    job.refresh_from_db()
+    assert job.status == GDPRJobStatus.PENDING
+    assert ServiceConnection.objects.get().service == berth_service
+
+    calls.clear()
+    berth_is_down = False
+    GDPRJob.objects.update(run_after=timezone.now())
+    run_gdpr_jobs()
+
+    job.refresh_from_db()
+    assert calls == [(ServiceType.BERTH, True), (ServiceType.BERTH, False)]
+    assert job.status == GDPRJobStatus.SUCCEEDED
+    assert job.api_tokens == ""
+    assert not Profile.objects.filter(pk=profile.pk).exists()
+    assert not User.objects.filter(pk=user.pk).exists()
+
+
+def test_interrupted_job_is_claimed_again(settings):
+    settings.GDPR_JOB_LOCK_TIMEOUT = 60
+    user = UserFactory()
+    job = enqueue_gdpr_job(user, None, GDPRJobType.DELETE, {})
+    assert claim_gdpr_job() == job
+    assert claim_gdpr_job() is None
+
+    GDPRJob.objects.update(locked_at=timezone.now() - timedelta(seconds=61))
+    claimed = claim_gdpr_job()
+
+    assert claimed == job
+    assert claimed.attempts == 2
+
+
+def test_job_claimed_by_another_worker_is_not_updated():
+    user = UserFactory()
+    enqueue_gdpr_job(user, None, GDPRJobType.DELETE, {})
+    job = claim_gdpr_job()
+    GDPRJob.objects.update(locked_at=timezone.now() + timedelta(seconds=1))
+
+    run_gdpr_job(job)
+
+    assert GDPRJob.objects.get().status == GDPRJobStatus.RUNNING
+
+
+def test_run_gdpr_jobs_command_runs_the_due_jobs():
+    user = UserFactory()
+    enqueue_gdpr_job(user, None, GDPRJobType.DELETE, {})
+    out = StringIO()
+
+    call_command("run_gdpr_jobs", "--once", stdout=out)
+
+    assert "Ran 1 GDPR jobs" in out.getvalue()
+    assert GDPRJob.objects.get().status == GDPRJobStatus.SUCCEEDED
+    assert not User.objects.filter(pk=user.pk).exists()
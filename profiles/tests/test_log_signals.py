@@ -2,11 +2,13 @@ import json
 
 import pytest
 from django.conf import settings
+from django.http import HttpResponse
 from django.test.utils import patch_logger
 
+from profiles.middleware import SetUser
 from profiles.models import Profile
 
-from .factories import ProfileFactory
+from .factories import ProfileFactory, SensitiveDataFactory
 
 
 @pytest.fixture()
@@ -79,3 +81,76 @@ def test_audit_log_create(user, enable_audit_log, enable_audit_log_username):
             "profile_id": str(profile.pk),
             "profile_part": "base profile",
         }
+
+
+def test_audit_log_reads_are_emitted_once_per_request(rf, user, enable_audit_log):
+    profile = ProfileFactory(user=user)
+    SensitiveDataFactory(profile=profile)
+    request = rf.get("/")
+    request.user = user
+
+    def get_response(request):
+        for _ in range(3):
+            Profile.objects.get(pk=profile.pk).sensitivedata
+        return HttpResponse()
+
+    with patch_logger("audit", "info") as cm:
+        SetUser(get_response)(request)
+
+    log_messages = [json.loads(message) for message in cm]
+    assert sorted(
+        message["audit_event"]["target"]["profile_part"] for message in log_messages
+    ) == ["base profile", "sensitive data"]
+    for log_message in log_messages:
+        assert log_message["audit_event"]["operation"] == "READ"
+        assert log_message["audit_event"]["actor"] == {
+            "role": "OWNER",
+            "user_id": str(user.uuid),
+        }
+        assert log_message["audit_event"]["target"]["user_id"] == str(user.uuid)
+
+
+def test_audit_log_read_target_users_are_fetched_in_one_query(
+    rf, user, enable_audit_log, django_assert_num_queries
+):
+    profiles = ProfileFactory.create_batch(3)
+    request = rf.get("/")
+    request.user = user
+
+    def get_response(request):
+        list(Profile.objects.all())
+        return HttpResponse()
+
+    with patch_logger("audit", "info") as cm, django_assert_num_queries(2):
+        SetUser(get_response)(request)
+
+    assert {
+        json.loads(message)["audit_event"]["target"]["user_id"] for message in cm
+    } == {str(profile.user.uuid) for profile in profiles}
+
+
+def test_audit_log_reads_of_a_profile_deleted_in_the_request_keep_the_owner(
+    rf, user, enable_audit_log
+):
+    profile = ProfileFactory(user=user)
+    request = rf.get("/")
+    request.user = user
+
+    def get_response(request):
+        Profile.objects.get(pk=profile.pk).delete()
+        request.user.delete()
+        return HttpResponse()
+
+    with patch_logger("audit", "info") as cm:
+        SetUser(get_response)(request)
+
+    [log_message] = [
+        json.loads(message)
+        for message in cm
+        if json.loads(message)["audit_event"]["operation"] == "READ"
+    ]
+    assert log_message["audit_event"]["actor"] == {
+        "role": "OWNER",
+        "user_id": str(user.uuid),
+    }
+    assert log_message["audit_event"]["target"]["user_id"] == str(user.uuid)
@@ -7,11 +7,15 @@ from django.test import override_settings
 
 from open_city_profile.exceptions import ProfileMustHaveOnePrimaryEmail
 from services.enums import ServiceType
+from services.tests.factories import ServiceConnectionFactory
+from subscriptions.tests.factories import SubscriptionFactory
 
 from ..models import Email, Profile, TemporaryReadAccessToken
 from ..schema import validate_primary_email
 from .factories import (
+    AddressFactory,
     EmailFactory,
+    PhoneFactory,
     ProfileWithPrimaryEmailFactory,
     SensitiveDataFactory,
     VerifiedPersonalInformationFactory,
@@ -88,6 +92,27 @@ def test_serialize_profile(profile):
     assert expected_sensitive_data in serialized_profile.get("children")
 
 
+@pytest.mark.parametrize("count", [1, 3])
+def test_serialize_profile_in_a_fixed_number_of_queries(
+    profile, service, django_assert_num_queries, count
+):
+    SensitiveDataFactory(profile=profile)
+    EmailFactory.create_batch(count, profile=profile)
+    PhoneFactory.create_batch(count, profile=profile)
+    AddressFactory.create_batch(count, profile=profile)
+    SubscriptionFactory.create_batch(count, profile=profile)
+    ServiceConnectionFactory(profile=profile, service=service)
+    profile = Profile.objects.get(pk=profile.pk)
+    expected = profile.serialize()
+    profile = Profile.objects.get(pk=profile.pk)
+
+    # One query for each relation, the services and the subscription types
+    # are fetched with the connections and the subscriptions
+    with django_assert_num_queries(6):
+        Profile.prefetch_for_serialize([profile])
+        assert profile.serialize() == expected
+
+
 def test_import_customer_data_with_valid_data_set(service_factory):
     service_factory()
     data = [
@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+from django.db import connection
+
+from profiles.models import Address, Email, Profile
+from profiles.schema import ProfileFilter
+
+from .factories import EmailFactory, ProfileFactory
+
+GENERATED_PROFILES = 5
+
+
+@pytest.fixture
+def generated_profiles():
+    profiles = Profile.objects.bulk_create(
+        Profile(first_name=f"Firstname{i}", last_name=uuid.uuid4().hex)
+        for i in range(GENERATED_PROFILES)
+    )
+    Email.objects.bulk_create(
+        Email(profile=profile, email=f"{uuid.uuid4().hex}@example.com", primary=True)
+        for profile in profiles
+    )
+    Address.objects.bulk_create(
+        Address(
+            profile=profile,
+            address=uuid.uuid4().hex,
+            postal_code="00100",
+            city="Helsinki",
+            country_code="FI",
+        )
+        for profile in profiles
+    )
+    return profiles
+
+
+@pytest.fixture
+def seqscan_disabled():
+    """Make the planner use an index whenever it can, regardless of the table size."""
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+
+
+def test_text_filters_are_case_insensitive_substring_matches():
+    profile = ProfileFactory(first_name="Adam", last_name="Tester")
+    EmailFactory(profile=profile, email="adam.tester@example.com")
+    ProfileFactory(first_name="Bryan", last_name="Te%ter")
+
+    def filtered(**data):
+        return list(ProfileFilter(data, queryset=Profile.objects.all()).qs)
+
+    assert filtered(first_name="DA") == [profile]
+    assert filtered(last_name="ester") == [profile]
+    assert filtered(last_name="e%t") == []
+    assert filtered(emails__email="TESTER@EXAMPLE") == [profile]
+
+
+@pytest.mark.parametrize(
+    "field_name,index_name",
+    [
+        ("last_name", "profile_last_name_trgm"),
+        ("emails__email", "email_email_trgm"),
+        ("addresses__address", "address_address_trgm"),
+    ],
+)
+def test_text_filters_use_trigram_indexes(
+    generated_profiles, seqscan_disabled, field_name, index_name
+):
+    profile = generated_profiles[GENERATED_PROFILES // 2]
+    if field_name == "last_name":
+        value = profile.last_name
+    elif field_name == "emails__email":
+        value = profile.emails.get().email
+    else:
+        value = profile.addresses.get().address
+    search = value[4:16].upper()
+
+    queryset = ProfileFilter({field_name: search}, queryset=Profile.objects.all()).qs
+
+    assert list(queryset) == [profile]
+    assert index_name in queryset.explain()
@@ -1,10 +1,20 @@
 import pytest
+from django.db import connection
+from graphql_relay.node.node import to_global_id
 from guardian.shortcuts import assign_perm
 
 from services.enums import ServiceType
 from services.tests.factories import ServiceConnectionFactory
 
-from ..utils import user_has_staff_perms_to_view_profile
+from ..enums import AddressType, EmailType
+from ..models import Address, Email, ProfilePrimaryContactInfo
+from ..utils import (
+    create_nested,
+    delete_nested,
+    update_nested,
+    user_has_staff_perms_to_view_profile,
+)
+from .factories import AddressFactory, EmailFactory
 
 
 @pytest.mark.parametrize("user_should_have_perms", [True, False])
@@ -22,3 +32,79 @@ def test_user_has_admin_perms_to_view_profile_util(
     else:
         ServiceConnectionFactory(profile=profile, service=service_2)
         assert not user_has_staff_perms_to_view_profile(user, profile)
+
+
+def test_nested_contact_changes_update_primary_contact_info(profile):
+    create_nested(
+        Email,
+        profile,
+        [
+            {
+                "email": "first@example.com",
+                "email_type": EmailType.PERSONAL,
+                "primary": True,
+            }
+        ],
+    )
+    create_nested(
+        Address,
+        profile,
+        [
+            {
+                "address": "Autotie 1",
+                "postal_code": "00100",
+                "city": "Helsinki",
+                "country_code": "FI",
+                "address_type": AddressType.HOME,
+                "primary": True,
+            }
+        ],
+    )
+    profile.primary_contact_info.refresh_from_db()
+    assert profile.primary_contact_info.email == "first@example.com"
+    assert profile.primary_contact_info.city == "Helsinki"
+
+    address = profile.addresses.get()
+    update_nested(
+        Address,
+        profile,
+        [{"id": to_global_id("AddressNode", address.pk), "city": "Espoo"}],
+    )
+    profile.primary_contact_info.refresh_from_db()
+    assert profile.primary_contact_info.city == "Espoo"
+
+    delete_nested(Address, profile, [to_global_id("AddressNode", address.pk)])
+    profile.primary_contact_info.refresh_from_db()
+    assert profile.primary_contact_info.email == "first@example.com"
+    assert profile.primary_contact_info.address is None
+    assert profile.primary_contact_info.city is None
+
+
+def test_contact_changes_update_primary_contact_info(profile):
+    email = EmailFactory(profile=profile, email="first@example.com", primary=True)
+    AddressFactory(profile=profile, city="Helsinki", primary=True)
+    profile.primary_contact_info.refresh_from_db()
+    assert profile.primary_contact_info.email == "first@example.com"
+    assert profile.primary_contact_info.city == "Helsinki"
+
+    email.email = "second@example.com"
+    email.save()
+    profile.primary_contact_info.refresh_from_db()
+    assert profile.primary_contact_info.email == "second@example.com"
+
+    email.delete()
+    profile.primary_contact_info.refresh_from_db()
+    assert profile.primary_contact_info.email is None
+    assert profile.primary_contact_info.city == "Helsinki"
+
+
+def test_profile_with_contacts_can_be_deleted(profile):
+    EmailFactory(profile=profile, primary=True)
+    AddressFactory(profile=profile, primary=True)
+
+    profile.delete()
+
+    # The foreign keys are checked at the end of the transaction
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    assert not ProfilePrimaryContactInfo.objects.filter(pk=profile.pk).exists()
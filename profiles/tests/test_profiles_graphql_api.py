@@ -3,15 +3,20 @@ from datetime import datetime, timedelta
 from string import Template
 
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from graphene import relay
+from graphql_relay.connection.arrayconnection import offset_to_cursor
 from graphql_relay.node.node import from_global_id, to_global_id
 from guardian.shortcuts import assign_perm
 from helusers.authz import UserAuthorization
 
 from open_city_profile.consts import (
     API_NOT_IMPLEMENTED_ERROR,
+    INVALID_CURSOR_ERROR,
     INVALID_EMAIL_FORMAT_ERROR,
     OBJECT_DOES_NOT_EXIST_ERROR,
     PERMISSION_DENIED_ERROR,
@@ -19,6 +24,7 @@ from open_city_profile.consts import (
     PROFILE_MUST_HAVE_ONE_PRIMARY_EMAIL,
     TOKEN_EXPIRED_ERROR,
 )
+from open_city_profile.query_budget import track_queries
 from open_city_profile.tests import to_graphql_name
 from open_city_profile.tests.asserts import assert_almost_equal, assert_match_error_code
 from open_city_profile.tests.factories import GroupFactory
@@ -53,6 +59,13 @@ from .factories import (
     VerifiedPersonalInformationFactory,
 )
 
+# Maximum number of database queries each operation may use, regardless of how
+# many profiles or contacts it returns. Checked with `track_queries`.
+QUERY_BUDGETS = {
+    "getMyProfile": 8,
+    "getBerthProfiles": 12,
+}
+
 
 def test_normal_user_can_create_profile(rf, user_gql_client, email_data, profile_data):
     request = rf.post("/graphql")
@@ -1505,7 +1518,7 @@ def test_staff_user_can_filter_berth_profiles(rf, user_gql_client, group, servic
         }
     """
 
-    expected_data = {"profiles": {"count": 1, "totalCount": 2}}
+    expected_data = {"profiles": {"count": 1, "totalCount": 1}}
 
     executed = user_gql_client.execute(
         query,
@@ -1519,6 +1532,78 @@ def test_staff_user_can_filter_berth_profiles(rf, user_gql_client, group, servic
     assert dict(executed["data"]) == expected_data
 
 
+def test_staff_user_can_paginate_berth_profiles_without_counting_them(
+    rf, user_gql_client, group, service
+):
+    for profile in ProfileFactory.create_batch(3):
+        ServiceConnectionFactory(profile=profile, service=service)
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    query = """
+        query getBerthProfiles {
+            profiles(serviceType: BERTH, first: 2) {
+                pageInfo {
+                    hasNextPage
+                }
+                edges {
+                    node {
+                        firstName
+                    }
+                }
+            }
+        }
+    """
+
+    with CaptureQueriesContext(connection) as context:
+        executed = user_gql_client.execute(query, context=request)
+
+    assert "errors" not in executed
+    assert executed["data"]["profiles"]["pageInfo"]["hasNextPage"] is True
+    assert len(executed["data"]["profiles"]["edges"]) == 2
+    assert not any(
+        "COUNT(" in captured["sql"].upper() for captured in context.captured_queries
+    )
+
+
+def test_staff_user_can_get_estimated_total_count_of_berth_profiles(
+    rf, user_gql_client, group, service, settings
+):
+    settings.PROFILES_TOTAL_COUNT_ESTIMATE = True
+    settings.PROFILES_TOTAL_COUNT_ESTIMATE_CACHE_TIMEOUT = 60
+    cache.clear()
+    for profile in ProfileFactory.create_batch(3):
+        ServiceConnectionFactory(profile=profile, service=service)
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    query = """
+        query getBerthProfiles {
+            profiles(serviceType: BERTH, first: 1) {
+                totalCount
+            }
+        }
+    """
+
+    executed = user_gql_client.execute(query, context=request)
+    assert "errors" not in executed
+    assert isinstance(executed["data"]["profiles"]["totalCount"], int)
+
+    with CaptureQueriesContext(connection) as context:
+        cached = user_gql_client.execute(query, context=request)
+
+    assert cached["data"] == executed["data"]
+    assert not any(
+        captured["sql"].startswith("EXPLAIN") for captured in context.captured_queries
+    )
+
+
 def test_staff_user_can_sort_berth_profiles(rf, user_gql_client, group, service):
     profile_1, profile_2 = (
         ProfileFactory(first_name="Adam", last_name="Tester"),
@@ -1630,6 +1715,39 @@ def test_staff_user_can_sort_berth_profiles_by_custom_fields(
     assert dict(executed["data"]) == expected_data
 
 
+def test_staff_user_can_sort_berth_profiles_by_multiple_fields(
+    rf, user_gql_client, group, service
+):
+    for first_name, country_code in [("Adam", "SE"), ("Bryan", "FI"), ("Cecil", "FI")]:
+        profile = ProfileFactory(first_name=first_name)
+        AddressFactory(profile=profile, country_code=country_code, primary=True)
+        ServiceConnectionFactory(profile=profile, service=service)
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    query = """
+        query getBerthProfiles {
+            profiles(serviceType: BERTH, orderBy: "primaryCountryCode,-firstName") {
+                edges {
+                    node {
+                        firstName
+                    }
+                }
+            }
+        }
+    """
+
+    executed = user_gql_client.execute(query, context=request)
+    assert "errors" not in executed
+    first_names = [
+        edge["node"]["firstName"] for edge in executed["data"]["profiles"]["edges"]
+    ]
+    assert first_names == ["Cecil", "Bryan", "Adam"]
+
+
 def test_staff_user_can_filter_berth_profiles_by_emails(
     rf, user_gql_client, group, service
 ):
@@ -2171,6 +2289,222 @@ def test_staff_user_can_paginate_berth_profiles(rf, user_gql_client, group, serv
     assert executed["data"]["profiles"] == expected_data
 
 
+def test_staff_user_can_paginate_berth_profiles_with_keyset_cursors(
+    rf, user_gql_client, group, service
+):
+    for first_name in ["Adam", "Bryan", "Bryan", "Charlie"]:
+        ServiceConnectionFactory(
+            profile=ProfileFactory(first_name=first_name), service=service
+        )
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    query = """
+        query getBerthProfiles($after: String){
+            profiles(serviceType: BERTH, orderBy: "-firstName", first: 3, after: $after) {
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+                edges {
+                    node {
+                        firstName
+                    }
+                }
+            }
+        }
+    """
+
+    executed = user_gql_client.execute(query, context=request)
+    assert "errors" not in executed
+    profiles = executed["data"]["profiles"]
+    assert [edge["node"]["firstName"] for edge in profiles["edges"]] == [
+        "Charlie",
+        "Bryan",
+        "Bryan",
+    ]
+    assert profiles["pageInfo"]["hasNextPage"] is True
+
+    executed = user_gql_client.execute(
+        query, variables={"after": profiles["pageInfo"]["endCursor"]}, context=request
+    )
+    assert "errors" not in executed
+    profiles = executed["data"]["profiles"]
+    assert [edge["node"]["firstName"] for edge in profiles["edges"]] == ["Adam"]
+    assert profiles["pageInfo"]["hasNextPage"] is False
+
+
+def test_staff_user_can_paginate_berth_profiles_backwards_by_primary_city(
+    rf, user_gql_client, group, service
+):
+    for city in ["Espoo", "Helsinki", "Vantaa"]:
+        profile = ProfileFactory()
+        AddressFactory(profile=profile, city=city, primary=True)
+        ServiceConnectionFactory(profile=profile, service=service)
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    query = """
+        query getBerthProfiles($before: String){
+            profiles(serviceType: BERTH, orderBy: "primaryCity", last: 2, before: $before) {
+                pageInfo {
+                    hasPreviousPage
+                    startCursor
+                }
+                edges {
+                    node {
+                        primaryAddress {
+                            city
+                        }
+                    }
+                }
+            }
+        }
+    """
+
+    executed = user_gql_client.execute(query, context=request)
+    assert "errors" not in executed
+    profiles = executed["data"]["profiles"]
+    cities = [edge["node"]["primaryAddress"]["city"] for edge in profiles["edges"]]
+    assert cities == ["Helsinki", "Vantaa"]
+    assert profiles["pageInfo"]["hasPreviousPage"] is True
+
+    executed = user_gql_client.execute(
+        query,
+        variables={"before": profiles["pageInfo"]["startCursor"]},
+        context=request,
+    )
+    assert "errors" not in executed
+    profiles = executed["data"]["profiles"]
+    cities = [edge["node"]["primaryAddress"]["city"] for edge in profiles["edges"]]
+    assert cities == ["Espoo"]
+    assert profiles["pageInfo"]["hasPreviousPage"] is False
+
+
+def test_staff_user_can_paginate_berth_profiles_with_offset_cursors(
+    rf, user_gql_client, group, service
+):
+    for first_name in ["Adam", "Bryan", "Charlie"]:
+        ServiceConnectionFactory(
+            profile=ProfileFactory(first_name=first_name), service=service
+        )
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    query = """
+        query getBerthProfiles($after: String){
+            profiles(serviceType: BERTH, orderBy: "firstName", first: 1, after: $after) {
+                edges {
+                    node {
+                        firstName
+                    }
+                }
+            }
+        }
+    """
+
+    executed = user_gql_client.execute(
+        query, variables={"after": offset_to_cursor(0)}, context=request
+    )
+    assert "errors" not in executed
+    assert executed["data"]["profiles"]["edges"] == [{"node": {"firstName": "Bryan"}}]
+
+
+def test_invalid_cursor_returns_error(rf, user_gql_client, group, service):
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    query = """
+        query getBerthProfiles {
+            profiles(serviceType: BERTH, first: 1, after: "invalid") {
+                edges {
+                    node {
+                        firstName
+                    }
+                }
+            }
+        }
+    """
+
+    executed = user_gql_client.execute(query, context=request)
+    assert_match_error_code(executed, INVALID_CURSOR_ERROR)
+
+
+def test_profiles_nested_connections_are_loaded_in_batches(
+    rf, user_gql_client, group, service
+):
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    subscription_type = SubscriptionTypeFactory()
+
+    query = """
+        query getBerthProfiles {
+            profiles(serviceType: BERTH) {
+                edges {
+                    node {
+                        serviceConnections {
+                            edges {
+                                node {
+                                    enabled
+                                }
+                            }
+                        }
+                        subscriptions {
+                            edges {
+                                node {
+                                    enabled
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    """
+
+    def execute_and_count_queries():
+        request = rf.post("/graphql")
+        request.user = user
+        with CaptureQueriesContext(connection) as context:
+            executed = user_gql_client.execute(query, context=request)
+        assert "errors" not in executed
+        return len(context.captured_queries), request.loaders
+
+    def create_profile():
+        profile = ProfileFactory()
+        ServiceConnectionFactory(profile=profile, service=service)
+        Subscription.objects.create(
+            profile=profile, subscription_type=subscription_type
+        )
+
+    create_profile()
+    queries_for_one_profile, loaders = execute_and_count_queries()
+
+    for i in range(4):
+        create_profile()
+    queries_for_five_profiles, loaders = execute_and_count_queries()
+
+    assert queries_for_five_profiles == queries_for_one_profile
+    for loader_name in (
+        "service_connections_by_profile_id_loader",
+        "subscriptions_by_profile_id_loader",
+    ):
+        assert loaders.stats()[loader_name].batch_sizes == [5]
+
+
 def test_staff_user_with_group_access_can_query_only_profiles_he_has_access_to(
     rf, user_gql_client, group, service_factory
 ):
@@ -4026,3 +4360,111 @@ class TestTemporaryProfileReadAccessToken(TemporaryProfileReadAccessTokenTestBas
         )
 
         assert executed["errors"][0]["extensions"]["code"] == TOKEN_EXPIRED_ERROR
+
+
+@pytest.mark.parametrize("contact_count", [1, 10])
+def test_my_profile_query_stays_within_query_budget(
+    rf, user_gql_client, service, contact_count
+):
+    profile = ProfileFactory(user=user_gql_client.user)
+    EmailFactory.create_batch(contact_count, profile=profile, primary=False)
+    PhoneFactory.create_batch(contact_count, profile=profile)
+    AddressFactory.create_batch(contact_count, profile=profile)
+    ServiceConnectionFactory(profile=profile, service=service)
+    request = rf.post("/graphql")
+    request.user = user_gql_client.user
+
+    query = """
+        query getMyProfile {
+            myProfile {
+                firstName
+                primaryEmail {
+                    email
+                }
+                emails {
+                    edges {
+                        node {
+                            email
+                        }
+                    }
+                }
+                phones {
+                    edges {
+                        node {
+                            phone
+                        }
+                    }
+                }
+                addresses {
+                    edges {
+                        node {
+                            city
+                        }
+                    }
+                }
+                serviceConnections {
+                    edges {
+                        node {
+                            service {
+                                type
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    """
+
+    with track_queries(request, budgets=QUERY_BUDGETS):
+        executed = user_gql_client.execute(query, context=request)
+
+    assert "errors" not in executed
+
+
+@pytest.mark.parametrize("profile_count", [1, 10])
+def test_berth_profiles_query_stays_within_query_budget(
+    rf, user_gql_client, group, service, profile_count
+):
+    for profile in ProfileFactory.create_batch(profile_count):
+        EmailFactory(profile=profile)
+        PhoneFactory(profile=profile)
+        AddressFactory(profile=profile, primary=True)
+        ServiceConnectionFactory(profile=profile, service=service)
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    request = rf.post("/graphql")
+    request.user = user
+
+    query = """
+        query getBerthProfiles {
+            profiles(serviceType: BERTH, orderBy: "primaryCity") {
+                edges {
+                    node {
+                        firstName
+                        primaryEmail {
+                            email
+                        }
+                        primaryPhone {
+                            phone
+                        }
+                        primaryAddress {
+                            city
+                        }
+                        serviceConnections {
+                            edges {
+                                node {
+                                    enabled
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    """
+
+    with track_queries(request, budgets=QUERY_BUDGETS):
+        executed = user_gql_client.execute(query, context=request)
+
+    assert "errors" not in executed
@@ -1,5 +1,6 @@
 import copy
 import json
+import threading
 
 import pytest
 import requests
@@ -116,7 +117,7 @@ def test_user_can_download_profile_with_connected_services(
 ):
     expected = {"key": "BERTH", "children": [{"key": "CUSTOMERID", "value": "123"}]}
 
-    def mock_download_gdpr_data(self, api_token: str):
+    def mock_download_gdpr_data(self, api_token: str, raise_errors=False):
         if self.service.service_type == ServiceType.BERTH:
             return expected
         else:
@@ -150,7 +151,7 @@ def test_user_can_download_profile_with_connected_services(
 def test_user_can_download_profile_using_correct_api_tokens(
     rf, user_gql_client, youth_service, berth_service, mocker
 ):
-    def mock_download_gdpr_data(self, api_token: str):
+    def mock_download_gdpr_data(self, api_token: str, raise_errors=False):
         if (
             self.service.service_type == ServiceType.BERTH and api_token == "api_token"
         ) or (
@@ -188,6 +189,44 @@ def test_user_can_download_profile_using_correct_api_tokens(
     assert executed["data"]["downloadMyProfile"]
 
 
+def test_download_profile_tells_which_services_did_not_respond_in_time(
+    rf, user_gql_client, youth_service, berth_service, mocker, settings
+):
+    settings.GDPR_DOWNLOAD_DEADLINE = 0.1
+    expected = {"key": "BERTH", "children": [{"key": "CUSTOMERID", "value": "123"}]}
+    release = threading.Event()
+
+    def mock_download_gdpr_data(self, api_token: str, raise_errors=False):
+        if self.service.service_type == ServiceType.BERTH:
+            return expected
+        release.wait(5)
+        return {}
+
+    mocker.patch.object(
+        ServiceConnection,
+        "download_gdpr_data",
+        autospec=True,
+        side_effect=mock_download_gdpr_data,
+    )
+    mocker.patch.object(
+        TunnistamoTokenExchange, "fetch_api_tokens", return_value=GDPR_API_TOKENS
+    )
+    profile = ProfileFactory(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=youth_service)
+    ServiceConnectionFactory(profile=profile, service=berth_service)
+    request = rf.post("/graphql")
+    request.user = user_gql_client.user
+
+    executed = user_gql_client.execute(DOWNLOAD_MY_PROFILE_MUTATION, context=request)
+    release.set()
+
+    response_data = json.loads(executed["data"]["downloadMyProfile"])["children"]
+    assert response_data[1:] == [
+        {"key": "YOUTH_MEMBERSHIP", "status": "TIMEOUT"},
+        expected,
+    ]
+
+
 def test_user_can_delete_his_profile(
     rf, user_gql_client, youth_service, requests_mock, mocker
 ):
@@ -248,6 +287,39 @@ def test_user_tries_deleting_his_profile_but_it_fails_partially(
     assert_match_error_code(executed, CONNECTED_SERVICE_DELETION_FAILED_ERROR)
 
 
+def test_services_are_called_concurrently_when_deleting_profile(
+    rf, user_gql_client, youth_service, berth_service, mocker
+):
+    """All the dry runs are made at the same time and finish before any data is deleted."""
+    barrier = threading.Barrier(2, timeout=5)
+    calls = []
+
+    def mock_delete_gdpr_data(self, api_token, dry_run=False):
+        barrier.wait()
+        calls.append(dry_run)
+
+    mocker.patch.object(
+        ServiceConnection,
+        "delete_gdpr_data",
+        autospec=True,
+        side_effect=mock_delete_gdpr_data,
+    )
+    mocker.patch.object(
+        TunnistamoTokenExchange, "fetch_api_tokens", return_value=GDPR_API_TOKENS
+    )
+    profile = ProfileFactory(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=youth_service)
+    ServiceConnectionFactory(profile=profile, service=berth_service)
+    request = rf.post("/graphql")
+    request.user = user_gql_client.user
+
+    executed = user_gql_client.execute(DELETE_MY_PROFILE_MUTATION, context=request)
+
+    assert dict(executed["data"]) == {"deleteMyProfile": {"clientMutationId": None}}
+    assert calls == [True, True, False, False]
+    assert ServiceConnection.objects.count() == 0
+
+
 @pytest.mark.parametrize(
     "gdpr_url, response_status", [("", 204), ("", 405), (GDPR_URL, 405)]
 )
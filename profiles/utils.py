@@ -5,6 +5,7 @@ from django.core.exceptions import ValidationError
 from graphql_relay.node.node import from_global_id
 
 from open_city_profile.exceptions import InvalidEmailFormatError
+from services.permissions import ServicePermissionChecker
 
 if TYPE_CHECKING:
     import profiles.models
@@ -72,18 +73,30 @@ def get_current_service():
     return getattr(_thread_locals, "service", None)
 
 
+def set_audit_log_collector(collector):
+    _thread_locals.audit_log_collector = collector
+
+
+def get_audit_log_collector():
+    return getattr(_thread_locals, "audit_log_collector", None)
+
+
 def user_has_staff_perms_to_view_profile(
-    user: "users.models.User", profile: "profiles.models.Profile"
+    user: "users.models.User",
+    profile: "profiles.models.Profile",
+    permission_checker: ServicePermissionChecker = None,
 ) -> bool:
     """
     Checks is passed user has "can_view_profiles" permissions
     for any service connected to the passed profile.
+
+    A request scoped permission checker can be given to answer the
+    checks from permissions it has already fetched.
     """
+    if permission_checker is None:
+        permission_checker = ServicePermissionChecker(user)
 
-    service_conns = profile.service_connections.all()
-    return any(
-        [
-            user.has_perm("can_view_profiles", service_conn.service)
-            for service_conn in service_conns
-        ]
+    return permission_checker.has_perm_for_any(
+        "can_view_profiles",
+        profile.service_connections.values_list("service_id", flat=True),
     )
@@ -0,0 +1,87 @@
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class GDPRRequestStatus:
+    OK = "ok"
+    TIMEOUT = "timeout"
+    ERROR = "error"
+
+
+GDPRRequestResult = namedtuple(
+    "GDPRRequestResult", ["service_connection", "status", "value"]
+)
+
+
+def _call(func, service_connection):
+    try:
+        return func(service_connection)
+    finally:
+        # Database connections are per thread, don't leave them open
+        connections.close_all()
+
+
+def call_services_concurrently(service_connections, func, deadline=None):
+    """Call `func` with each of the service connections on a bounded thread pool.
+
+    Returns a GDPRRequestResult for each connection, in the order of the
+    connections. The value of the result is the return value of the call if
+    its status is OK. Calls which raise an exception get the ERROR status and
+    the exception as the value. Calls which haven't finished within
+    `deadline` seconds get the TIMEOUT status. Without a deadline, all the
+    calls are waited for. Unfinished
+    calls are left running in the background and their results are
+    discarded, so a slow service delays the results of the others at most
+    until the deadline.
+
+    Meant for calling the GDPR APIs of the services, so the related objects
+    used by `func` should be fetched beforehand.
+    """
+    service_connections = list(service_connections)
+    if not service_connections:
+        return []
+
+    executor = ThreadPoolExecutor(
+        max_workers=min(len(service_connections), settings.GDPR_API_MAX_WORKERS),
+        thread_name_prefix="gdpr",
+    )
+    futures = [
+        executor.submit(_call, func, service_connection)
+        for service_connection in service_connections
+    ]
+    done, not_done = wait(futures, timeout=deadline)
+    executor.shutdown(wait=False)
+
+    results = []
+    for service_connection, future in zip(service_connections, futures):
+        service_type = service_connection.service.service_type.name
+        if future in not_done:
+            future.cancel()
+            logger.warning("GDPR request to service %s timed out", service_type)
+            results.append(
+                GDPRRequestResult(service_connection, GDPRRequestStatus.TIMEOUT, None)
+            )
+        elif future.exception() is not None:
+            logger.warning(
+                "GDPR request to service %s failed",
+                service_type,
+                exc_info=future.exception(),
+            )
+            results.append(
+                GDPRRequestResult(
+                    service_connection, GDPRRequestStatus.ERROR, future.exception()
+                )
+            )
+        else:
+            results.append(
+                GDPRRequestResult(
+                    service_connection, GDPRRequestStatus.OK, future.result()
+                )
+            )
+    return results
@@ -8,6 +8,7 @@ from enumfields import EnumField
 from parler.models import TranslatableModel, TranslatedFields
 
 from utils.auth import BearerAuth
+from utils.http import http_client
 from utils.models import SerializableMixin
 
 from .enums import ServiceType
@@ -93,19 +94,24 @@ class ServiceConnection(SerializableMixin):
         {"name": "created_at", "accessor": lambda x: x.strftime("%Y-%m-%d")},
     )
 
-    def download_gdpr_data(self, api_token: str):
+    def download_gdpr_data(self, api_token: str, raise_errors=False):
         """Download service specific GDPR data by profile.
 
         API token needs to be for a user that can access information for the related profile on
         on the related GDPR API.
+
+        A failed request returns no data, unless `raise_errors` is given, in which case
+        the exception of the request is raised.
         """
         if self.service.gdpr_url:
             url = urllib.parse.urljoin(self.service.gdpr_url, str(self.profile.pk))
             try:
-                response = requests.get(url, auth=BearerAuth(api_token), timeout=5)
+                response = http_client.get(url, auth=BearerAuth(api_token))
                 response.raise_for_status()
                 return response.json()
             except requests.RequestException:
+                if raise_errors:
+                    raise
                 return {}
         return {}
 
@@ -126,9 +132,7 @@ class ServiceConnection(SerializableMixin):
 
         if self.service.gdpr_url:
             url = urllib.parse.urljoin(self.service.gdpr_url, str(self.profile.pk))
-            response = requests.delete(
-                url, auth=BearerAuth(api_token), timeout=5, data=data
-            )
+            response = http_client.delete(url, auth=BearerAuth(api_token), data=data)
             response.raise_for_status()
             return True
 
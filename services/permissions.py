@@ -0,0 +1,60 @@
+from guardian.core import ObjectPermissionChecker
+
+from services.registry import service_registry
+
+
+class ServicePermissionChecker:
+    """Answers the object permission checks of a user on services from memory.
+
+    The user's permissions on all the services, including those given
+    through groups, are fetched once on the first check. The services are
+    taken from the process wide service registry. Meant to be used for the
+    duration of a single request, so permission changes made after the
+    first check are not seen.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._services = None
+        self._checker = None
+
+    def _prefetch(self):
+        if self._services is None:
+            self._services = service_registry.all()
+            self._checker = ObjectPermissionChecker(self.user)
+            if self._services:
+                self._checker.prefetch_perms(self._services)
+
+    def get_service(self, service_type):
+        """Return the service of the given type like `Service.objects.get` would."""
+        self._prefetch()
+        return service_registry.get(service_type)
+
+    def get_service_by_pk(self, pk):
+        self._prefetch()
+        return service_registry.get_by_pk(pk)
+
+    def has_perm(self, perm, service):
+        if service is None:
+            # Not an object permission check, leave it to the auth backends
+            return self.user.has_perm(perm)
+        self._prefetch()
+        return self._checker.has_perm(perm, service)
+
+    def has_perm_for_any(self, perm, service_ids):
+        return any(
+            self.has_perm(perm, self.get_service_by_pk(service_id))
+            for service_id in service_ids
+        )
+
+
+def get_service_permission_checker(context):
+    """Return the service permission checker of the request.
+
+    The checker is created on first use and dropped with the DataLoaders
+    at the end of the request by `open_city_profile.middlewares.clear_loaders`.
+    """
+    checker = getattr(context, "service_permissions", None)
+    if checker is None or checker.user != context.user:
+        checker = context.service_permissions = ServicePermissionChecker(context.user)
+    return checker
@@ -0,0 +1,117 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from services.enums import ServiceType
+from services.models import Service
+
+SERVICE_REGISTRY_VERSION_KEY = "services:registry_version"
+
+
+class ServiceRegistry:
+    """Process wide cache of the services indexed by service type and pk.
+
+    The services are loaded with their translations and allowed data fields.
+    Changes made in this process invalidate the registry right away. Other
+    processes see the changes through a version token stored in the shared
+    Django cache, which is checked at most once per
+    SERVICE_REGISTRY_CHECK_INTERVAL seconds.
+
+    The returned Service instances are shared between requests and threads,
+    so they must not be modified. Their translations are in the language
+    active when the registry was loaded, so they are meant for lookups and
+    permission checks only: relate objects to a service by its pk and don't
+    return the instances in API responses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_type = None
+        self._by_pk = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _is_current(self):
+        if self._by_type is None:
+            return False
+        now = time.monotonic()
+        if now - self._checked_at < settings.SERVICE_REGISTRY_CHECK_INTERVAL:
+            return True
+        self._checked_at = now
+        return cache.get(SERVICE_REGISTRY_VERSION_KEY) == self._version
+
+    def _load(self):
+        # Read the version before the services, so that a change made in
+        # between is noticed on the next check.
+        version = cache.get(SERVICE_REGISTRY_VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(SERVICE_REGISTRY_VERSION_KEY, version, None):
+                version = cache.get(SERVICE_REGISTRY_VERSION_KEY)
+        services = list(
+            Service.objects.prefetch_related(
+                "translations", "allowed_data_fields__translations"
+            )
+        )
+        self._by_type = {service.service_type: service for service in services}
+        self._by_pk = {service.pk: service for service in services}
+        self._version = version
+        self._checked_at = time.monotonic()
+
+    def _get_indexes(self):
+        with self._lock:
+            if not self._is_current():
+                self._load()
+            return self._by_type, self._by_pk
+
+    def all(self):
+        by_type, by_pk = self._get_indexes()
+        return list(by_pk.values())
+
+    def get(self, service_type):
+        """Return the service of the given type like `Service.objects.get` would."""
+        by_type, by_pk = self._get_indexes()
+        try:
+            return by_type[ServiceType(service_type)]
+        except (KeyError, ValueError):
+            raise Service.DoesNotExist(
+                "Service matching query does not exist: {}".format(service_type)
+            )
+
+    def get_by_pk(self, pk):
+        by_type, by_pk = self._get_indexes()
+        try:
+            return by_pk[pk]
+        except KeyError:
+            raise Service.DoesNotExist(
+                "Service matching query does not exist: {}".format(pk)
+            )
+
+    def clear(self):
+        """Drop the services cached in this process."""
+        with self._lock:
+            self._by_type = None
+            self._by_pk = None
+            self._version = None
+
+    def invalidate(self):
+        """Drop the services cached in every process.
+
+        The new version is published once the current transaction commits,
+        so that other processes can't reload the services before the changes
+        are visible to them.
+        """
+        self.clear()
+
+        def publish():
+            cache.set(SERVICE_REGISTRY_VERSION_KEY, uuid.uuid4().hex, None)
+            self.clear()
+
+        transaction.on_commit(publish)
+
+
+service_registry = ServiceRegistry()
@@ -9,6 +9,7 @@ from open_city_profile.exceptions import ServiceAlreadyExistsError
 
 from .enums import ServiceType
 from .models import AllowedDataField, Service, ServiceConnection
+from .registry import service_registry
 
 AllowedServiceType = graphene.Enum.from_enum(
     ServiceType, description=lambda e: e.label if e else ""
@@ -64,11 +65,11 @@ class AddServiceConnectionMutation(relay.ClientIDMutation):
         service_connection_data = input.pop("service_connection")
         service_data = service_connection_data.get("service")
         service_type = service_data.get("type")
-        service = Service.objects.get(service_type=service_type)
+        service = service_registry.get(service_type)
         try:
             service_connection = ServiceConnection.objects.create(
                 profile=info.context.user.profile,
-                service=service,
+                service_id=service.pk,
                 enabled=service_connection_data.get("enabled", True),
             )
         except IntegrityError:
@@ -0,0 +1,29 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from services.models import AllowedDataField, Service
+from services.registry import service_registry
+
+REGISTRY_MODELS = (
+    Service,
+    Service._parler_meta.root_model,
+    AllowedDataField,
+    AllowedDataField._parler_meta.root_model,
+)
+
+
+def invalidate_service_registry(sender, **kwargs):
+    """Invalidate the service registry when services or their data change."""
+    service_registry.invalidate()
+
+
+# Connected for the registry models only, so that saving other models
+# doesn't pay for the receiver.
+for model in REGISTRY_MODELS:
+    post_delete.connect(invalidate_service_registry, sender=model)
+    post_save.connect(invalidate_service_registry, sender=model)
+
+
+@receiver(m2m_changed, sender=Service.allowed_data_fields.through)
+def invalidate_service_registry_on_allowed_data_fields_change(sender, **kwargs):
+    service_registry.invalidate()
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from services.enums import ServiceType
+from services.gdpr import call_services_concurrently, GDPRRequestStatus
+from services.tests.factories import ServiceConnectionFactory
+
+
+def test_services_are_called_concurrently(profile, service_factory, settings):
+    settings.GDPR_API_MAX_WORKERS = 2
+    connections = [
+        ServiceConnectionFactory(profile=profile, service=service_factory(**kwargs))
+        for kwargs in (
+            {"service_type": ServiceType.BERTH},
+            {"service_type": ServiceType.YOUTH_MEMBERSHIP},
+        )
+    ]
+    barrier = threading.Barrier(2, timeout=5)
+
+    def call(service_connection):
+        # Both calls must be running at the same time to get past the barrier
+        barrier.wait()
+        return service_connection.service.service_type.name
+
+    results = call_services_concurrently(connections, call, deadline=5)
+
+    assert [(result.status, result.value) for result in results] == [
+        (GDPRRequestStatus.OK, "BERTH"),
+        (GDPRRequestStatus.OK, "YOUTH_MEMBERSHIP"),
+    ]
+
+
+def test_each_service_gets_a_status(profile, service_factory):
+    ok, failing, slow = [
+        ServiceConnectionFactory(profile=profile, service=service_factory(**kwargs))
+        for kwargs in (
+            {"service_type": ServiceType.BERTH},
+            {"service_type": ServiceType.YOUTH_MEMBERSHIP},
+            {"service_type": ServiceType.GODCHILDREN_OF_CULTURE},
+        )
+    ]
+    release = threading.Event()
+
+    def call(service_connection):
+        if service_connection == failing:
+            raise ValueError("Failed")
+        if service_connection == slow:
+            release.wait(5)
+        return {"key": "DATA"}
+
+    started_at = time.monotonic()
+    results = call_services_concurrently([ok, failing, slow], call, deadline=0.2)
+    release.set()
+
+    assert time.monotonic() - started_at < 2
+    assert [(result.service_connection, result.status) for result in results] == [
+        (ok, GDPRRequestStatus.OK),
+        (failing, GDPRRequestStatus.ERROR),
+        (slow, GDPRRequestStatus.TIMEOUT),
+    ]
+    assert results[0].value == {"key": "DATA"}
+
+
+def test_no_services_to_call():
+    assert call_services_concurrently([], lambda service_connection: None) == []
@@ -104,6 +104,17 @@ def test_download_gdpr_data_returns_empty_dict_if_request_fails(
     assert response == {}
 
 
+@pytest.mark.parametrize("service__gdpr_url", [GDPR_URL])
+def test_download_gdpr_data_raises_failed_request_if_asked_to(
+    requests_mock, profile, service
+):
+    service_connection = ServiceConnectionFactory(profile=profile, service=service)
+    requests_mock.get(f"{GDPR_URL}{profile.pk}", status_code=503)
+
+    with pytest.raises(requests.HTTPError):
+        service_connection.download_gdpr_data(api_token="token", raise_errors=True)
+
+
 def test_remove_service_gdpr_data_no_url(profile, service):
     service_connection = ServiceConnectionFactory(profile=profile, service=service)
 
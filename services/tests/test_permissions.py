@@ -0,0 +1,57 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from guardian.shortcuts import assign_perm
+
+from open_city_profile.middlewares import clear_loaders
+from services.enums import ServiceType
+from services.models import Service
+from services.permissions import (
+    get_service_permission_checker,
+    ServicePermissionChecker,
+)
+
+
+def test_permissions_are_fetched_once(user, group, service_factory):
+    berth = service_factory(service_type=ServiceType.BERTH)
+    youth = service_factory(service_type=ServiceType.YOUTH_MEMBERSHIP)
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, berth)
+    assign_perm("can_manage_profiles", user, youth)
+    checker = ServicePermissionChecker(user)
+    checker.get_service(ServiceType.BERTH)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert checker.get_service("berth") == berth
+        assert checker.has_perm("can_view_profiles", berth)
+        assert not checker.has_perm("can_manage_profiles", berth)
+        assert checker.has_perm("can_manage_profiles", youth)
+        assert checker.has_perm_for_any("can_view_profiles", [youth.pk, berth.pk])
+        assert not checker.has_perm_for_any("can_view_profiles", [youth.pk])
+
+    assert len(queries) == 0
+
+
+def test_superuser_has_all_permissions(superuser, service):
+    assert ServicePermissionChecker(superuser).has_perm("can_view_profiles", service)
+
+
+def test_missing_service_raises_does_not_exist(user, service):
+    with pytest.raises(Service.DoesNotExist):
+        ServicePermissionChecker(user).get_service(ServiceType.YOUTH_MEMBERSHIP)
+
+
+def test_checker_is_scoped_to_the_request(rf, user, service):
+    request = rf.post("/graphql")
+    request.user = user
+
+    checker = get_service_permission_checker(request)
+    assert get_service_permission_checker(request) is checker
+    assert not checker.has_perm("can_view_profiles", service)
+
+    assign_perm("can_view_profiles", user, service)
+    clear_loaders(request)
+
+    assert get_service_permission_checker(request).has_perm(
+        "can_view_profiles", service
+    )
@@ -0,0 +1,86 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from profiles.tests.factories import ProfileFactory
+from services.enums import ServiceType
+from services.models import Service
+from services.registry import (
+    service_registry,
+    SERVICE_REGISTRY_VERSION_KEY,
+    ServiceRegistry,
+)
+
+
+def test_services_are_loaded_once(service, allowed_data_field):
+    service.allowed_data_fields.add(allowed_data_field)
+    service_registry.get(ServiceType.BERTH)
+
+    with CaptureQueriesContext(connection) as queries:
+        berth = service_registry.get("berth")
+        assert service_registry.get_by_pk(service.pk) is berth
+        assert service_registry.all() == [berth]
+        assert berth.title == service.title
+        assert list(berth.allowed_data_fields.all()) == [allowed_data_field]
+
+    assert len(queries) == 0
+
+
+def test_missing_service_raises_does_not_exist(service):
+    with pytest.raises(Service.DoesNotExist):
+        service_registry.get(ServiceType.YOUTH_MEMBERSHIP)
+    with pytest.raises(Service.DoesNotExist):
+        service_registry.get("unknown")
+
+
+def test_saving_a_service_invalidates_the_registry(service, service_factory):
+    assert service_registry.get(ServiceType.BERTH).gdpr_url == ""
+
+    service.gdpr_url = "https://example.com/"
+    service.save()
+    service_factory(service_type=ServiceType.YOUTH_MEMBERSHIP)
+
+    assert service_registry.get(ServiceType.BERTH).gdpr_url == "https://example.com/"
+    assert service_registry.get(ServiceType.YOUTH_MEMBERSHIP)
+
+
+def test_deleting_a_service_invalidates_the_registry(service):
+    service_registry.get(ServiceType.BERTH)
+
+    service.delete()
+
+    with pytest.raises(Service.DoesNotExist):
+        service_registry.get(ServiceType.BERTH)
+
+
+def test_saving_other_models_does_not_invalidate_the_registry(mocker):
+    invalidate = mocker.spy(service_registry, "invalidate")
+
+    ProfileFactory()
+
+    invalidate.assert_not_called()
+
+
+def test_version_change_in_shared_cache_invalidates_other_registries(service, settings):
+    settings.SERVICE_REGISTRY_CHECK_INTERVAL = 0
+    registry = ServiceRegistry()
+    registry.get(ServiceType.BERTH)
+    # Changed by another process, which published a new version
+    Service.objects.filter(pk=service.pk).update(gdpr_url="https://example.com/")
+    assert registry.get(ServiceType.BERTH).gdpr_url == ""
+
+    cache.set(SERVICE_REGISTRY_VERSION_KEY, "new version")
+
+    assert registry.get(ServiceType.BERTH).gdpr_url == "https://example.com/"
+
+
+def test_version_is_checked_at_most_once_per_interval(service, settings):
+    settings.SERVICE_REGISTRY_CHECK_INTERVAL = 60
+    registry = ServiceRegistry()
+    registry.get(ServiceType.BERTH)
+    Service.objects.filter(pk=service.pk).update(gdpr_url="https://example.com/")
+
+    cache.set(SERVICE_REGISTRY_VERSION_KEY, "new version")
+
+    assert registry.get(ServiceType.BERTH).gdpr_url == ""
@@ -1,7 +1,10 @@
 from string import Template
 
+from django.utils import translation
+
 from open_city_profile.consts import SERVICE_CONNECTION_ALREADY_EXISTS_ERROR
 from services.enums import ServiceType
+from services.registry import service_registry
 from services.tests.factories import ProfileFactory, ServiceConnectionFactory
 
 
@@ -120,6 +123,40 @@ def test_normal_user_can_add_service_mutation(rf, user_gql_client, service_facto
     assert dict(executed["data"]) == expected_data
 
 
+def test_added_service_connection_is_returned_in_the_current_language(
+    rf, user_gql_client, service
+):
+    request = rf.post("/graphql")
+    request.user = user_gql_client.user
+    ProfileFactory(user=user_gql_client.user)
+    for language, title in (("fi", "Venepaikka"), ("en", "Berth")):
+        service.set_current_language(language)
+        service.title = title
+        service.save()
+    with translation.override("fi"):
+        service_registry.get(ServiceType.BERTH)
+
+    query = """
+        mutation {
+            addServiceConnection(input: {
+                serviceConnection: {service: {type: BERTH}}
+            }) {
+                serviceConnection {
+                    service {
+                        title
+                    }
+                }
+            }
+        }
+    """
+    with translation.override("en"):
+        executed = user_gql_client.execute(query, context=request)
+
+    assert executed["data"]["addServiceConnection"]["serviceConnection"] == {
+        "service": {"title": "Berth"}
+    }
+
+
 def test_normal_user_cannot_add_service_multiple_times_mutation(
     rf, user_gql_client, service_factory
 ):
@@ -0,0 +1,380 @@
+import json
+import math
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+
+from django.db import connection
+from django.test import override_settings, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from graphql_relay import to_global_id
+from guardian.shortcuts import assign_perm
+
+from open_city_profile.views import GraphQLView
+from profiles.models import Profile
+from services.enums import ServiceType
+from services.models import AllowedDataField, Service
+from users.models import User
+from utils.utils import generate_profiles_bulk
+
+PERCENTILES = (50, 90, 95, 99)
+
+STAFF_USERNAME = "benchmark_staff"
+
+GDPR_QUERY_SCOPE = "https://api.hel.fi/auth/benchmark.gdprquery"
+
+GDPR_API_TOKEN = "benchmark-token"
+
+MY_PROFILE_QUERY = """
+    query getMyProfile {
+        myProfile {
+            firstName
+            lastName
+            nickname
+            language
+            primaryEmail { email }
+            emails { edges { node { email emailType primary verified } } }
+            phones { edges { node { phone phoneType primary } } }
+            addresses { edges { node { address postalCode city countryCode } } }
+            serviceConnections { edges { node { service { type title } } } }
+        }
+    }
+"""
+
+PROFILES_QUERY = Template(
+    """
+    query getProfiles {
+        profiles(serviceType: BERTH, first: 100${arguments}) {
+            totalCount
+            edges {
+                node {
+                    firstName
+                    lastName
+                    primaryEmail { email }
+                    primaryAddress { address city }
+                }
+            }
+        }
+    }
+"""
+)
+
+PROFILE_QUERY = Template(
+    """
+    query getProfile {
+        profile(id: "${id}", serviceType: BERTH) {
+            firstName
+            lastName
+            emails { edges { node { email } } }
+            phones { edges { node { phone } } }
+            addresses { edges { node { address city } } }
+            sensitivedata { ssn }
+        }
+    }
+"""
+)
+
+UPDATE_MY_PROFILE_MUTATION = Template(
+    """
+    mutation updateMyProfile {
+        updateMyProfile(input: { profile: { nickname: "${nickname}" } }) {
+            profile { nickname }
+        }
+    }
+"""
+)
+
+DOWNLOAD_MY_PROFILE_QUERY = """
+    query downloadMyProfile {
+        downloadMyProfile(authorizationCode: "benchmark")
+    }
+"""
+
+
+class BenchmarkError(Exception):
+    """A benchmarked operation didn't execute successfully."""
+
+
+def percentile(values, percent):
+    """Return the percentile of the values using linear interpolation."""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * percent / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def summarize_durations(durations):
+    summary = {f"p{p}": percentile(durations, p) for p in PERCENTILES}
+    summary.update(
+        {
+            "iterations": len(durations),
+            "mean": statistics.mean(durations),
+            "max": max(durations),
+        }
+    )
+    return summary
+
+
+class StubGDPRHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        profile_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+        body = json.dumps(
+            {
+                "key": "BENCHMARK",
+                "children": [{"key": "PROFILE_ID", "value": profile_id}],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_DELETE(self):
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubTokenExchange:
+    """Returns a fixed API token for the GDPR API of the benchmark service."""
+
+    def fetch_api_tokens(self, authorization_code):
+        return {GDPR_QUERY_SCOPE.rsplit(".", 1)[0]: GDPR_API_TOKEN}
+
+
+def get_stub_gdpr_url(port):
+    return "http://127.0.0.1:{}/gdpr/".format(port)
+
+
+@contextmanager
+def stub_gdpr_service(port):
+    """Serve the GDPR API of the benchmark service from a local stub server.
+
+    The token exchange with Tunnistamo is replaced with StubTokenExchange
+    through the settings, so that only the GDPR API calls go over HTTP.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubGDPRHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with override_settings(
+            TOKEN_EXCHANGE_CLASS="utils.benchmark.StubTokenExchange"
+        ):
+            yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def ensure_profile_count(size, locale="fi_FI", processes=1):
+    """Top up the database to have at least `size` profiles."""
+    missing = size - Profile.objects.count()
+    if missing <= 0:
+        return 0
+
+    return generate_profiles_bulk(missing, locale=locale, processes=processes)
+
+
+def get_staff_user(service):
+    user, created = User.objects.get_or_create(
+        username=STAFF_USERNAME, defaults={"is_staff": True}
+    )
+    if created:
+        for permission in ("can_view_profiles", "can_view_sensitivedata"):
+            assign_perm(permission, user, service)
+    return user
+
+
+class Scenario:
+    """A GraphQL operation executed by the benchmark.
+
+    `build` is called with the sampled profile of each iteration and returns
+    the user executing the operation and the query.
+    """
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+
+
+def get_scenarios(staff_user):
+    def own_profile(query):
+        return lambda profile: (profile.user, query)
+
+    def profiles(arguments=""):
+        return lambda profile: (
+            staff_user,
+            PROFILES_QUERY.substitute(arguments=arguments),
+        )
+
+    return [
+        Scenario("myProfile", own_profile(MY_PROFILE_QUERY)),
+        Scenario("profiles", profiles()),
+        Scenario("profiles.orderByLastName", profiles(', orderBy: "lastName"')),
+        Scenario("profiles.orderByPrimaryCity", profiles(', orderBy: "primaryCity"')),
+        Scenario(
+            "profiles.filterByLastName",
+            lambda profile: (
+                staff_user,
+                PROFILES_QUERY.substitute(
+                    arguments=', lastName: "{}"'.format(profile.last_name[:3])
+                ),
+            ),
+        ),
+        Scenario(
+            "profile",
+            lambda profile: (
+                staff_user,
+                PROFILE_QUERY.substitute(id=to_global_id("ProfileNode", profile.pk)),
+            ),
+        ),
+        Scenario(
+            "updateMyProfile",
+            lambda profile: (
+                profile.user,
+                UPDATE_MY_PROFILE_MUTATION.substitute(
+                    nickname="benchmark-{}".format(random.randint(0, 1000000))
+                ),
+            ),
+        ),
+        Scenario("downloadMyProfile", own_profile(DOWNLOAD_MY_PROFILE_QUERY)),
+    ]
+
+
+class Benchmark:
+    """Executes the scenarios through the GraphQL view and collects results.
+
+    Latencies are measured without tracing, after which one extra execution
+    per scenario is made for counting the database queries and measuring the
+    peak memory allocated during the operation.
+    """
+
+    def __init__(self, gdpr_port, iterations=50, warmup=5, sample_size=50):
+        self.gdpr_port = gdpr_port
+        self.iterations = iterations
+        self.warmup = warmup
+        self.sample_size = sample_size
+        self.view = GraphQLView.as_view()
+        self.request_factory = RequestFactory()
+
+    def execute(self, user, query):
+        request = self.request_factory.post(
+            "/graphql/", json.dumps({"query": query}), content_type="application/json"
+        )
+        request.user = user
+        response = self.view(request)
+        result = json.loads(response.content)
+        if result.get("errors"):
+            raise BenchmarkError(result["errors"][0]["message"])
+        return result
+
+    def run_scenario(self, scenario, profiles):
+        def executions(count):
+            for i in range(count):
+                yield scenario.build(profiles[i % len(profiles)])
+
+        for user, query in executions(self.warmup):
+            self.execute(user, query)
+
+        durations = []
+        for user, query in executions(self.iterations):
+            start = time.perf_counter()
+            self.execute(user, query)
+            durations.append(time.perf_counter() - start)
+
+        user, query = scenario.build(profiles[0])
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                self.execute(user, query)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        result = summarize_durations(durations)
+        result.update({"queries": len(queries), "peak_memory": peak_memory})
+        return result
+
+    def run(self, service, scenarios):
+        profiles = list(
+            Profile.objects.filter(service_connections__service=service)
+            .select_related("user")
+            .order_by("?")[: self.sample_size]
+        )
+        if not profiles:
+            raise BenchmarkError("There are no profiles to benchmark with.")
+
+        with stub_gdpr_service(self.gdpr_port):
+            return {
+                scenario.name: self.run_scenario(scenario, profiles)
+                for scenario in scenarios
+            }
+
+
+def get_benchmark_service(gdpr_url):
+    """Return the service the benchmarked profiles are connected to.
+
+    The service is created with its GDPR API served by the stub server at
+    `gdpr_url`. An existing service is never modified, so it must have been
+    created by an earlier benchmark run using the same GDPR API URL.
+    """
+    service = Service.objects.filter(service_type=ServiceType.BERTH).first()
+    if not service:
+        service = Service.objects.create(
+            service_type=ServiceType.BERTH,
+            title=ServiceType.BERTH.name,
+            gdpr_url=gdpr_url,
+            gdpr_query_scope=GDPR_QUERY_SCOPE,
+        )
+        service.allowed_data_fields.set(AllowedDataField.objects.all())
+    elif (service.gdpr_url, service.gdpr_query_scope) != (gdpr_url, GDPR_QUERY_SCOPE):
+        raise BenchmarkError(
+            "The {} service isn't configured for the benchmark.".format(
+                service.service_type.name
+            )
+        )
+    return service
+
+
+def compare_results(results, baseline, latency_tolerance=0.2, memory_tolerance=0.2):
+    """Return the regressions of the results compared to the baseline.
+
+    Both are mappings of dataset size to scenario results. A scenario has
+    regressed if its 95th percentile latency or peak memory grew more than
+    the tolerated fraction, or if it makes any more database queries than
+    it did in the baseline.
+    """
+    regressions = []
+    for size, scenarios in results.items():
+        for name, result in scenarios.items():
+            expected = baseline.get(size, {}).get(name)
+            if not expected:
+                continue
+            label = f"{name} @ {size}"
+            if result["p95"] > expected["p95"] * (1 + latency_tolerance):
+                regressions.append(
+                    f"{label}: p95 latency {result['p95'] * 1000:.1f} ms, "
+                    f"baseline {expected['p95'] * 1000:.1f} ms"
+                )
+            if result["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{label}: {result['queries']} queries, "
+                    f"baseline {expected['queries']}"
+                )
+            if result["peak_memory"] > expected["peak_memory"] * (1 + memory_tolerance):
+                regressions.append(
+                    f"{label}: peak memory {result['peak_memory']} bytes, "
+                    f"baseline {expected['peak_memory']} bytes"
+                )
+    return regressions
@@ -0,0 +1,33 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import connections
+
+
+def estimate_count(queryset, cache_timeout=None):
+    """Estimate the number of rows in the queryset using PostgreSQL planner statistics.
+
+    The estimate is read from the top level plan node of an EXPLAIN of the
+    query, so no rows are actually scanned. The estimate is cached for
+    `cache_timeout` seconds, keyed by the SQL and its parameters.
+    """
+    queryset = queryset.order_by()
+    sql, params = queryset.query.sql_with_params()
+    key_source = json.dumps([sql, [str(param) for param in params]])
+    cache_key = "estimate_count:{}".format(
+        hashlib.sha1(key_source.encode("utf-8")).hexdigest()
+    )
+
+    def _estimate():
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    if not cache_timeout:
+        return _estimate()
+
+    return cache.get_or_set(cache_key, _estimate, cache_timeout)
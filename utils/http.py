@@ -0,0 +1,122 @@
+import os
+import random
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Statuses worth retrying, as the same request may succeed on another try
+RETRY_STATUSES = (502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    """Retry which waits a random time up to the exponential backoff.
+
+    Spreads the retries of concurrent requests to a recovering service
+    instead of making them all at the same time.
+    """
+
+    def get_backoff_time(self):
+        return random.uniform(0, super().get_backoff_time())
+
+
+def create_http_adapter():
+    """Return a transport adapter with the pool and retry settings.
+
+    The adapter keeps a pool of at most HTTP_CLIENT_POOL_MAXSIZE keep-alive
+    connections per host, for HTTP_CLIENT_POOL_CONNECTIONS hosts. Failed
+    connection attempts are retried at most HTTP_CLIENT_RETRIES times, as are
+    the RETRY_STATUSES responses of idempotent requests. Read errors, such as
+    read timeouts, are not retried, so that a slow service doesn't take
+    several timeouts to fail.
+    """
+    retry = JitteredRetry(
+        total=settings.HTTP_CLIENT_RETRIES,
+        read=0,
+        backoff_factor=settings.HTTP_CLIENT_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        raise_on_status=False,
+    )
+    return HTTPAdapter(
+        pool_connections=settings.HTTP_CLIENT_POOL_CONNECTIONS,
+        pool_maxsize=settings.HTTP_CLIENT_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+
+
+def mount_http_adapter(session, adapter):
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def create_http_session(adapter):
+    """Return a session which uses the adapter and doesn't store any cookies.
+
+    The session makes requests on behalf of different users, so a cookie set
+    by the response to one of them must not be sent with the others.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return mount_http_adapter(session, adapter)
+
+
+class HTTPClient:
+    """Process wide HTTP session for outbound requests.
+
+    The connections are reused between requests and threads, but cookies
+    are not kept between requests. A forked process creates its own session,
+    so that the connections of the parent aren't shared.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._adapter = None
+        self._pid = None
+
+    def _ensure_created(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._adapter = create_http_adapter()
+            self._session = create_http_session(self._adapter)
+            self._pid = os.getpid()
+
+    @property
+    def session(self):
+        self._ensure_created()
+        return self._session
+
+    @property
+    def adapter(self):
+        """The adapter of the session, for sharing its pools with other sessions."""
+        self._ensure_created()
+        return self._adapter
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", settings.HTTP_CLIENT_TIMEOUT)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        """Close the pooled connections, they are opened again when needed."""
+        with self._lock:
+            if self._session is not None and self._pid == os.getpid():
+                self._session.close()
+            self._session = None
+            self._adapter = None
+            self._pid = None
+
+
+http_client = HTTPClient()
@@ -0,0 +1,180 @@
+import json
+import platform
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from subscriptions.utils import generate_subscription_types
+from utils.benchmark import (
+    Benchmark,
+    BenchmarkError,
+    compare_results,
+    ensure_profile_count,
+    get_benchmark_service,
+    get_scenarios,
+    get_staff_user,
+    get_stub_gdpr_url,
+)
+from utils.utils import generate_data_fields, generate_services
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the GraphQL API against datasets of growing size. The "
+        "database is topped up with bulk generated profiles to each size in "
+        "turn, so run this against a dedicated benchmark database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-s",
+            "--sizes",
+            type=int,
+            nargs="+",
+            help="Numbers of profiles to benchmark with",
+            default=[10000, 100000, 1000000],
+        )
+        parser.add_argument(
+            "-i",
+            "--iterations",
+            type=int,
+            help="Number of measured executions per operation",
+            default=50,
+        )
+        parser.add_argument(
+            "-w",
+            "--warmup",
+            type=int,
+            help="Number of unmeasured executions per operation",
+            default=5,
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            type=str,
+            help="File to write the results to",
+            default="benchmark-results.json",
+        )
+        parser.add_argument(
+            "-b", "--baseline", type=str, help="Results file to compare against"
+        )
+        parser.add_argument(
+            "--latency-tolerance",
+            type=float,
+            help="Tolerated relative growth of the 95th percentile latency",
+            default=0.2,
+        )
+        parser.add_argument(
+            "--memory-tolerance",
+            type=float,
+            help="Tolerated relative growth of the peak memory",
+            default=0.2,
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            help="Exit with an error if regressions are found",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            help="Number of processes generating the profiles",
+            default=1,
+        )
+        parser.add_argument(
+            "--gdpr-port",
+            type=int,
+            help="Local port of the stub GDPR API of the benchmarked service",
+            default=8765,
+        )
+        parser.add_argument(
+            "-l",
+            "--locale",
+            type=str,
+            help="Locale for generated fake data",
+            default="fi_FI",
+        )
+
+    def prepare_services(self, gdpr_port):
+        generate_data_fields()
+        try:
+            service = get_benchmark_service(get_stub_gdpr_url(gdpr_port))
+        except BenchmarkError as e:
+            raise CommandError(f"Benchmark failed: {e}")
+        generate_services()
+        generate_subscription_types()
+        return service
+
+    def handle(self, *args, **kwargs):
+        baseline = None
+        if kwargs["baseline"]:
+            with open(kwargs["baseline"]) as f:
+                baseline = json.load(f)["results"]
+
+        service = self.prepare_services(kwargs["gdpr_port"])
+        staff_user = get_staff_user(service)
+        scenarios = get_scenarios(staff_user)
+        benchmark = Benchmark(
+            kwargs["gdpr_port"],
+            iterations=kwargs["iterations"],
+            warmup=kwargs["warmup"],
+        )
+
+        results = {}
+        for size in sorted(kwargs["sizes"]):
+            self.stdout.write(f"Preparing dataset of {size} profiles...")
+            start = time.perf_counter()
+            created = ensure_profile_count(
+                size, locale=kwargs["locale"], processes=kwargs["processes"]
+            )
+            self.stdout.write(
+                f"Created {created} profiles in {time.perf_counter() - start:.1f} s"
+            )
+
+            self.stdout.write(f"Benchmarking with {size} profiles...")
+            try:
+                results[str(size)] = benchmark.run(service, scenarios)
+            except BenchmarkError as e:
+                raise CommandError(f"Benchmark failed: {e}")
+            for name, result in results[str(size)].items():
+                self.stdout.write(
+                    f"  {name}: p50 {result['p50'] * 1000:.1f} ms, "
+                    f"p95 {result['p95'] * 1000:.1f} ms, "
+                    f"{result['queries']} queries, "
+                    f"peak memory {result['peak_memory'] / 1024:.0f} KiB"
+                )
+
+        with open(kwargs["output"], "w") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "created_at": timezone.now().isoformat(),
+                        "python": platform.python_version(),
+                        "iterations": kwargs["iterations"],
+                        "warmup": kwargs["warmup"],
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {kwargs['output']}"))
+
+        if baseline is None:
+            return
+
+        regressions = compare_results(
+            results,
+            baseline,
+            latency_tolerance=kwargs["latency_tolerance"],
+            memory_tolerance=kwargs["memory_tolerance"],
+        )
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+            return
+
+        for regression in regressions:
+            self.stdout.write(self.style.WARNING(regression))
+        if kwargs["fail_on_regression"]:
+            raise CommandError(f"Found {len(regressions)} regressions")
@@ -11,6 +11,7 @@ from utils.utils import (
     generate_group_admins,
     generate_groups_for_services,
     generate_profiles,
+    generate_profiles_bulk,
     generate_service_connections,
     generate_services,
     generate_youth_profiles,
@@ -61,6 +62,30 @@ class Command(BaseCommand):
             help="Locale for generated fake data",
             default="fi_FI",
         )
+        parser.add_argument(
+            "-b",
+            "--bulk",
+            help=(
+                "Generate the development profiles with batched inserts, including "
+                "subscriptions, sensitive data and verified personal information"
+            ),
+            action="store_true",
+        )
+        parser.add_argument(
+            "--batchsize",
+            type=int,
+            help="Number of profiles created per batch in the bulk mode",
+            default=1000,
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            help="Number of processes creating batches in parallel in the bulk mode",
+            default=1,
+        )
+        parser.add_argument(
+            "--seed", type=int, help="Random seed for the bulk mode", default=None
+        )
         parser.add_argument(
             "--superuser", help="Add admin/admin superuser", action="store_true"
         )
@@ -122,11 +147,24 @@ class Command(BaseCommand):
             with factory.Faker.override_default_locale(locale):
                 self.stdout.write("Generating group admins...")
                 generate_group_admins(groups=groups, faker=faker)
-                self.stdout.write(f"Generating profiles ({profile_count})...")
-                generate_profiles(profile_count, faker=faker)
-                self.stdout.write("Generating service connections...")
-                generate_service_connections(youth_profile_percentage)
-                self.stdout.write("Generating youth profiles...")
-                generate_youth_profiles(faker=faker)
+                if kwargs["bulk"]:
+                    self.stdout.write(
+                        f"Generating profiles in bulk ({profile_count})..."
+                    )
+                    generate_profiles_bulk(
+                        profile_count,
+                        locale=locale,
+                        youth_profile_percentage=youth_profile_percentage,
+                        batch_size=kwargs["batchsize"],
+                        processes=kwargs["processes"],
+                        seed=kwargs["seed"],
+                    )
+                else:
+                    self.stdout.write(f"Generating profiles ({profile_count})...")
+                    generate_profiles(profile_count, faker=faker)
+                    self.stdout.write("Generating service connections...")
+                    generate_service_connections(youth_profile_percentage)
+                    self.stdout.write("Generating youth profiles...")
+                    generate_youth_profiles(faker=faker)
 
             self.stdout.write(self.style.SUCCESS("Done - Development fake data"))
@@ -1,6 +1,8 @@
 import uuid
 
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
+from django.db.models import Prefetch, prefetch_related_objects
 from django.db.models.fields.reverse_related import OneToOneRel
 
 
@@ -11,6 +13,114 @@ class UUIDModel(models.Model):
         abstract = True
 
 
+def _value_resolver(name, accessor):
+    key = name.upper()
+
+    def resolve(instance):
+        value = getattr(instance, name)
+        if accessor is not None:
+            value = accessor(value)
+        return {"key": key, "value": value}
+
+    return resolve
+
+
+def _one_to_one_resolver(name):
+    def resolve(instance):
+        # A missing related object is left out
+        related = getattr(instance, name, None)
+        return related.serialize() if hasattr(related, "serialize") else None
+
+    return resolve
+
+
+def _many_resolver(name):
+    key = name.upper()
+
+    def resolve(instance):
+        manager = getattr(instance, name, None)
+        children = manager.serialize() if hasattr(manager, "serialize") else None
+        return {"key": key, "children": children}
+
+    return resolve
+
+
+class SerializerPlan:
+    """The resolvers of the serialize_fields of a model and the relations to
+    fetch with the instances, compiled once per model class.
+
+    The reverse relations in the fields are prefetched, and the forward
+    relations used by the accessors are selected, for the whole tree of the
+    serialized models.
+    """
+
+    def __init__(self, model):
+        self.key = model._meta.model_name.upper()
+        self.resolvers = []
+        # Lookups of the reverse relations and their related models
+        self.relations = []
+        # Forward relations which the accessors of the fields follow
+        self.select_related = []
+
+        related_objects = {rel.name: rel for rel in model._meta.related_objects}
+        for field in model.serialize_fields:
+            name = field["name"]
+            rel = related_objects.get(name)
+            if rel is None:
+                self.resolvers.append(_value_resolver(name, field.get("accessor")))
+                model_field = _get_model_field(model, name)
+                if model_field is not None and model_field.is_relation:
+                    if model_field.many_to_one or model_field.one_to_one:
+                        self.select_related.append(name)
+                continue
+
+            if type(rel) is OneToOneRel:
+                self.resolvers.append(_one_to_one_resolver(name))
+            else:
+                self.resolvers.append(_many_resolver(name))
+            # The relations are read by the name of the field, which must
+            # then be the name of the related accessor as well
+            if rel.get_accessor_name() == name:
+                self.relations.append((name, rel.related_model))
+
+
+def _get_model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+_serializer_plans = {}
+
+
+def get_serializer_plan(model):
+    plan = _serializer_plans.get(model)
+    if plan is None:
+        plan = _serializer_plans[model] = SerializerPlan(model)
+    return plan
+
+
+def get_serialize_prefetches(model, _seen=()):
+    """Return the prefetches for serializing instances of the model.
+
+    Each level of the relation tree is fetched with one query, so the number
+    of queries doesn't depend on the number of related objects.
+    """
+    seen = _seen + (model,)
+    prefetches = []
+    for name, related_model in get_serializer_plan(model).relations:
+        # Relations back to the models higher up the tree aren't followed
+        if not issubclass(related_model, SerializableMixin) or related_model in seen:
+            continue
+        related_plan = get_serializer_plan(related_model)
+        queryset = related_model._default_manager.select_related(
+            *related_plan.select_related
+        ).prefetch_related(*get_serialize_prefetches(related_model, seen))
+        prefetches.append(Prefetch(name, queryset=queryset))
+    return prefetches
+
+
 class SerializableMixin(models.Model):
     """
     Mixin to add custom serialization for django models in order to get the desired tree of models to
@@ -25,6 +135,9 @@ class SerializableMixin(models.Model):
             - accessor (optional), function that is called when value of the field is resolved and it takes the
               actual field value as argument
 
+    The fields are resolved by a plan compiled once per model class. Call prefetch_for_serialize() with the
+    instances before serializing them to fetch the whole tree of related objects in a fixed number of queries.
+
     Example usage and output:
 
     class Post(SerializableMixin):
@@ -74,9 +187,10 @@ class SerializableMixin(models.Model):
 
     class SerializableManager(models.Manager):
         def serialize(self):
+            # all() of the manager uses the prefetched objects
             return [
                 obj.serialize() if hasattr(obj, "serialize") else []
-                for obj in self.get_queryset().all()
+                for obj in self.all()
             ]
 
     class Meta:
@@ -84,48 +198,23 @@ class SerializableMixin(models.Model):
 
     objects = SerializableManager()
 
-    def _resolve_field(self, model, field):
-        def _resolve_value(data, field):
-            if "accessor" in field:
-                # call the accessor with value as an argument
-                return field["accessor"](getattr(data, field.get("name")))
-            else:
-                # no accessor, return the value
-                return getattr(data, field.get("name"))
-
-        related_types = {item.name: type(item) for item in model._meta.related_objects}
-        if field.get("name") in related_types.keys():
-            value = (
-                getattr(model, field.get("name")).serialize()
-                if hasattr(model, field.get("name"))
-                and hasattr(getattr(model, field.get("name")), "serialize")
-                else None
-            )
-            # field is a related object, let's serialize more
-            if related_types[field.get("name")] == OneToOneRel:
-                # do not wrap one-to-one relations into list
-                return value
-            else:
-                return {
-                    "key": field.get("name").upper(),
-                    "children": value,
-                }
-        else:
-            # concrete field, let's just add the value
-            return {
-                "key": field.get("name").upper(),
-                "value": _resolve_value(model, field),
-            }
+    @classmethod
+    def prefetch_for_serialize(cls, instances):
+        """Fetch the related objects of the instances which serialize() needs."""
+        prefetch_related_objects(
+            instances,
+            *get_serializer_plan(cls).select_related,
+            *get_serialize_prefetches(cls),
+        )
 
     def serialize(self):
-        return {
-            "key": self._meta.model_name.upper(),
-            "children": [
-                self._resolve_field(self, field)
-                for field in self.serialize_fields
-                if self._resolve_field(self, field) is not None
-            ],
-        }
+        plan = get_serializer_plan(type(self))
+        children = []
+        for resolve in plan.resolvers:
+            child = resolve(self)
+            if child is not None:
+                children.append(child)
+        return {"key": plan.key, "children": children}
 
 
 class UpdateMixin:
@@ -0,0 +1,117 @@
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from graphql_relay.utils import base64, unbase64
+
+KEYSET_CURSOR_PREFIX = "keyset:"
+
+
+def get_keyset_ordering(queryset):
+    """Return the ordering of the queryset as a list of (field name, descending) pairs.
+
+    The primary key is appended to the ordering unless it's already part of it,
+    so that the ordering is total. Returns None if the ordering of the queryset
+    can't be used for keyset pagination, e.g. when it contains expressions.
+    """
+    if queryset.query.order_by:
+        order_by = queryset.query.order_by
+    elif queryset.query.default_ordering:
+        order_by = queryset.model._meta.ordering
+    else:
+        order_by = ()
+
+    pk_name = queryset.model._meta.pk.name
+    ordering = []
+    for item in order_by:
+        if not isinstance(item, str) or item == "?":
+            return None
+        name = item.lstrip("-")
+        if name == "pk":
+            name = pk_name
+        ordering.append((name, item.startswith("-")))
+
+    if not any(name == pk_name for name, descending in ordering):
+        ordering.append((pk_name, False))
+
+    return ordering
+
+
+def reverse_keyset_ordering(ordering):
+    return [(name, not descending) for name, descending in ordering]
+
+
+def order_by_keyset(queryset, ordering):
+    return queryset.order_by(
+        *[f"-{name}" if descending else name for name, descending in ordering]
+    )
+
+
+def get_keyset_values(obj, ordering):
+    values = []
+    for name, descending in ordering:
+        value = obj
+        for attr in name.split("__"):
+            value = getattr(value, attr, None)
+        values.append(value)
+    return values
+
+
+def encode_keyset_cursor(values):
+    return base64(KEYSET_CURSOR_PREFIX + json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def decode_keyset_cursor(cursor, ordering):
+    """Decode the values of a keyset cursor, raises ValueError if the cursor is invalid."""
+    try:
+        decoded = unbase64(cursor)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not decoded.startswith(KEYSET_CURSOR_PREFIX):
+        raise ValueError("Invalid cursor")
+    prefix_length = len(KEYSET_CURSOR_PREFIX)
+    values = json.loads(decoded[prefix_length:])
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError("Cursor doesn't match the ordering")
+    return values
+
+
+def _is_nullable(model, name):
+    if "__" in name:
+        return True
+    try:
+        return model._meta.get_field(name).null
+    except FieldDoesNotExist:
+        # Annotations, e.g. subqueries, may always be null
+        return True
+
+
+def keyset_filter(model, ordering, values):
+    """Build a filter matching the rows that come after the given values in the ordering.
+
+    PostgreSQL sorts nulls last in ascending and first in descending order,
+    which the filter follows.
+    """
+    conditions = []
+    equal = Q()
+    for (name, descending), value in zip(ordering, values):
+        if value is None:
+            after = Q(**{f"{name}__isnull": False}) if descending else None
+        else:
+            after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            if not descending and _is_nullable(model, name):
+                after |= Q(**{f"{name}__isnull": True})
+        if after is not None:
+            conditions.append(equal & after)
+
+        if value is None:
+            equal &= Q(**{f"{name}__isnull": True})
+        else:
+            equal &= Q(**{name: value})
+
+    if not conditions:
+        return Q(pk__in=[])
+    return reduce(operator.or_, conditions)
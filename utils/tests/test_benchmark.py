@@ -0,0 +1,125 @@
+import json
+
+import pytest
+import requests
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from open_city_profile.oidc import get_token_exchange
+from profiles.models import Profile
+from services.enums import ServiceType
+from services.models import Service
+from utils.benchmark import (
+    BenchmarkError,
+    compare_results,
+    GDPR_API_TOKEN,
+    get_benchmark_service,
+    percentile,
+    stub_gdpr_service,
+)
+
+RESULT = {"p95": 0.1, "queries": 5, "peak_memory": 1000}
+
+
+def test_percentile_interpolates_between_values():
+    values = [4, 1, 3, 2]
+
+    assert percentile(values, 0) == 1
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4
+    assert percentile([], 50) is None
+
+
+def test_compare_results_flags_regressions():
+    baseline = {"10": {"myProfile": RESULT, "profile": RESULT}}
+    results = {
+        "10": {
+            "myProfile": {"p95": 0.11, "queries": 5, "peak_memory": 1100},
+            "profile": {"p95": 0.2, "queries": 6, "peak_memory": 2000},
+            "profiles": {"p95": 1, "queries": 50, "peak_memory": 10000},
+        },
+        "100": {"myProfile": RESULT},
+    }
+
+    regressions = compare_results(results, baseline)
+
+    assert len(regressions) == 3
+    assert all(regression.startswith("profile @ 10:") for regression in regressions)
+
+
+def test_stub_gdpr_service_serves_the_gdpr_api_and_tokens():
+    with stub_gdpr_service(0) as server:
+        response = requests.get(
+            f"http://127.0.0.1:{server.server_port}/gdpr/123", timeout=5
+        )
+        api_tokens = get_token_exchange().fetch_api_tokens("code")
+
+    assert response.json()["children"][0]["value"] == "123"
+    assert list(api_tokens.values()) == [GDPR_API_TOKEN]
+
+
+def test_get_benchmark_service_creates_the_service():
+    service = get_benchmark_service("http://127.0.0.1:8765/gdpr/")
+
+    assert service.service_type == ServiceType.BERTH
+    assert service.gdpr_url == "http://127.0.0.1:8765/gdpr/"
+    assert get_benchmark_service("http://127.0.0.1:8765/gdpr/") == service
+
+
+def test_get_benchmark_service_does_not_modify_an_existing_service(service):
+    with pytest.raises(BenchmarkError):
+        get_benchmark_service("http://127.0.0.1:8765/gdpr/")
+
+    service.refresh_from_db()
+    assert service.gdpr_url == ""
+    assert Service.objects.count() == 1
+
+
+def test_command_benchmark_api_writes_results(tmp_path):
+    output = tmp_path / "results.json"
+
+    call_command(
+        "benchmark_api",
+        "--sizes=20",
+        "--iterations=2",
+        "--warmup=0",
+        f"--output={output}",
+    )
+
+    assert Profile.objects.count() == 20
+    results = json.loads(output.read_text())["results"]
+    assert set(results["20"]) >= {
+        "myProfile",
+        "profiles",
+        "profile",
+        "updateMyProfile",
+        "downloadMyProfile",
+    }
+    my_profile = results["20"]["myProfile"]
+    assert my_profile["iterations"] == 2
+    assert my_profile["queries"] > 0
+    assert my_profile["peak_memory"] > 0
+
+
+def test_command_benchmark_api_fails_on_regression(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(
+        json.dumps(
+            {
+                "results": {
+                    "20": {"myProfile": {"p95": 0, "queries": 0, "peak_memory": 0}}
+                }
+            }
+        )
+    )
+
+    with pytest.raises(CommandError, match="regressions"):
+        call_command(
+            "benchmark_api",
+            "--sizes=20",
+            "--iterations=1",
+            "--warmup=0",
+            f"--output={tmp_path / 'results.json'}",
+            f"--baseline={baseline}",
+            "--fail-on-regression",
+        )
@@ -54,3 +54,18 @@ def test_command_seed_data_works_withs_arguments():
     assert Profile.objects.count() == 20
     assert YouthProfile.objects.count() == 10
     assert User.objects.filter(is_superuser=True).count() == 1
+
+
+def test_command_seed_data_initializes_development_data_in_bulk():
+    args = [
+        "--development",
+        "--no-clear",  # Flushing not needed in tests + it caused test failures
+        "--bulk",
+        "--profilecount=25",
+        "--batchsize=10",
+        "--seed=1",
+    ]
+    call_command("seed_data", *args)
+
+    assert Profile.objects.count() == 25
+    assert not Profile.objects.filter(service_connections__isnull=True).exists()
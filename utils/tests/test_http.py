@@ -0,0 +1,62 @@
+import requests
+from requests.cookies import create_cookie, MockRequest
+from urllib3.util.retry import RequestHistory
+
+from utils.http import HTTPClient, JitteredRetry
+
+
+def test_session_is_reused():
+    client = HTTPClient()
+
+    assert client.session is client.session
+    assert client.session.get_adapter("https://example.com/") is client.adapter
+    assert client.session.get_adapter("http://example.com/") is client.adapter
+
+
+def test_forked_process_gets_its_own_session(mocker):
+    client = HTTPClient()
+    session = client.session
+
+    mocker.patch("utils.http.os.getpid", return_value=-1)
+
+    assert client.session is not session
+
+
+def test_pool_settings_are_used(settings):
+    settings.HTTP_CLIENT_POOL_MAXSIZE = 3
+    settings.HTTP_CLIENT_RETRIES = 4
+
+    adapter = HTTPClient().adapter
+
+    assert adapter._pool_maxsize == 3
+    assert adapter.max_retries.total == 4
+    assert adapter.max_retries.read == 0
+
+
+def test_request_uses_the_default_timeout(settings, requests_mock):
+    settings.HTTP_CLIENT_TIMEOUT = 1.5
+    requests_mock.get("https://example.com/", json={})
+
+    HTTPClient().get("https://example.com/")
+
+    assert requests_mock.last_request.timeout == 1.5
+
+
+def test_response_cookies_are_not_stored():
+    client = HTTPClient()
+    request = requests.Request("GET", "https://example.com/").prepare()
+    cookie = create_cookie("sessionid", "user-1", domain="example.com")
+
+    client.session.cookies.set_cookie_if_ok(cookie, MockRequest(request))
+
+    assert len(client.session.cookies) == 0
+
+
+def test_retry_backoff_is_jittered():
+    history = (RequestHistory("GET", "https://example.com/", None, 503, None),) * 3
+    retry = JitteredRetry(backoff_factor=1, history=history)
+
+    backoffs = {retry.get_backoff_time() for _ in range(20)}
+
+    assert all(0 <= backoff <= 4 for backoff in backoffs)
+    assert len(backoffs) > 1
@@ -0,0 +1,64 @@
+import pytest
+
+from profiles.models import Profile
+from profiles.tests.factories import ProfileFactory
+from utils.pagination import (
+    decode_keyset_cursor,
+    encode_keyset_cursor,
+    get_keyset_ordering,
+    get_keyset_values,
+    keyset_filter,
+    order_by_keyset,
+    reverse_keyset_ordering,
+)
+
+
+def test_keyset_ordering_ends_with_primary_key():
+    queryset = Profile.objects.order_by("-first_name", "last_name")
+
+    assert get_keyset_ordering(queryset) == [
+        ("first_name", True),
+        ("last_name", False),
+        ("id", False),
+    ]
+
+
+def test_keyset_ordering_is_not_available_for_random_ordering():
+    assert get_keyset_ordering(Profile.objects.order_by("?")) is None
+
+
+def test_keyset_cursor_round_trip():
+    ordering = [("first_name", False), ("id", False)]
+    cursor = encode_keyset_cursor(["Adam", 1])
+
+    assert decode_keyset_cursor(cursor, ordering) == ["Adam", 1]
+
+
+@pytest.mark.parametrize("cursor", ["invalid", encode_keyset_cursor(["Adam"])])
+def test_decoding_invalid_keyset_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_keyset_cursor(cursor, [("first_name", False), ("id", False)])
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_filter_returns_rows_after_the_given_row(descending):
+    ProfileFactory(first_name="Adam")
+    ProfileFactory(first_name="Bryan")
+    ProfileFactory(first_name="Bryan")
+    ProfileFactory(first_name="Charlie")
+    ordering = [("first_name", descending), ("id", False)]
+    queryset = order_by_keyset(Profile.objects.all(), ordering)
+    profiles = list(queryset)
+
+    for i, profile in enumerate(profiles):
+        following = profiles[i:][1:]
+        values = get_keyset_values(profile, ordering)
+        after = queryset.filter(keyset_filter(Profile, ordering, values))
+        before = order_by_keyset(
+            queryset.filter(
+                keyset_filter(Profile, reverse_keyset_ordering(ordering), values)
+            ),
+            reverse_keyset_ordering(ordering),
+        )
+        assert list(after) == following
+        assert list(before) == profiles[:i][::-1]
@@ -1,12 +1,14 @@
 import pytest
 from django.contrib.auth.models import Group
+from django.db import connection
 from faker import Faker
 from guardian.shortcuts import get_group_perms
 
 from open_city_profile.tests.factories import GroupFactory
-from profiles.models import Profile
+from profiles.models import Email, Profile, ProfilePrimaryContactInfo
 from services.enums import ServiceType
 from services.models import AllowedDataField, Service, ServiceConnection
+from subscriptions.utils import generate_subscription_types
 from users.models import User
 from utils.utils import (
     assign_permissions,
@@ -16,6 +18,7 @@ from utils.utils import (
     generate_group_admins,
     generate_groups_for_services,
     generate_profiles,
+    generate_profiles_bulk,
     generate_service_connections,
     generate_services,
     generate_youth_profiles,
@@ -155,3 +158,54 @@ def test_generate_data_fields(times):
         for translation in value["translations"]:
             field.set_current_language(translation["code"])
             assert field.label == translation["label"]
+
+
+@pytest.mark.parametrize("batch_size", [7, 1000])
+def test_generates_profiles_in_bulk(batch_size):
+    generate_services()
+    generate_subscription_types()
+
+    created = generate_profiles_bulk(
+        k=30, youth_profile_percentage=0.5, batch_size=batch_size, seed=1
+    )
+
+    assert created == 30
+    assert Profile.objects.count() == 30
+    assert Email.objects.filter(primary=True).count() == 30
+    assert ProfilePrimaryContactInfo.objects.count() == 30
+    assert not Profile.objects.filter(service_connections__isnull=True).exists()
+    youth_connections = ServiceConnection.objects.filter(
+        service__service_type=ServiceType.YOUTH_MEMBERSHIP
+    )
+    youth_profiles = YouthProfile.objects.all()
+    assert youth_profiles.count() == youth_connections.count()
+    assert all(youth_profile.membership_number for youth_profile in youth_profiles)
+
+
+def test_bulk_membership_numbers_are_not_truncated(settings):
+    settings.YOUTH_MEMBERSHIP_NUMBER_LENGTH = 6
+    generate_services()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('youths_youthprofile', 'id'), 1234566)"
+        )
+
+    generate_profiles_bulk(k=10, youth_profile_percentage=1)
+
+    youth_profiles = YouthProfile.objects.all()
+    assert youth_profiles.exists()
+    for youth_profile in youth_profiles:
+        assert youth_profile.pk > 1234566
+        assert youth_profile.membership_number == str(youth_profile.pk)
+
+
+def test_profiles_generated_in_bulk_are_reproducible():
+    generate_services()
+
+    generate_profiles_bulk(k=5, seed=1)
+    generate_profiles_bulk(k=5, seed=1)
+
+    names = list(
+        Profile.objects.order_by("user__id").values_list("first_name", "last_name")
+    )
+    assert names[:5] == names[5:]
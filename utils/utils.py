@@ -1,16 +1,33 @@
+import multiprocessing
 import random
+from collections import defaultdict
+from datetime import timedelta
 
 from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Group
-from django.db import transaction
+from django.db import connections, transaction
+from django.db.models import Case, CharField, Value, When
+from django.db.models.functions import Cast, LPad
+from django.utils import timezone
 from django.utils.timezone import get_current_timezone, make_aware
+from faker import Faker
 from guardian.shortcuts import assign_perm
 
 from profiles.enums import AddressType, EmailType, PhoneType
-from profiles.models import Address, Email, Phone, Profile
+from profiles.models import (
+    Address,
+    Email,
+    Phone,
+    Profile,
+    ProfilePrimaryContactInfo,
+    SensitiveData,
+    VerifiedPersonalInformation,
+    VerifiedPersonalInformationPermanentAddress,
+)
 from services.enums import ServiceType
 from services.models import AllowedDataField, Service, ServiceConnection
+from subscriptions.models import Subscription, SubscriptionType
 from users.models import User
 from youths.enums import YouthLanguage
 from youths.models import YouthProfile
@@ -298,3 +315,364 @@ def generate_youth_profiles(faker=None):
             else None,
             photo_usage_approved=bool(random.getrandbits(1)) if approved else False,
         )
+
+
+# Share of generated profiles having each kind of related data in the bulk mode
+BULK_PROFILE_DISTRIBUTION = {
+    "nickname": 0.2,
+    "secondary_email": 0.3,
+    "phone": 0.85,
+    "secondary_phone": 0.15,
+    "address": 0.9,
+    "secondary_address": 0.1,
+    "subscription": 0.3,
+    "subscription_enabled": 0.8,
+    "secondary_service": 0.2,
+    "sensitive_data": 0.3,
+    "verified_personal_information": 0.25,
+    "youth_profile_approved": 0.5,
+}
+
+BULK_LANGUAGE_WEIGHTS = {"fi": 80, "sv": 6, "en": 14}
+
+BULK_CONTACT_METHOD_WEIGHTS = {"email": 85, "sms": 15}
+
+BULK_VALUE_POOL_SIZE = 1000
+
+_bulk_value_pools = None
+
+
+def _init_bulk_worker(locale, seed):
+    """Generate the pools of fake values the profiles are assembled from.
+
+    Calling Faker for every field of every profile would dominate the time
+    spent, so each process samples a pool of values once and the profiles
+    pick from those.
+    """
+    global _bulk_value_pools
+
+    faker = Faker(locale)
+    if seed is not None:
+        faker.seed_instance(seed)
+
+    def pool(generator, size=BULK_VALUE_POOL_SIZE):
+        return [generator() for i in range(size)]
+
+    _bulk_value_pools = {
+        "first_name": pool(faker.first_name),
+        "last_name": pool(faker.last_name),
+        "user_name": pool(faker.user_name),
+        "email_domain": pool(faker.free_email_domain, 20),
+        "phone": pool(faker.phone_number),
+        "street_address": pool(faker.street_address),
+        "city": pool(faker.city, 100),
+        "postal_code": pool(faker.postcode),
+        "country_code": pool(faker.country_code, 50),
+        "ssn": pool(lambda: faker.ssn()[:11]),
+    }
+
+
+class _ProfileBatch:
+    """Fake profiles and their related objects to be inserted in bulk."""
+
+    def __init__(self, rng, pools, options):
+        self.rng = rng
+        self.pools = pools
+        self.options = options
+        self.now = timezone.now()
+        self.objects = defaultdict(list)
+
+    def chance(self, name):
+        return self.rng.random() < BULK_PROFILE_DISTRIBUTION[name]
+
+    def pick(self, pool):
+        return self.rng.choice(self.pools[pool])
+
+    def add(self, obj):
+        self.objects[type(obj)].append(obj)
+        return obj
+
+    def email_address(self):
+        return "{}{}@{}".format(
+            self.pick("user_name"), self.rng.randrange(10000), self.pick("email_domain")
+        )
+
+    def country_code(self):
+        return "FI" if self.rng.random() < 0.95 else self.pick("country_code")
+
+    def weighted_choice(self, choices, weights):
+        codes = [code for code, name in choices]
+        return self.rng.choices(codes, [weights.get(code, 1) for code in codes])[0]
+
+    def create_users_and_profiles(self, count):
+        users = []
+        for i in range(count):
+            user = User(
+                first_name=self.pick("first_name"),
+                last_name=self.pick("last_name"),
+                email=self.email_address(),
+                password=self.options["password"],
+                is_active=True,
+                date_joined=self.now
+                - timedelta(seconds=self.rng.randrange(10 * 365 * 86400)),
+            )
+            # Sets the UUID and the UUID based username like for real users
+            user.clean()
+            users.append(user)
+        User.objects.bulk_create(users, batch_size=self.options["batch_size"])
+
+        profiles = [
+            Profile(
+                user=user,
+                first_name=user.first_name,
+                last_name=user.last_name,
+                nickname=user.first_name if self.chance("nickname") else "",
+                language=self.weighted_choice(
+                    settings.LANGUAGES, BULK_LANGUAGE_WEIGHTS
+                ),
+                contact_method=self.weighted_choice(
+                    settings.CONTACT_METHODS, BULK_CONTACT_METHOD_WEIGHTS
+                ),
+            )
+            for user in users
+        ]
+        Profile.objects.bulk_create(profiles, batch_size=self.options["batch_size"])
+        return profiles
+
+    def add_contacts(self, profile):
+        primary_email = self.add(
+            Email(
+                profile=profile,
+                primary=True,
+                email_type=EmailType.PERSONAL,
+                email=profile.user.email,
+            )
+        )
+        if self.chance("secondary_email"):
+            self.add(
+                Email(
+                    profile=profile,
+                    primary=False,
+                    email_type=EmailType.WORK,
+                    email=self.email_address(),
+                )
+            )
+
+        if self.chance("phone"):
+            for primary in [True] + ([False] if self.chance("secondary_phone") else []):
+                self.add(
+                    Phone(
+                        profile=profile,
+                        primary=primary,
+                        phone_type=PhoneType.MOBILE if primary else PhoneType.WORK,
+                        phone=self.pick("phone"),
+                    )
+                )
+
+        addresses = []
+        if self.chance("address"):
+            for primary in [True] + (
+                [False] if self.chance("secondary_address") else []
+            ):
+                addresses.append(
+                    self.add(
+                        Address(
+                            profile=profile,
+                            primary=primary,
+                            address=self.pick("street_address"),
+                            city=self.pick("city"),
+                            postal_code=self.pick("postal_code"),
+                            country_code=self.country_code(),
+                            address_type=AddressType.HOME
+                            if primary
+                            else AddressType.WORK,
+                        )
+                    )
+                )
+
+        primary_address = addresses[0] if addresses else None
+        self.add(
+            ProfilePrimaryContactInfo(
+                profile=profile,
+                email=primary_email.email,
+                address=getattr(primary_address, "address", None),
+                postal_code=getattr(primary_address, "postal_code", None),
+                city=getattr(primary_address, "city", None),
+                country_code=getattr(primary_address, "country_code", None),
+            )
+        )
+
+    def add_subscriptions(self, profile):
+        for subscription_type_id in self.options["subscription_type_ids"]:
+            if self.chance("subscription"):
+                self.add(
+                    Subscription(
+                        profile=profile,
+                        subscription_type_id=subscription_type_id,
+                        enabled=self.chance("subscription_enabled"),
+                    )
+                )
+
+    def add_service_connections(self, profile):
+        if self.rng.random() < self.options["youth_profile_percentage"]:
+            service_ids = [self.options["youth_service_id"]]
+            self.add_youth_profile(profile)
+        else:
+            other_service_ids = self.options["other_service_ids"]
+            service_count = 2 if self.chance("secondary_service") else 1
+            service_ids = self.rng.sample(
+                other_service_ids, min(service_count, len(other_service_ids))
+            )
+
+        for service_id in service_ids:
+            self.add(ServiceConnection(profile=profile, service_id=service_id))
+
+    def add_youth_profile(self, profile):
+        approved = self.chance("youth_profile_approved")
+        date_joined = profile.user.date_joined
+        self.add(
+            YouthProfile(
+                profile=profile,
+                birth_date=(
+                    self.now - timedelta(days=self.rng.randint(13 * 365, 17 * 365))
+                ).date(),
+                language_at_home=self.rng.choice(list(YouthLanguage)),
+                approver_first_name=self.pick("first_name") if approved else "",
+                approver_last_name=profile.last_name if approved else "",
+                approved_time=date_joined + (self.now - date_joined) * self.rng.random()
+                if approved
+                else None,
+                photo_usage_approved=self.rng.random() < 0.5 if approved else False,
+            )
+        )
+
+    def add_sensitive_data(self, profile):
+        if self.chance("sensitive_data"):
+            self.add(SensitiveData(profile=profile, ssn=self.pick("ssn")))
+
+        if self.chance("verified_personal_information"):
+            self.add(
+                VerifiedPersonalInformation(
+                    profile=profile,
+                    first_name=profile.first_name,
+                    last_name=profile.last_name,
+                    given_name=profile.first_name,
+                    national_identification_number=self.pick("ssn"),
+                    email=profile.user.email,
+                    municipality_of_residence=self.pick("city"),
+                    municipality_of_residence_number=str(self.rng.randrange(1000)),
+                )
+            )
+
+    def save(self):
+        batch_size = self.options["batch_size"]
+        for model in (
+            Email,
+            Phone,
+            Address,
+            ProfilePrimaryContactInfo,
+            Subscription,
+            ServiceConnection,
+            SensitiveData,
+            VerifiedPersonalInformation,
+            YouthProfile,
+        ):
+            model.objects.bulk_create(self.objects[model], batch_size=batch_size)
+
+        VerifiedPersonalInformationPermanentAddress.objects.bulk_create(
+            [
+                VerifiedPersonalInformationPermanentAddress(
+                    verified_personal_information=verified_info,
+                    street_address=self.pick("street_address"),
+                    postal_code=self.pick("postal_code"),
+                    post_office=self.pick("city"),
+                )
+                for verified_info in self.objects[VerifiedPersonalInformation]
+            ],
+            batch_size=batch_size,
+        )
+
+        # Bulk inserts skip the post_save signal generating the membership numbers.
+        # LPAD truncates longer values, so only the shorter pks are padded.
+        length = settings.YOUTH_MEMBERSHIP_NUMBER_LENGTH
+        pk_string = Cast("pk", CharField())
+        YouthProfile.objects.filter(
+            pk__in=[youth_profile.pk for youth_profile in self.objects[YouthProfile]]
+        ).update(
+            membership_number=Case(
+                When(pk__lt=10 ** length, then=LPad(pk_string, length, Value("0"))),
+                default=pk_string,
+                output_field=CharField(),
+            )
+        )
+
+
+def _generate_profile_batch(task):
+    """Create a batch of profiles with related data using batched inserts."""
+    start, count, options = task
+    seed = options["seed"]
+    batch = _ProfileBatch(
+        random.Random(None if seed is None else seed + start),
+        _bulk_value_pools,
+        options,
+    )
+    with transaction.atomic():
+        for profile in batch.create_users_and_profiles(count):
+            batch.add_contacts(profile)
+            batch.add_subscriptions(profile)
+            batch.add_service_connections(profile)
+            batch.add_sensitive_data(profile)
+        batch.save()
+    return count
+
+
+def generate_profiles_bulk(
+    k=50,
+    locale="fi_FI",
+    youth_profile_percentage=0.2,
+    batch_size=1000,
+    processes=1,
+    seed=None,
+):
+    """Create fake profiles with related data in batches for benchmarking purposes.
+
+    Unlike `generate_profiles`, this uses batched inserts and connects the
+    profiles to services, generates youth profiles, subscriptions, sensitive
+    data and verified personal information with the shares defined in
+    BULK_PROFILE_DISTRIBUTION. The batches are created in parallel if more
+    than one process is given, in which case each batch is committed in its
+    own transaction. Model signals are not sent for the created objects.
+
+    Requires the services and subscription types to exist. Returns the number
+    of created profiles.
+    """
+    youth_service = Service.objects.get(service_type=ServiceType.YOUTH_MEMBERSHIP)
+    options = {
+        "seed": seed,
+        "batch_size": batch_size,
+        "youth_profile_percentage": youth_profile_percentage,
+        "youth_service_id": youth_service.pk,
+        "other_service_ids": list(
+            Service.objects.exclude(pk=youth_service.pk).values_list("pk", flat=True)
+        ),
+        "subscription_type_ids": list(
+            SubscriptionType.objects.values_list("pk", flat=True)
+        ),
+        # Hashing is slow on purpose, so all the users share the same hash
+        "password": make_password("password"),
+    }
+    tasks = [
+        (start, min(batch_size, k - start), options)
+        for start in range(0, k, batch_size)
+    ]
+
+    if processes <= 1:
+        _init_bulk_worker(locale, seed)
+        return sum(_generate_profile_batch(task) for task in tasks)
+
+    # Forked processes must not share the database connections of the parent
+    connections.close_all()
+    with multiprocessing.get_context("fork").Pool(
+        processes, initializer=_init_bulk_worker, initargs=(locale, seed)
+    ) as pool:
+        return sum(pool.imap_unordered(_generate_profile_batch, tasks))